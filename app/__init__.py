@@ -18,8 +18,12 @@ db = SQLAlchemy()
 # Initialize LoginManager
 login_manager = LoginManager()
 
-def create_app():
-    """Initialize the core application."""
+def create_app(test_config=None):
+    """Initialize the core application.
+    
+    Args:
+        test_config: Optional mapping of config values that override the defaults
+    """
     app = Flask(__name__, instance_relative_config=False)
     
     # Configure the app
@@ -44,6 +48,9 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    if test_config:
+        app.config.update(test_config)
+    
     # Log the database URI for debugging
     logger.info(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
     logger.info(f"Database file path: {db_path}")
@@ -58,7 +65,7 @@ def create_app():
     
     with app.app_context():
         # Import parts of our application
-        from .models import book, license, user
+        from .models import book, chapter, import_job, import_request, license, user
         from .services import standard_ebooks, project_gutenberg, internet_archive, wikisource
         
         # Import user loader
@@ -82,6 +89,19 @@ def create_app():
             logger.info("Attempting to create database tables...")
             db.create_all()
             logger.info("Database tables created successfully")
+            
+            # create_all() skips indexes on tables that already exist
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+            
+            # Set up the full-text search index over book metadata
+            from .utils.search_index import BookSearchIndex
+            BookSearchIndex().ensure_index()
+            
+            # Set up the full-text index over book contents
+            from .utils.text_index import BookTextIndex
+            BookTextIndex().ensure_index()
         except Exception as e:
             logger.error(f"Error creating database tables: {str(e)}")
             # Continue execution to allow the application to start even if DB fails
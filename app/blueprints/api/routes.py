@@ -3,10 +3,29 @@ API routes for Remixable Fiction Library.
 This module contains the routes for the API blueprint.
 """
 
-from flask import request, jsonify
+import os
+from flask import request, jsonify, abort
+from flask_login import current_user
 
 from . import api_bp
+from app import db
 from app.models.book import Book
+from app.models.chapter import BookChapter
+from app.models.import_job import ImportJob
+from app.utils.search_index import BookSearchIndex
+from app.utils.text_index import BookTextIndex
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.catalog_stats import catalog_stats
+from app.utils.chapter_index import ChapterIndex
+from app.services.import_queue import ImportQueue
+from app.services.http_client import http_client
+from app.utils.rate_limiter import rate_limiter
+from app.utils.response_cache import response_cache
+
+search_index = BookSearchIndex()
+text_index = BookTextIndex()
+chapter_index = ChapterIndex()
+import_queue = ImportQueue()
 
 @api_bp.route('/books')
 def api_books():
@@ -14,7 +33,7 @@ def api_books():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    books = Book.query.paginate(page=page, per_page=per_page)
+    books = Book.listing_query().order_by(Book.id).paginate(page=page, per_page=per_page)
     
     return jsonify({
         'books': [book.to_dict() for book in books.items],
@@ -29,20 +48,154 @@ def api_book_detail(book_id):
     book = Book.query.get_or_404(book_id)
     return jsonify(book.to_dict())
 
+@api_bp.route('/books/<int:book_id>/chapters')
+def api_book_chapters(book_id):
+    """API endpoint for a book's chapter index."""
+    book = _book_with_chapters(book_id)
+    return jsonify({
+        'book_id': book.id,
+        'word_count': book.word_count,
+        'chapters': [chapter.to_dict() for chapter in book.chapters]
+    })
+
+@api_bp.route('/books/<int:book_id>/chapters/<int:number>')
+def api_book_chapter(book_id, number):
+    """API endpoint for the text of a single chapter."""
+    book = _book_with_chapters(book_id)
+    chapter = BookChapter.query.filter_by(book_id=book.id, number=number).first_or_404()
+    
+    data = chapter.to_dict()
+    data['text'] = chapter_index.read_range(book.text_file_path, chapter.start_offset, chapter.end_offset).strip()
+    return jsonify(data)
+
+def _book_with_chapters(book_id):
+    """Load a book, building its chapter index if it predates the index."""
+    book = Book.query.get_or_404(book_id)
+    
+    if not book.text_file_path or not os.path.exists(book.text_file_path):
+        abort(404)
+    
+    if not book.chapters:
+        chapter_index.store(book)
+        db.session.commit()
+    
+    return book
+
 @api_bp.route('/search')
 def api_search():
-    """API endpoint for search."""
+    """API endpoint for search.
+    
+    Results are paginated with an opaque cursor: pass the returned
+    next_cursor back as cursor to get the following page. Use fields to
+    limit the book fields returned, e.g. fields=id,title,author.
+    """
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    cursor = request.args.get('cursor')
+    fields = _requested_fields()
+    
+    if not query:
+        return jsonify({'books': [], 'next_cursor': None})
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    
+    books, next_key = search_index.search_page(query, limit, after=after, fields=fields)
+    
+    return jsonify({
+        'books': [book.to_dict(fields=fields) for book in books],
+        'next_cursor': encode_cursor(next_key) if next_key else None
+    })
+
+@api_bp.route('/search/count')
+def api_search_count():
+    """API endpoint for the number of books matching a search."""
+    query = request.args.get('q', '')
+    
+    return jsonify({
+        'count': search_index.count(query) if query else 0
+    })
+
+def _requested_fields():
+    """Parse the fields query parameter into a list of field names."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+@api_bp.route('/search/text')
+def api_search_text():
+    """API endpoint for searching the full text of books."""
     query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
     
     if not query:
-        return jsonify({'books': []})
+        return jsonify({'hits': []})
     
-    books = Book.query.filter(
-        (Book.title.ilike(f'%{query}%')) | 
-        (Book.author.ilike(f'%{query}%')) |
-        (Book.description.ilike(f'%{query}%'))
-    ).all()
+    return jsonify({
+        'hits': text_index.search(query, limit=limit)
+    })
+
+@api_bp.route('/facets')
+def api_facets():
+    """API endpoint for browse facet counts under the given filters."""
+    return jsonify(catalog_stats.facets(
+        source=request.args.get('source'),
+        license=request.args.get('license'),
+        genre=request.args.get('genre'),
+        decade=request.args.get('decade', type=int)
+    ))
+
+@api_bp.route('/import/jobs/<job_id>')
+def api_import_job(job_id):
+    """API endpoint for the state and progress of a queued import."""
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        abort(404)
+    return jsonify(job.to_dict())
+
+@api_bp.route('/import/batch', methods=['POST'])
+def api_import_batch():
+    """API endpoint for queueing imports from a manifest (admins only).
+    
+    Expects a JSON body of {"items": [{"source": ..., "identifier": ...}, ...]}.
+    """
+    if not current_user.is_authenticated or not current_user.is_admin():
+        return jsonify({'error': 'Only administrators can import books.'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list):
+        return jsonify({'error': 'Expected a JSON object with an "items" list.'}), 400
+    
+    result = import_queue.enqueue_batch(
+        [(item.get('source'), item.get('identifier')) for item in items if isinstance(item, dict)],
+        requested_by=current_user.id
+    )
+    result['invalid'] += sum(1 for item in items if not isinstance(item, dict))
+    
+    return jsonify(result), 202
+
+@api_bp.route('/import/batch/<batch_id>')
+def api_import_batch_status(batch_id):
+    """API endpoint for the progress of a batch import."""
+    status = import_queue.batch_status(batch_id)
+    if not status:
+        abort(404)
+    return jsonify({'batch_id': batch_id, 'sources': status})
+
+@api_bp.route('/admin/http-stats')
+def api_http_stats():
+    """API endpoint for upstream request, rate limit and response cache counters (admins only)."""
+    if not current_user.is_authenticated or not current_user.is_admin():
+        return jsonify({'error': 'Only administrators can view HTTP stats.'}), 403
     
     return jsonify({
-        'books': [book.to_dict() for book in books]
+        'hosts': http_client.stats(),
+        'rate_limits': rate_limiter.stats(),
+        'response_cache': response_cache.stats()
     })
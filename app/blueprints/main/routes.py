@@ -3,23 +3,29 @@ Main routes for Remixable Fiction Library.
 This module contains the routes for the main blueprint.
 """
 
-from flask import render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import render_template, request, redirect, url_for, flash, jsonify, make_response
 from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
 import os
-import re
-from datetime import datetime
-import uuid
+import logging
 
 from . import main_bp
 from app import db
-from app.models.book import Book, Genre
-from app.models.license import License
+from app.models.book import Book
+from app.models.import_job import ImportJob
+from app.models.import_request import ImportRequest
 from app.services.standard_ebooks import StandardEbooksService
 from app.services.project_gutenberg import ProjectGutenbergService
 from app.services.internet_archive import InternetArchiveService
 from app.services.wikisource import WikisourceService
 from app.utils.license_verifier import LicenseVerifier
 from app.utils.text_processor import TextProcessor
+from app.utils.search_index import BookSearchIndex
+from app.utils.catalog_stats import catalog_stats, filter_books
+from app.utils.pagination import keyset_paginate
+from app.utils.book_reader import BookReader
+from app.utils.file_server import BookFileServer
+from app.services.import_queue import ImportQueue
 
 # Initialize services
 standard_ebooks_service = StandardEbooksService()
@@ -28,9 +34,12 @@ internet_archive_service = InternetArchiveService()
 wikisource_service = WikisourceService()
 license_verifier = LicenseVerifier()
 text_processor = TextProcessor()
+search_index = BookSearchIndex()
+book_reader = BookReader(text_processor)
+file_server = BookFileServer()
+import_queue = ImportQueue()
 
-# Store import requests in memory (would be in database in production)
-import_requests = []
+logger = logging.getLogger(__name__)
 
 @main_bp.route('/')
 def index():
@@ -49,42 +58,40 @@ def about():
 @main_bp.route('/browse')
 def browse():
     """Browse books page."""
-    page = request.args.get('page', 1, type=int)
     per_page = 20
     
     # Get query parameters
     source = request.args.get('source')
     license_type = request.args.get('license')
     genre = request.args.get('genre')
+    decade = request.args.get('decade', type=int)
+    after = request.args.get('after')
+    before = request.args.get('before')
     
     # Build query
-    query = Book.query
-    
-    if source:
-        query = query.filter(Book.source == source)
-    
-    if license_type:
-        query = query.join(Book.license).filter(License.short_name == license_type)
-    
-    if genre:
-        query = query.join(Book.genres).filter(Genre.name == genre)
+    query = filter_books(Book.listing_query(), source, license_type, genre, decade)
     
-    # Get paginated results
-    books = query.order_by(Book.title).paginate(page=page, per_page=per_page)
+    # Get the page by seeking on (title, id) rather than counting past an OFFSET
+    try:
+        books = keyset_paginate(
+            query, (Book.title, Book.id), per_page,
+            after=after, before=before,
+            total=catalog_stats.count_books(source, license_type, genre, decade)
+        )
+    except ValueError:
+        flash('Invalid page link.', 'warning')
+        return redirect(url_for('main.browse', source=source, license=license_type, genre=genre, decade=decade))
     
-    # Get filter options
-    sources = db.session.query(Book.source).distinct().all()
-    licenses = License.query.all()
-    genres = Genre.query.order_by(Genre.name).all()
+    # Get filter options and their counts from the in-memory facet cache
+    facets = catalog_stats.facets(source, license_type, genre, decade)
     
     return render_template('browse.html', 
                           books=books,
-                          sources=sources,
-                          licenses=licenses,
-                          genres=genres,
+                          facets=facets,
                           current_source=source,
                           current_license=license_type,
-                          current_genre=genre)
+                          current_genre=genre,
+                          current_decade=decade)
 
 @main_bp.route('/search')
 def search():
@@ -94,12 +101,8 @@ def search():
     if not query:
         return render_template('search.html', books=[], query='')
     
-    # Search in database
-    books = Book.query.filter(
-        (Book.title.ilike(f'%{query}%')) | 
-        (Book.author.ilike(f'%{query}%')) |
-        (Book.description.ilike(f'%{query}%'))
-    ).all()
+    # Search the full-text index
+    books = search_index.search(query).all()
     
     return render_template('search.html', books=books, query=query)
 
@@ -117,7 +120,43 @@ def read_book(book_id):
     # Determine which format to use
     format = request.args.get('format', 'html')
     
-    if format == 'html' and book.html_file_path:
+    if format == 'html' and book.text_file_path and os.path.exists(book.text_file_path):
+        # Serve the book one page at a time from its page table
+        pages = book_reader.get_pages(book.text_file_path)
+        page_number = request.args.get('page', 1, type=int)
+        
+        if not pages:
+            flash('This book has no readable content.', 'warning')
+            return redirect(url_for('main.book_detail', book_id=book_id))
+        
+        if page_number < 1 or page_number > len(pages):
+            return redirect(url_for('main.read_book', book_id=book_id))
+        
+        page = pages[page_number - 1]
+        content = "\n".join(text_processor.text_to_paragraphs(book_reader.read_page(book.text_file_path, page)))
+        
+        # First page of every chapter, for the table of contents
+        chapters = [p for i, p in enumerate(pages) if i == 0 or p['chapter'] != pages[i - 1]['chapter']]
+        
+        prev_url = url_for('main.read_book', book_id=book_id, page=page_number - 1) if page_number > 1 else None
+        next_url = url_for('main.read_book', book_id=book_id, page=page_number + 1) if page_number < len(pages) else None
+        
+        response = make_response(render_template('read.html', book=book, content=content,
+                                                 page=page, pages=pages, chapters=chapters,
+                                                 prev_url=prev_url, next_url=next_url))
+        
+        # Let the browser fetch the next page while this one is being read
+        links = []
+        if next_url:
+            links.append(f'<{next_url}>; rel="next"')
+            links.append(f'<{next_url}>; rel="prefetch"')
+        if prev_url:
+            links.append(f'<{prev_url}>; rel="prev"')
+        if links:
+            response.headers['Link'] = ', '.join(links)
+        
+        return response
+    elif format == 'html' and book.html_file_path:
         with open(book.html_file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         return render_template('read.html', book=book, content=content)
@@ -135,11 +174,11 @@ def download_book(book_id, format):
     book = Book.query.get_or_404(book_id)
     
     if format == 'epub' and book.epub_file_path:
-        return send_file(book.epub_file_path, as_attachment=True)
+        return file_server.send(book.epub_file_path)
     elif format == 'text' and book.text_file_path:
-        return send_file(book.text_file_path, as_attachment=True)
+        return file_server.send(book.text_file_path)
     elif format == 'html' and book.html_file_path:
-        return send_file(book.html_file_path, as_attachment=True)
+        return file_server.send(book.html_file_path)
     else:
         flash('Requested format not available for this book.', 'warning')
         return redirect(url_for('main.book_detail', book_id=book_id))
@@ -169,32 +208,46 @@ def import_request():
             flash('Please provide the source, identifier, and title.', 'danger')
             return redirect(url_for('main.import_request'))
         
-        # Create a unique ID for the request
-        request_id = str(uuid.uuid4())
+        identifier = identifier.strip()
+        
+        # Point repeat submissions for the same book at the existing request
+        existing = ImportRequest.query.filter_by(source=source, identifier=identifier).first()
+        if existing:
+            flash('This book has already been requested. Here is the status of that request.', 'info')
+            return redirect(url_for('main.import_status', request_id=existing.id))
         
-        # Store the request
-        import_requests.append({
-            'id': request_id,
-            'source': source,
-            'identifier': identifier,
-            'title': title,
-            'author': author,
-            'notes': notes,
-            'email': email,
-            'status': 'pending',
-            'created_at': datetime.utcnow()
-        })
+        new_request = ImportRequest(
+            source=source,
+            identifier=identifier,
+            title=title,
+            author=author,
+            notes=notes,
+            email=email
+        )
+        db.session.add(new_request)
+        
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Someone else requested the same book at the same moment
+            db.session.rollback()
+            existing = ImportRequest.query.filter_by(source=source, identifier=identifier).first_or_404()
+            flash('This book has already been requested. Here is the status of that request.', 'info')
+            return redirect(url_for('main.import_status', request_id=existing.id))
         
         flash('Your import request has been submitted. Thank you for contributing to the library!', 'success')
-        return redirect(url_for('main.import_status', request_id=request_id))
+        return redirect(url_for('main.import_status', request_id=new_request.id))
     
     return render_template('import_request.html')
 
 @main_bp.route('/import/status/<request_id>')
 def import_status(request_id):
-    """Check status of an import request."""
-    # Find the request
-    request_data = next((req for req in import_requests if req['id'] == request_id), None)
+    """Check status of an import request or queued import job."""
+    job = db.session.get(ImportJob, request_id)
+    if job:
+        return render_template('import_job_status.html', job=job)
+    
+    request_data = db.session.get(ImportRequest, request_id)
     
     if not request_data:
         flash('Import request not found.', 'danger')
@@ -205,8 +258,19 @@ def import_status(request_id):
 @main_bp.route('/import/list')
 def import_list():
     """List all import requests - visible to everyone."""
-    # In a real implementation, this would have pagination
-    return render_template('import_list.html', requests=import_requests)
+    page = request.args.get('page', 1, type=int)
+    status = request.args.get('status')
+    
+    query = ImportRequest.query
+    if status in ImportRequest.STATUSES:
+        query = query.filter(ImportRequest.status == status)
+    else:
+        status = None
+    
+    requests = query.order_by(ImportRequest.created_at.desc(), ImportRequest.id.desc()).paginate(
+        page=page, per_page=25, error_out=False)
+    
+    return render_template('import_list.html', requests=requests, current_status=status)
 
 # Admin-only import functionality (still accessible to admins)
 @main_bp.route('/import/standard-ebooks', methods=['GET', 'POST'])
@@ -222,105 +286,16 @@ def import_standard_ebooks():
         return redirect(url_for('main.import_request'))
     
     if request.method == 'POST':
-        url_identifier = request.form.get('url_identifier')
+        url_identifier = request.form.get('url_identifier', '').strip()
         
         if not url_identifier:
             flash('Please provide a URL identifier.', 'danger')
             return redirect(url_for('main.import_standard_ebooks'))
         
-        try:
-            # Get book details
-            book_details = standard_ebooks_service.get_book_details(url_identifier)
-            
-            if not book_details:
-                flash('Failed to get book details.', 'danger')
-                return redirect(url_for('main.import_standard_ebooks'))
-            
-            # Check if book already exists
-            existing_book = Book.query.filter_by(
-                source='standard_ebooks',
-                source_id=url_identifier
-            ).first()
-            
-            if existing_book:
-                flash(f'Book already exists: {existing_book.title}', 'warning')
-                return redirect(url_for('main.book_detail', book_id=existing_book.id))
-            
-            # Download the book
-            epub_path = standard_ebooks_service.download_book(url_identifier, format='epub')
-            
-            if not epub_path:
-                flash('Failed to download book.', 'danger')
-                return redirect(url_for('main.import_standard_ebooks'))
-            
-            # Extract text from EPUB
-            text_content = text_processor.extract_text_from_epub(epub_path)
-            
-            # Save text to file
-            text_file_path = os.path.join(os.path.dirname(epub_path), f"{os.path.basename(epub_path).split('.')[0]}.txt")
-            with open(text_file_path, 'w', encoding='utf-8') as f:
-                f.write(text_content)
-            
-            # Create HTML version
-            html_content = text_processor.text_to_html(
-                text_content, 
-                title=book_details.get('title', ''),
-                author=book_details.get('author', '')
-            )
-            
-            html_file_path = os.path.join(os.path.dirname(epub_path), f"{os.path.basename(epub_path).split('.')[0]}.html")
-            with open(html_file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            
-            # Get or create license
-            license = License.query.filter_by(short_name='CC0').first()
-            if not license:
-                license = License(
-                    name='Creative Commons Zero (CC0)',
-                    short_name='CC0',
-                    description='Creative Commons Zero - Public Domain Dedication. No rights reserved.',
-                    url='https://creativecommons.org/publicdomain/zero/1.0/',
-                    allows_remix=True,
-                    requires_attribution=False,
-                    share_alike=False
-                )
-                db.session.add(license)
-                db.session.commit()
-            
-            # Create book record
-            new_book = Book(
-                title=book_details.get('title', ''),
-                author=book_details.get('author', ''),
-                description=book_details.get('description', ''),
-                source='standard_ebooks',
-                source_id=url_identifier,
-                source_url=book_details.get('url', ''),
-                license_id=license.id,
-                verified=True,
-                verification_notes='Standard Ebooks uses CC0 for all their enhancements.',
-                verified_by=current_user.id,
-                verified_at=datetime.utcnow(),
-                epub_file_path=str(epub_path),
-                text_file_path=text_file_path,
-                html_file_path=html_file_path
-            )
-            
-            # Extract publication year if available
-            if 'metadata' in book_details and 'publication_date' in book_details['metadata']:
-                pub_date = book_details['metadata']['publication_date']
-                year_match = re.search(r'\b(1[0-9]{3}|20[0-2][0-9])\b', pub_date)
-                if year_match:
-                    new_book.publication_year = int(year_match.group(1))
-            
-            db.session.add(new_book)
-            db.session.commit()
-            
-            flash(f'Successfully imported: {new_book.title}', 'success')
-            return redirect(url_for('main.book_detail', book_id=new_book.id))
-            
-        except Exception as e:
-            flash(f'Error importing book: {str(e)}', 'danger')
-            return redirect(url_for('main.import_standard_ebooks'))
+        # Run the import in the background worker
+        job = import_queue.enqueue('standard_ebooks', url_identifier, requested_by=current_user.id)
+        flash('Import queued. This page will update as it progresses.', 'info')
+        return redirect(url_for('main.import_status', request_id=job.id))
     
     # GET request - show form
     return render_template('import_standard_ebooks.html')
@@ -338,136 +313,16 @@ def import_project_gutenberg():
         return redirect(url_for('main.import_request'))
     
     if request.method == 'POST':
-        book_id = request.form.get('book_id')
+        book_id = request.form.get('book_id', '').strip()
         
         if not book_id:
             flash('Please provide a book ID.', 'danger')
             return redirect(url_for('main.import_project_gutenberg'))
         
-        try:
-            # Get book details
-            book_details = project_gutenberg_service.get_book_details(book_id)
-            
-            if not book_details:
-                flash('Failed to get book details.', 'danger')
-                return redirect(url_for('main.import_project_gutenberg'))
-            
-            # Check if book already exists
-            existing_book = Book.query.filter_by(
-                source='project_gutenberg',
-                source_id=book_id
-            ).first()
-            
-            if existing_book:
-                flash(f'Book already exists: {existing_book.title}', 'warning')
-                return redirect(url_for('main.book_detail', book_id=existing_book.id))
-            
-            # Download the book
-            epub_path = project_gutenberg_service.download_book(book_id, format='epub')
-            
-            if not epub_path:
-                # Try text format if EPUB is not available
-                text_path = project_gutenberg_service.download_book(book_id, format='txt')
-                
-                if not text_path:
-                    flash('Failed to download book.', 'danger')
-                    return redirect(url_for('main.import_project_gutenberg'))
-                
-                # Read text content
-                with open(text_path, 'r', encoding='utf-8') as f:
-                    text_content = f.read()
-                
-                # Remove PG branding
-                text_content = project_gutenberg_service.remove_pg_branding(text_content)
-                
-                # Save cleaned text
-                with open(text_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
-                
-                # Create HTML version
-                html_content = text_processor.text_to_html(
-                    text_content, 
-                    title=book_details.get('title', ''),
-                    author=book_details.get('author', '')
-                )
-                
-                html_file_path = os.path.join(os.path.dirname(text_path), f"{os.path.basename(text_path).split('.')[0]}.html")
-                with open(html_file_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-                
-                epub_path = None
-            else:
-                # Extract text from EPUB
-                text_content = text_processor.extract_text_from_epub(epub_path)
-                
-                # Remove PG branding
-                text_content = project_gutenberg_service.remove_pg_branding(text_content)
-                
-                # Save cleaned text
-                text_file_path = os.path.join(os.path.dirname(epub_path), f"{os.path.basename(epub_path).split('.')[0]}.txt")
-                with open(text_file_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
-                
-                # Create HTML version
-                html_content = text_processor.text_to_html(
-                    text_content, 
-                    title=book_details.get('title', ''),
-                    author=book_details.get('author', '')
-                )
-                
-                html_file_path = os.path.join(os.path.dirname(epub_path), f"{os.path.basename(epub_path).split('.')[0]}.html")
-                with open(html_file_path, 'w', encoding='utf-8') as f:
-                    f.write(html_content)
-            
-            # Get or create license
-            license = License.query.filter_by(short_name='PD-US').first()
-            if not license:
-                license = License(
-                    name='Public Domain (US)',
-                    short_name='PD-US',
-                    description='Works in the US public domain (published before 1929). No copyright restrictions in the US.',
-                    url='https://en.wikipedia.org/wiki/Public_domain_in_the_United_States',
-                    allows_remix=True,
-                    requires_attribution=False,
-                    share_alike=False
-                )
-                db.session.add(license)
-                db.session.commit()
-            
-            # Create book record
-            new_book = Book(
-                title=book_details.get('title', ''),
-                author=book_details.get('author', ''),
-                description=book_details.get('bibrec', {}).get('subject', ''),
-                source='project_gutenberg',
-                source_id=book_id,
-                source_url=book_details.get('url', ''),
-                license_id=license.id,
-                verified=True,
-                verification_notes='Project Gutenberg text with PG branding removed.',
-                verified_by=current_user.id,
-                verified_at=datetime.utcnow(),
-                epub_file_path=str(epub_path) if epub_path else None,
-                text_file_path=text_file_path if 'text_file_path' in locals() else text_path,
-                html_file_path=html_file_path
-            )
-            
-            # Extract publication year if available
-            if 'bibrec' in book_details and 'release_date' in book_details['bibrec']:
-                release_date = book_details['bibrec']['release_date']
-                year_match = re.search(r'\b(1[0-9]{3}|20[0-2][0-9])\b', release_date)
-                if year_match:
-                    new_book.publication_year = int(year_match.group(1))
-            
-            db.session.add(new_book)
-            db.session.commit()
-            
-            flash(f'Successfully imported: {new_book.title}', 'success')
-            return redirect(url_for('main.book_detail', book_id=new_book.id))
-            
-        except Exception as e:
-            flash(f'Error importing book: {str(e)}', 'danger')
-            return redirect(url_for('main.import_project_gutenberg'))
+        # Run the import in the background worker
+        job = import_queue.enqueue('project_gutenberg', book_id, requested_by=current_user.id)
+        flash('Import queued. This page will update as it progresses.', 'info')
+        return redirect(url_for('main.import_status', request_id=job.id))
     
     # GET request - show form
     return render_template('import_project_gutenberg.html')
@@ -479,7 +334,10 @@ def public_books_api():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    books = Book.query.paginate(page=page, per_page=per_page)
+    # Genres are not part of the public listing
+    books = Book.listing_query(fields=['id', 'title', 'author', 'source', 'license']).order_by(Book.id).paginate(
+        page=page, per_page=per_page
+    )
     
     return jsonify({
         'books': [
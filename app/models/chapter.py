@@ -0,0 +1,38 @@
+from .. import db
+
+class BookChapter(db.Model):
+    """Model for the chapter index of a book's text file."""
+    __table_args__ = (
+        db.UniqueConstraint('book_id', 'number', name='uq_book_chapter_number'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'), nullable=False, index=True)
+    book = db.relationship('Book', backref=db.backref(
+        'chapters', order_by='BookChapter.number', cascade='all, delete-orphan'))
+    
+    # Chapter 0 is any text before the first chapter heading
+    number = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(255))
+    
+    # Location in the text file (byte offsets, end exclusive)
+    start_offset = db.Column(db.Integer, nullable=False)
+    end_offset = db.Column(db.Integer, nullable=False)
+    
+    # Statistics
+    word_count = db.Column(db.Integer, default=0)
+    paragraph_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<BookChapter {self.book_id}:{self.number} {self.title}>'
+    
+    def to_dict(self):
+        """Convert chapter to dictionary for API responses."""
+        return {
+            'number': self.number,
+            'title': self.title,
+            'start_offset': self.start_offset,
+            'end_offset': self.end_offset,
+            'word_count': self.word_count,
+            'paragraph_count': self.paragraph_count
+        }
@@ -0,0 +1,71 @@
+import uuid
+from datetime import datetime
+from .. import db
+
+class ImportJob(db.Model):
+    """Model for a queued book import, run by the background worker."""
+    __table_args__ = (
+        # Workers look for the oldest due job in the queue
+        db.Index('ix_import_job_status_next_run_at', 'status', 'next_run_at'),
+    )
+
+    STATUSES = ('queued', 'running', 'succeeded', 'failed')
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    # What to import
+    source = db.Column(db.String(50), nullable=False)
+    identifier = db.Column(db.String(255), nullable=False)
+    batch_id = db.Column(db.String(36), index=True)  # manifest the job was queued from
+
+    # Job state
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    next_run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    progress = db.Column(db.Integer, nullable=False, default=0)  # percent
+    message = db.Column(db.String(255))
+    error = db.Column(db.Text)
+
+    # Worker lease; a running job whose lease is too old is requeued
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+
+    # Result
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'))
+    book = db.relationship('Book')
+
+    requested_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ImportJob {self.id} {self.source}:{self.identifier} {self.status}>'
+
+    @property
+    def is_finished(self):
+        """Whether the job has reached a final state."""
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        """Convert job to dictionary for API responses."""
+        return {
+            'id': self.id,
+            'source': self.source,
+            'identifier': self.identifier,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'book_id': self.book_id,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
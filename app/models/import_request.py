@@ -0,0 +1,51 @@
+import uuid
+from datetime import datetime
+from .. import db
+
+class ImportRequest(db.Model):
+    """Model for a community request to add a book to the library."""
+    __table_args__ = (
+        # One request per book; repeat submissions are pointed at the existing one
+        db.UniqueConstraint('source', 'identifier', name='uq_import_request_source_identifier'),
+    )
+
+    STATUSES = ('pending', 'approved', 'rejected', 'imported')
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    # Requested book
+    source = db.Column(db.String(50), nullable=False)
+    identifier = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    author = db.Column(db.String(255))
+    notes = db.Column(db.Text)
+    email = db.Column(db.String(100))
+
+    # Review state
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    rejection_reason = db.Column(db.Text)
+    book_id = db.Column(db.Integer, db.ForeignKey('book.id'))
+    book = db.relationship('Book')
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ImportRequest {self.id} {self.source}:{self.identifier} {self.status}>'
+
+    def to_dict(self):
+        """Convert import request to dictionary for API responses."""
+        return {
+            'id': self.id,
+            'source': self.source,
+            'identifier': self.identifier,
+            'title': self.title,
+            'author': self.author,
+            'notes': self.notes,
+            'status': self.status,
+            'rejection_reason': self.rejection_reason,
+            'book_id': self.book_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
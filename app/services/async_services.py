@@ -0,0 +1,168 @@
+import asyncio
+import logging
+
+from .standard_ebooks import StandardEbooksService
+from .project_gutenberg import ProjectGutenbergService
+from .internet_archive import InternetArchiveService
+from .wikisource import WikisourceService
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AsyncService:
+    """Base class for the asyncio variants of the source services.
+
+    Each async service wraps a regular service and runs its blocking calls
+    in worker threads with ``asyncio.to_thread``, so a coroutine can await
+    them without blocking the event loop. The requests still go through the
+    shared HTTP client and rate limiter, so running many of them at once
+    overlaps network latency without exceeding a host's request budget.
+    Method names and return values match the wrapped service.
+    """
+
+    SERVICE_CLASS = None
+
+    # Calls run at once by the bulk helpers
+    CONCURRENCY = 4
+
+    def __init__(self, service=None, concurrency=None, **kwargs):
+        """Initialize the async service.
+
+        Args:
+            service: Service instance to wrap; one is created if omitted
+            concurrency: Calls the bulk helpers run at once
+            **kwargs: Passed on to the service class when creating one
+        """
+        self.service = service or self.SERVICE_CLASS(**kwargs)
+        self.concurrency = concurrency or self.CONCURRENCY
+
+    async def _call(self, method, *args, **kwargs):
+        """Run one of the wrapped service's methods in a worker thread."""
+        return await asyncio.to_thread(getattr(self.service, method), *args, **kwargs)
+
+    async def _gather(self, func, items):
+        """Run func over items, at most self.concurrency at a time.
+
+        Args:
+            func: Blocking function taking one item
+            items: Items to process
+
+        Returns:
+            List of results in the order of items; None for calls that raised
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(item):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(func, item)
+                except Exception as e:
+                    logger.error(f"{func.__name__}({item!r}) failed: {str(e)}")
+                    return None
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+    async def get_many_book_details(self, book_ids, use_cache=True):
+        """Get details for several books concurrently.
+
+        Args:
+            book_ids: Identifiers accepted by get_book_details
+            use_cache: Whether to use cached data if available
+
+        Returns:
+            Dictionary mapping each identifier to its details, or None if
+            they could not be fetched
+        """
+        book_ids = list(book_ids)
+        details = await self._gather(
+            lambda book_id: self.service.get_book_details(book_id, use_cache=use_cache),
+            book_ids
+        )
+        return dict(zip(book_ids, details))
+
+    async def search_books(self, *args, **kwargs):
+        """Search for books. See the wrapped service's search_books()."""
+        return await self._call('search_books', *args, **kwargs)
+
+    async def get_book_details(self, *args, **kwargs):
+        """Get details for a book. See the wrapped service's get_book_details()."""
+        return await self._call('get_book_details', *args, **kwargs)
+
+    async def download_book(self, *args, **kwargs):
+        """Download a book. See the wrapped service's download_book()."""
+        return await self._call('download_book', *args, **kwargs)
+
+class AsyncStandardEbooksService(AsyncService):
+    """Async variant of StandardEbooksService."""
+
+    SERVICE_CLASS = StandardEbooksService
+
+    async def get_all_books(self, *args, **kwargs):
+        """Get the whole catalog. See StandardEbooksService.get_all_books()."""
+        return await self._call('get_all_books', *args, **kwargs)
+
+    async def sync_catalog(self, *args, **kwargs):
+        """Update the local catalog mirror. See StandardEbooksService.sync_catalog()."""
+        return await self._call('sync_catalog', *args, **kwargs)
+
+class AsyncProjectGutenbergService(AsyncService):
+    """Async variant of ProjectGutenbergService."""
+
+    SERVICE_CLASS = ProjectGutenbergService
+
+    async def get_popular_fiction(self, *args, **kwargs):
+        """Get popular fiction. See ProjectGutenbergService.get_popular_fiction()."""
+        return await self._call('get_popular_fiction', *args, **kwargs)
+
+    def remove_pg_branding(self, text):
+        """Remove Project Gutenberg branding; pure string work, so not a coroutine."""
+        return self.service.remove_pg_branding(text)
+
+class AsyncInternetArchiveService(AsyncService):
+    """Async variant of InternetArchiveService."""
+
+    SERVICE_CLASS = InternetArchiveService
+
+    async def get_pd_fiction_collections(self, *args, **kwargs):
+        """Get public domain fiction collections. See InternetArchiveService.get_pd_fiction_collections()."""
+        return await self._call('get_pd_fiction_collections', *args, **kwargs)
+
+class AsyncWikisourceService(AsyncService):
+    """Async variant of WikisourceService.
+
+    Multi-section books have their sections fetched concurrently instead of
+    one after another; each fetch still waits for its turn in Wikisource's
+    rate limit.
+    """
+
+    SERVICE_CLASS = WikisourceService
+
+    async def get_featured_works(self, *args, **kwargs):
+        """Get featured works. See WikisourceService.get_featured_works()."""
+        return await self._call('get_featured_works', *args, **kwargs)
+
+    async def download_book(self, title, format='html'):
+        """Download a book from Wikisource.
+
+        Args:
+            title: The Wikisource page title
+            format: The format to download (html, txt)
+
+        Returns:
+            Path to the downloaded file, or None if download failed
+        """
+        title = title.replace(' ', '_')
+
+        book_details = await self.get_book_details(title)
+        if not book_details or not book_details.get('sections'):
+            # Single pages are one request; nothing to parallelize
+            return await self._call('download_book', title, format)
+
+        logger.info(f"Downloading multi-section book: {title}")
+        sections = await self._gather(self.service.fetch_section, book_details['sections'])
+        sections = [
+            result or (section, None, None)
+            for section, result in zip(book_details['sections'], sections)
+        ]
+        return await asyncio.to_thread(self.service.write_sections, title, book_details, sections, format)
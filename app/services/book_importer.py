@@ -0,0 +1,315 @@
+import os
+import re
+import logging
+import zipfile
+from datetime import datetime
+
+from lxml import etree
+
+from .. import db
+from ..models.book import Book
+from ..models.license import License
+from .standard_ebooks import StandardEbooksService
+from .project_gutenberg import ProjectGutenbergService
+from ..utils.text_processor import TextProcessor
+from ..utils.text_index import BookTextIndex
+from ..utils.chapter_index import ChapterIndex
+from ..utils.file_server import BookFileServer
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ImportFailed(Exception):
+    """Raised when a book cannot be imported.
+
+    Attributes:
+        retryable: Whether trying again later might succeed
+    """
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+class BookImporter:
+    """Imports books from the supported sources into the library.
+
+    Downloads the book, extracts its text, writes the text and HTML files,
+    creates the Book record and builds its chapter, search and download
+    artifacts. Used by the background import worker.
+    """
+
+    SOURCES = ('standard_ebooks', 'project_gutenberg')
+
+    # Characters of text read at a time when writing the HTML version
+    HTML_CHUNK_SIZE = 65536
+
+    def __init__(self, standard_ebooks_service=None, project_gutenberg_service=None, text_processor=None):
+        """Initialize the book importer.
+
+        Args:
+            standard_ebooks_service: StandardEbooksService to import from
+            project_gutenberg_service: ProjectGutenbergService to import from
+            text_processor: TextProcessor for text extraction and HTML
+        """
+        self.standard_ebooks_service = standard_ebooks_service or StandardEbooksService()
+        self.project_gutenberg_service = project_gutenberg_service or ProjectGutenbergService()
+        self.text_processor = text_processor or TextProcessor()
+        self.chapter_index = ChapterIndex(self.text_processor)
+        self.text_index = BookTextIndex(self.text_processor)
+        self.file_server = BookFileServer()
+
+    def import_book(self, source, identifier, requested_by=None, progress=None):
+        """Import a book, or return it if it is already in the library.
+
+        Args:
+            source: Source name, e.g. 'project_gutenberg'
+            identifier: Book identifier at the source
+            requested_by: ID of the user who requested the import
+            progress: Optional callback taking (percent, message)
+
+        Returns:
+            The imported or existing Book
+
+        Raises:
+            ImportFailed: If the book could not be imported
+        """
+        if source not in self.SOURCES:
+            raise ImportFailed(f'Unsupported import source: {source}', retryable=False)
+
+        report = progress or (lambda percent, message: None)
+
+        existing_book = Book.query.filter_by(source=source, source_id=identifier).first()
+        if existing_book:
+            report(100, f'Book already exists: {existing_book.title}')
+            return existing_book
+
+        if source == 'standard_ebooks':
+            new_book, chapters = self._import_standard_ebooks(identifier, requested_by, report)
+        else:
+            new_book, chapters = self._import_project_gutenberg(identifier, requested_by, report)
+
+        report(80, 'Indexing')
+        self._finish(new_book, chapters)
+
+        report(100, f'Imported: {new_book.title}')
+        return new_book
+
+    def _import_standard_ebooks(self, url_identifier, requested_by, report):
+        """Download and store a Standard Ebooks book."""
+        report(10, 'Fetching book details')
+        book_details = self.standard_ebooks_service.get_book_details(url_identifier)
+
+        if not book_details:
+            raise ImportFailed('Failed to get book details.')
+
+        # Download the book
+        report(30, 'Downloading')
+        epub_path = self.standard_ebooks_service.download_book(url_identifier, format='epub')
+
+        if not epub_path:
+            raise ImportFailed('Failed to download book.')
+
+        # Extract text from EPUB, writing it out one document at a time
+        report(50, 'Extracting text')
+        base_path = os.path.join(os.path.dirname(epub_path), os.path.basename(epub_path).split('.')[0])
+        text_file_path, html_file_path, chapters = self._write_text_and_html(
+            base_path, self._iter_epub_text(epub_path), book_details
+        )
+
+        license = self._get_or_create_license(
+            name='Creative Commons Zero (CC0)',
+            short_name='CC0',
+            description='Creative Commons Zero - Public Domain Dedication. No rights reserved.',
+            url='https://creativecommons.org/publicdomain/zero/1.0/'
+        )
+
+        # Create book record
+        new_book = Book(
+            title=book_details.get('title', ''),
+            author=book_details.get('author', ''),
+            description=book_details.get('description', ''),
+            source='standard_ebooks',
+            source_id=url_identifier,
+            source_url=book_details.get('url', ''),
+            license_id=license.id,
+            verified=True,
+            verification_notes='Standard Ebooks uses CC0 for all their enhancements.',
+            verified_by=requested_by,
+            verified_at=datetime.utcnow(),
+            epub_file_path=str(epub_path),
+            text_file_path=text_file_path,
+            html_file_path=html_file_path
+        )
+
+        # Extract publication year if available
+        if 'metadata' in book_details and 'publication_date' in book_details['metadata']:
+            new_book.publication_year = self._extract_year(book_details['metadata']['publication_date'])
+
+        return new_book, chapters
+
+    def _import_project_gutenberg(self, book_id, requested_by, report):
+        """Download and store a Project Gutenberg book."""
+        report(10, 'Fetching book details')
+        book_details = self.project_gutenberg_service.get_book_details(book_id)
+
+        if not book_details:
+            raise ImportFailed('Failed to get book details.')
+
+        # Download the book
+        report(30, 'Downloading')
+        epub_path = self.project_gutenberg_service.download_book(book_id, format='epub')
+
+        if not epub_path:
+            # Try text format if EPUB is not available
+            text_path = self.project_gutenberg_service.download_book(book_id, format='txt')
+
+            if not text_path:
+                raise ImportFailed('Failed to download book.')
+
+            report(50, 'Cleaning text')
+            with open(text_path, 'r', encoding='utf-8') as f:
+                text_content = f.read()
+            source_path = text_path
+            epub_path = None
+        else:
+            report(50, 'Extracting text')
+            # Branding removal needs the whole text
+            text_content = ''.join(self._iter_epub_text(epub_path))
+            source_path = epub_path
+
+        # Remove PG branding
+        text_content = self.project_gutenberg_service.remove_pg_branding(text_content)
+
+        base_path = os.path.join(os.path.dirname(source_path), os.path.basename(source_path).split('.')[0])
+        text_file_path, html_file_path, chapters = self._write_text_and_html(base_path, [text_content], book_details)
+
+        license = self._get_or_create_license(
+            name='Public Domain (US)',
+            short_name='PD-US',
+            description='Works in the US public domain (published before 1929). No copyright restrictions in the US.',
+            url='https://en.wikipedia.org/wiki/Public_domain_in_the_United_States'
+        )
+
+        # Create book record
+        new_book = Book(
+            title=book_details.get('title', ''),
+            author=book_details.get('author', ''),
+            description=book_details.get('bibrec', {}).get('subject', ''),
+            source='project_gutenberg',
+            source_id=book_id,
+            source_url=book_details.get('url', ''),
+            license_id=license.id,
+            verified=True,
+            verification_notes='Project Gutenberg text with PG branding removed.',
+            verified_by=requested_by,
+            verified_at=datetime.utcnow(),
+            epub_file_path=str(epub_path) if epub_path else None,
+            text_file_path=text_file_path,
+            html_file_path=html_file_path
+        )
+
+        # Extract publication year if available
+        if 'bibrec' in book_details and 'release_date' in book_details['bibrec']:
+            new_book.publication_year = self._extract_year(book_details['bibrec']['release_date'])
+
+        return new_book, chapters
+
+    def _iter_epub_text(self, epub_path):
+        """Extract and clean an EPUB's text as it is read, one document at a time.
+
+        Raises:
+            ImportFailed: If the EPUB cannot be read
+        """
+        try:
+            yield from self.text_processor.iter_epub_text(epub_path)
+        except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
+            # The download is reused on retry, so a broken EPUB stays broken
+            raise ImportFailed(f'Failed to extract text: {e}', retryable=False)
+
+    def _write_text_and_html(self, base_path, text_chunks, book_details):
+        """Write the text and HTML versions of a book next to its download.
+
+        The text is written as it arrives; the HTML is then converted from
+        the text file in blocks, with chapter anchors from its chapter index.
+
+        Args:
+            base_path: Path of the files without extension
+            text_chunks: Iterable of text chunks making up the book
+            book_details: Book details with the title and author
+
+        Returns:
+            Tuple of (text file path, HTML file path, chapter index)
+        """
+        text_file_path = f"{base_path}.txt"
+        try:
+            with open(text_file_path, 'w', encoding='utf-8') as f:
+                for chunk in text_chunks:
+                    f.write(chunk)
+        except ImportFailed:
+            # Don't leave a truncated text file behind
+            os.remove(text_file_path)
+            raise
+
+        # Handed on to _finish(), so the text is only scanned once
+        chapters = self.chapter_index.build(text_file_path)
+        self.chapter_index.write_sidecar(text_file_path, chapters)
+
+        html_file_path = f"{base_path}.html"
+        with open(text_file_path, 'r', encoding='utf-8', newline='') as text_file, \
+                open(html_file_path, 'w', encoding='utf-8') as f:
+            self.text_processor.write_html(
+                iter(lambda: text_file.read(self.HTML_CHUNK_SIZE), ''),
+                f,
+                title=book_details.get('title', ''),
+                author=book_details.get('author', ''),
+                chapters=chapters
+            )
+
+        return text_file_path, html_file_path, chapters
+
+    def _get_or_create_license(self, name, short_name, description, url):
+        """Get a public domain style license, creating it if needed."""
+        license = License.query.filter_by(short_name=short_name).first()
+        if not license:
+            license = License(
+                name=name,
+                short_name=short_name,
+                description=description,
+                url=url,
+                allows_remix=True,
+                requires_attribution=False,
+                share_alike=False
+            )
+            db.session.add(license)
+            db.session.commit()
+        return license
+
+    def _extract_year(self, date_string):
+        """Extract a four-digit publication year from a date string."""
+        year_match = re.search(r'\b(1[0-9]{3}|20[0-2][0-9])\b', date_string)
+        return int(year_match.group(1)) if year_match else None
+
+    def _finish(self, new_book, chapters):
+        """Save a new book and store its chapter, search and download artifacts."""
+        db.session.add(new_book)
+
+        # Precompute the chapter and paragraph offsets of the text
+        try:
+            self.chapter_index.store(new_book, chapters)
+        except Exception as e:
+            logger.error(f"Failed to build chapter index for {new_book.title}: {str(e)}")
+
+        db.session.commit()
+
+        # Index the book's text for full-text search
+        try:
+            self.text_index.index_book(new_book)
+        except Exception as e:
+            logger.error(f"Failed to index text of book {new_book.id}: {str(e)}")
+
+        # Precompress and hash the stored files for downloads
+        try:
+            self.file_server.prepare_files(new_book)
+        except Exception as e:
+            logger.error(f"Failed to prepare files of book {new_book.id}: {str(e)}")
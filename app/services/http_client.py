@@ -0,0 +1,206 @@
+import os
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    """Shared HTTP client for the source services.
+
+    Keeps one ``requests.Session`` per host, each with its own keep-alive
+    connection pool, so repeated calls to the same site reuse connections
+    instead of paying a TCP and TLS handshake every time. Every request gets
+    a timeout, and responses with a retryable status (429 and 5xx) or
+    connection errors are retried with jittered exponential backoff,
+    honouring ``Retry-After`` when the server sends it. Request counts and
+    latency are kept per host for the admin stats endpoint.
+
+    Timeouts and retries can be configured with the ``HTTP_CONNECT_TIMEOUT``,
+    ``HTTP_READ_TIMEOUT`` and ``HTTP_MAX_RETRIES`` environment variables.
+    """
+
+    USER_AGENT = 'RemixableFictionLibrary/0.5 (+https://github.com/williamrthomas/RemixableFictionLibrary)'
+
+    # Seconds to wait for a connection and between bytes of the response
+    CONNECT_TIMEOUT = 5
+    READ_TIMEOUT = 30
+
+    # Retries after the first attempt
+    MAX_RETRIES = 3
+
+    # Backoff before retry n is up to BACKOFF_BASE * 2**n seconds, capped
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 30
+
+    # Longest Retry-After we are willing to sleep for
+    RETRY_AFTER_MAX = 120
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    # Connections kept open per host
+    POOL_SIZE = 10
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None):
+        """Initialize the HTTP client.
+
+        Args:
+            connect_timeout: Connect timeout in seconds
+            read_timeout: Read timeout in seconds
+            max_retries: Number of retries for failed requests
+        """
+        self.timeout = (
+            connect_timeout or float(os.environ.get('HTTP_CONNECT_TIMEOUT', self.CONNECT_TIMEOUT)),
+            read_timeout or float(os.environ.get('HTTP_READ_TIMEOUT', self.READ_TIMEOUT))
+        )
+        self.max_retries = max_retries if max_retries is not None else int(
+            os.environ.get('HTTP_MAX_RETRIES', self.MAX_RETRIES))
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, url):
+        """Get the pooled session for a URL's host, creating it on first use."""
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    session.headers['User-Agent'] = self.USER_AGENT
+                    # Retries are handled here so they can be counted and honour Retry-After
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.POOL_SIZE, max_retries=0)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._sessions[host] = session
+        return session
+
+    def get(self, url, **kwargs):
+        """Send a GET request. See request()."""
+        return self.request('GET', url, **kwargs)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request, retrying transient failures.
+
+        Args:
+            method: HTTP method
+            url: URL to request
+            timeout: Optional timeout overriding the client default
+            **kwargs: Passed on to ``requests.Session.request``
+
+        Returns:
+            requests.Response; the last one if every retry failed
+
+        Raises:
+            requests.RequestException: If the last attempt failed to connect
+        """
+        host = urlsplit(url).netloc
+        session = self.session_for(url)
+        timeout = timeout or self.timeout
+
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(host, time.monotonic() - started, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            else:
+                self._record(host, time.monotonic() - started, status=response.status_code)
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self.retry_after(response)
+                if delay is None:
+                    delay = self.backoff(attempt)
+                response.close()
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            self._record_retry(host)
+            attempt += 1
+            time.sleep(delay)
+
+    def backoff(self, attempt):
+        """Jittered exponential backoff delay for a retry."""
+        return random.uniform(0, min(self.BACKOFF_BASE * 2 ** attempt, self.BACKOFF_MAX))
+
+    def retry_after(self, response):
+        """Seconds to wait according to a response's Retry-After header.
+
+        Returns:
+            Delay in seconds, or None if the header is missing or invalid
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        try:
+            delay = float(value)
+        except ValueError:
+            try:
+                delay = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+
+        return min(max(delay, 0), self.RETRY_AFTER_MAX)
+
+    def _host_stats(self, host):
+        """Counters for a host; callers must hold the lock."""
+        stats = self._stats.get(host)
+        if stats is None:
+            stats = self._stats[host] = {
+                'requests': 0,
+                'errors': 0,
+                'retries': 0,
+                'statuses': {},
+                'total_seconds': 0.0,
+                'max_seconds': 0.0
+            }
+        return stats
+
+    def _record(self, host, seconds, status=None, error=False):
+        """Record one request attempt."""
+        with self._lock:
+            stats = self._host_stats(host)
+            stats['requests'] += 1
+            stats['total_seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            if error:
+                stats['errors'] += 1
+            else:
+                stats['statuses'][str(status)] = stats['statuses'].get(str(status), 0) + 1
+
+    def _record_retry(self, host):
+        """Record a retry."""
+        with self._lock:
+            self._host_stats(host)['retries'] += 1
+
+    def stats(self):
+        """Per-host request and latency counters for this process.
+
+        Returns:
+            Dictionary mapping host to its counters, including the mean
+            latency in seconds
+        """
+        with self._lock:
+            result = {}
+            for host, stats in self._stats.items():
+                result[host] = dict(stats, statuses=dict(stats['statuses']))
+                result[host]['mean_seconds'] = stats['total_seconds'] / stats['requests'] if stats['requests'] else 0.0
+            return result
+
+# Shared by every service so connection pools are reused across them
+http_client = HttpClient()
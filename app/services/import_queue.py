@@ -0,0 +1,401 @@
+import os
+import uuid
+import socket
+import random
+import logging
+from datetime import datetime, timedelta
+
+from .. import db
+from ..models.book import Book
+from ..models.import_job import ImportJob
+from .book_importer import BookImporter, ImportFailed
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ImportQueue:
+    """Persistent queue of book imports, stored in the ``import_job`` table.
+
+    Web requests only enqueue jobs; one or more worker processes (see
+    ``worker.py``) claim them, run them through ``BookImporter`` and record
+    progress on the job row so the status page can poll it. Failed jobs are
+    retried with exponential backoff, and jobs held by a worker that died
+    are requeued once their lease expires.
+    """
+
+    # Delay before the first retry; doubled for every further attempt
+    RETRY_BASE_DELAY = 30
+
+    # Longest delay between retries
+    RETRY_MAX_DELAY = 3600
+
+    # Seconds after which a running job is assumed abandoned
+    LEASE_TIMEOUT = 900
+
+    # Identifiers looked up per query when queueing a batch
+    BATCH_LOOKUP_SIZE = 500
+
+    def __init__(self, importer=None, worker_id=None):
+        """Initialize the import queue.
+
+        Args:
+            importer: BookImporter used to run jobs
+            worker_id: Name recorded on claimed jobs; defaults to host:pid
+        """
+        self._importer = importer
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def importer(self):
+        """BookImporter, created on first use so web processes don't need one."""
+        if self._importer is None:
+            self._importer = BookImporter()
+        return self._importer
+
+    def enqueue(self, source, identifier, requested_by=None, batch_id=None):
+        """Queue an import, reusing an unfinished job for the same book.
+
+        Args:
+            source: Source name, e.g. 'project_gutenberg'
+            identifier: Book identifier at the source
+            requested_by: ID of the user who requested the import
+            batch_id: Batch the job belongs to, if any
+
+        Returns:
+            The queued (or already pending) ImportJob
+        """
+        # Pasted identifiers often carry stray whitespace
+        identifier = str(identifier).strip()
+
+        job = ImportJob.query.filter(
+            ImportJob.source == source,
+            ImportJob.identifier == identifier,
+            ImportJob.status.in_(('queued', 'running'))
+        ).first()
+
+        if job:
+            return job
+
+        job = ImportJob(source=source, identifier=identifier, requested_by=requested_by,
+                        batch_id=batch_id, message='Waiting for a worker')
+        db.session.add(job)
+        db.session.commit()
+
+        logger.info(f"Queued import job {job.id} for {source}:{identifier}")
+        return job
+
+    def enqueue_batch(self, items, requested_by=None, batch_id=None):
+        """Queue imports for a manifest of books.
+
+        Books already in the library are skipped and books with an
+        unfinished job keep it, so queueing the same manifest again after a
+        crash only adds what is still missing.
+
+        Args:
+            items: Iterable of (source, identifier) pairs
+            requested_by: ID of the user who requested the imports
+            batch_id: Batch to add the jobs to, e.g. one found by find_batch();
+                a new batch is started if not given
+
+        Returns:
+            Dictionary with the batch_id and the number of items queued,
+            already pending, already imported and invalid
+        """
+        batch_id = batch_id or str(uuid.uuid4())
+        by_source, invalid = self._group_items(items)
+        result = {'batch_id': batch_id, 'queued': 0, 'pending': 0, 'imported': 0, 'invalid': invalid}
+
+        for source, identifiers in by_source.items():
+            for i in range(0, len(identifiers), self.BATCH_LOOKUP_SIZE):
+                chunk = identifiers[i:i + self.BATCH_LOOKUP_SIZE]
+
+                imported = {source_id for source_id, in db.session.query(Book.source_id).filter(
+                    Book.source == source, Book.source_id.in_(chunk))}
+                pending = {identifier for identifier, in db.session.query(ImportJob.identifier).filter(
+                    ImportJob.source == source,
+                    ImportJob.identifier.in_(chunk),
+                    ImportJob.status.in_(('queued', 'running')))}
+
+                for identifier in chunk:
+                    if identifier in imported:
+                        result['imported'] += 1
+                    elif identifier in pending:
+                        result['pending'] += 1
+                    else:
+                        db.session.add(ImportJob(source=source, identifier=identifier,
+                                                 requested_by=requested_by, batch_id=batch_id,
+                                                 message='Waiting for a worker'))
+                        result['queued'] += 1
+
+                db.session.commit()
+
+        logger.info(f"Queued batch {batch_id}: {result}")
+        return result
+
+    def find_batch(self, items):
+        """Find the batch an earlier run of a manifest left unfinished.
+
+        Args:
+            items: Iterable of (source, identifier) pairs
+
+        Returns:
+            ID of the latest batch with an unfinished job for one of the
+            items, or None if there is none
+        """
+        by_source, _ = self._group_items(items)
+        latest = None
+
+        for source, identifiers in by_source.items():
+            for i in range(0, len(identifiers), self.BATCH_LOOKUP_SIZE):
+                job = ImportJob.query.filter(
+                    ImportJob.source == source,
+                    ImportJob.identifier.in_(identifiers[i:i + self.BATCH_LOOKUP_SIZE]),
+                    ImportJob.status.in_(('queued', 'running')),
+                    ImportJob.batch_id.isnot(None)
+                ).order_by(ImportJob.created_at.desc()).first()
+                if job and (latest is None or job.created_at > latest.created_at):
+                    latest = job
+
+        return latest.batch_id if latest else None
+
+    def _group_items(self, items):
+        """Group valid manifest items by source, dropping duplicates.
+
+        Returns:
+            Tuple of ({source: [identifier, ...]}, number of invalid items)
+        """
+        by_source = {}
+        invalid = 0
+        for source, identifier in items:
+            identifier = str(identifier).strip() if identifier is not None else ''
+            if source not in BookImporter.SOURCES or not identifier:
+                invalid += 1
+                continue
+            by_source.setdefault(source, {})[identifier] = None
+        return {source: list(identifiers) for source, identifiers in by_source.items()}, invalid
+
+    def batch_status(self, batch_id):
+        """Count a batch's jobs by source and status.
+
+        Args:
+            batch_id: ID returned by enqueue_batch
+
+        Returns:
+            Dictionary mapping source to {status: count}
+        """
+        rows = db.session.query(ImportJob.source, ImportJob.status, db.func.count(ImportJob.id)).filter(
+            ImportJob.batch_id == batch_id
+        ).group_by(ImportJob.source, ImportJob.status)
+
+        status = {}
+        for source, job_status, count in rows:
+            status.setdefault(source, dict.fromkeys(ImportJob.STATUSES, 0))[job_status] = count
+        return status
+
+    def claim(self, sources=None):
+        """Claim the next due job for this worker.
+
+        The claim is a conditional UPDATE on the job's status, so two workers
+        can never claim the same job.
+
+        Args:
+            sources: Optional list of sources to take jobs from
+
+        Returns:
+            The claimed ImportJob, or None if no job is due
+        """
+        while True:
+            now = datetime.utcnow()
+            query = db.session.query(ImportJob.id).filter(
+                ImportJob.status == 'queued',
+                ImportJob.next_run_at <= now
+            )
+            if sources:
+                query = query.filter(ImportJob.source.in_(sources))
+            job_id = query.order_by(ImportJob.next_run_at).limit(1).scalar()
+
+            if job_id is None:
+                return None
+
+            claimed = ImportJob.query.filter_by(id=job_id, status='queued').update({
+                'status': 'running',
+                'locked_by': self.worker_id,
+                'locked_at': now,
+                'attempts': ImportJob.attempts + 1,
+                'message': 'Starting'
+            }, synchronize_session=False)
+            db.session.commit()
+
+            # Another worker got there first; try the next job
+            if claimed:
+                return db.session.get(ImportJob, job_id)
+
+    def run(self, job):
+        """Run a claimed job and record its outcome.
+
+        Args:
+            job: ImportJob claimed by this worker
+
+        Returns:
+            The job, in its new state
+        """
+        logger.info(f"Running import job {job.id} ({job.source}:{job.identifier}), attempt {job.attempts}")
+
+        def report(percent, message):
+            job.progress = percent
+            job.message = message[:255]
+            job.locked_at = datetime.utcnow()
+            db.session.commit()
+
+        try:
+            book = self.importer.import_book(job.source, job.identifier,
+                                             requested_by=job.requested_by, progress=report)
+        except Exception as e:
+            db.session.rollback()
+            # Unexpected errors are often transient upstream failures
+            retryable = e.retryable if isinstance(e, ImportFailed) else True
+            self._fail(job, str(e), retryable)
+            return job
+
+        job.status = 'succeeded'
+        job.book_id = book.id
+        job.progress = 100
+        job.error = None
+        job.finished_at = datetime.utcnow()
+        job.locked_by = None
+        job.locked_at = None
+        db.session.commit()
+
+        logger.info(f"Import job {job.id} succeeded: book {book.id}")
+        return job
+
+    def _fail(self, job, error, retryable):
+        """Schedule a retry for a failed job, or mark it failed for good."""
+        job.error = error
+        job.locked_by = None
+        job.locked_at = None
+
+        if retryable and job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.next_run_at = datetime.utcnow() + timedelta(seconds=self.retry_delay(job.attempts))
+            job.message = f'Attempt {job.attempts} failed; retrying'
+            logger.warning(f"Import job {job.id} failed, retrying at {job.next_run_at}: {error}")
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            job.message = 'Import failed'
+            logger.error(f"Import job {job.id} failed: {error}")
+
+        db.session.commit()
+
+    def retry_delay(self, attempts):
+        """Seconds to wait before retrying after a number of attempts.
+
+        Exponential backoff capped at ``RETRY_MAX_DELAY``, with jitter so
+        jobs that failed together don't all retry together.
+        """
+        delay = min(self.RETRY_BASE_DELAY * 2 ** (attempts - 1), self.RETRY_MAX_DELAY)
+        return random.uniform(delay / 2, delay)
+
+    def requeue_stale(self, timeout=None, batch_id=None, workers=None):
+        """Requeue running jobs whose worker stopped renewing its lease.
+
+        Jobs that have used up their attempts are marked failed instead, so
+        a job that keeps killing its worker is not retried forever.
+
+        Args:
+            timeout: Seconds without a lease renewal after which a job is
+                abandoned; defaults to LEASE_TIMEOUT
+            batch_id: Only requeue jobs of this batch
+            workers: Only requeue jobs held by these worker ids
+
+        Returns:
+            Number of jobs requeued
+        """
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.LEASE_TIMEOUT if timeout is None else timeout)
+        stale = ImportJob.query.filter(
+            ImportJob.status == 'running',
+            ImportJob.locked_at < cutoff
+        )
+        if batch_id is not None:
+            stale = stale.filter(ImportJob.batch_id == batch_id)
+        if workers is not None:
+            stale = stale.filter(ImportJob.locked_by.in_(workers))
+
+        failed = stale.filter(ImportJob.attempts >= ImportJob.max_attempts).update({
+            'status': 'failed',
+            'locked_by': None,
+            'locked_at': None,
+            'finished_at': now,
+            'error': 'The worker stopped responding on the last attempt',
+            'message': 'Import failed'
+        }, synchronize_session=False)
+
+        count = stale.update({
+            'status': 'queued',
+            'locked_by': None,
+            'locked_at': None,
+            'next_run_at': now,
+            'message': 'Requeued after the worker stopped responding'
+        }, synchronize_session=False)
+        db.session.commit()
+
+        if failed:
+            logger.error(f"Failed {failed} abandoned import jobs with no attempts left")
+        if count:
+            logger.warning(f"Requeued {count} abandoned import jobs")
+        return count
+
+    def requeue_orphaned(self, batch_id=None):
+        """Requeue running jobs whose worker process on this host has exited.
+
+        Unlike requeue_stale() this doesn't wait for the lease to expire, so
+        a crashed run can be resumed right away. Workers on other hosts
+        can't be checked and are left to requeue_stale().
+
+        Args:
+            batch_id: Only requeue jobs of this batch
+
+        Returns:
+            Number of jobs requeued
+        """
+        query = db.session.query(ImportJob.locked_by).filter(ImportJob.status == 'running').distinct()
+        if batch_id is not None:
+            query = query.filter(ImportJob.batch_id == batch_id)
+
+        orphaned = [worker_id for worker_id, in query if self._is_orphaned(worker_id)]
+        if not orphaned:
+            return 0
+        return self.requeue_stale(timeout=0, batch_id=batch_id, workers=orphaned)
+
+    def _is_orphaned(self, worker_id):
+        """Whether a host:pid worker id names a process on this host that has exited."""
+        host, _, rest = (worker_id or '').partition(':')
+        pid = rest.split(':', 1)[0]
+        if host != socket.gethostname() or not pid.isdigit():
+            return False
+
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            # Running, but as another user
+            return False
+        return False
+
+    def work(self, sources=None):
+        """Claim and run the next due job.
+
+        Args:
+            sources: Optional list of sources to take jobs from
+
+        Returns:
+            The job that was run, or None if the queue was empty
+        """
+        job = self.claim(sources)
+        if job is None:
+            return None
+        return self.run(job)
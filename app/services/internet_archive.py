@@ -1,12 +1,12 @@
-import os
-import requests
-import json
 import re
-import time
-from datetime import datetime
 from bs4 import BeautifulSoup
 import logging
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from .http_client import http_client
+from ..utils.rate_limiter import rate_limiter
+from ..utils.response_cache import response_cache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -25,31 +25,21 @@ class InternetArchiveService:
     # Internet Archive has rate limiting, so we need to be careful
     REQUEST_DELAY = 1  # seconds between requests
     
-    def __init__(self, cache_dir=None):
+    def __init__(self, cache=None, http=None):
         """Initialize the Internet Archive service.
         
         Args:
-            cache_dir: Directory to cache API responses and downloaded books
+            cache: ResponseCache for API responses; defaults to the shared cache
+            http: HttpClient to make requests with; defaults to the shared client
         """
-        if cache_dir:
-            self.cache_dir = Path(cache_dir)
-        else:
-            self.cache_dir = Path(__file__).parent.parent.parent / "data" / "cache" / "internet_archive"
-        
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.books_dir = Path(__file__).parent.parent.parent / "data" / "books" / "internet_archive"
         self.books_dir.mkdir(parents=True, exist_ok=True)
-        self.last_request_time = 0
+        self.http = http or http_client
+        self.cache = cache or response_cache
     
     def _respect_rate_limit(self):
-        """Ensure we don't exceed rate limits by adding delays between requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.REQUEST_DELAY:
-            time.sleep(self.REQUEST_DELAY - time_since_last_request)
-        
-        self.last_request_time = time.time()
+        """Wait for a turn in this source's request budget, shared by all processes."""
+        rate_limiter.acquire(urlsplit(self.BASE_URL).netloc, 1 / self.REQUEST_DELAY)
     
     def search_books(self, query, use_cache=True, verify_pd=True):
         """Search for books in the Internet Archive.
@@ -62,18 +52,13 @@ class InternetArchiveService:
         Returns:
             List of matching book metadata dictionaries
         """
-        # Create a cache key from the query
-        cache_key = re.sub(r'[^a-zA-Z0-9]', '_', query.lower())
-        cache_file = self.cache_dir / f"search_{cache_key}_pd{verify_pd}.json"
+        cache_key = f"{verify_pd}:{query.lower()}"
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 3 days old
-            if cache_age < 259200:  # 3 days in seconds
-                logger.info(f"Using cached search results for '{query}'")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('internet_archive.search', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached search results for '{query}'")
+            return cached.value
         
         logger.info(f"Searching Internet Archive for '{query}'")
         self._respect_rate_limit()
@@ -95,7 +80,10 @@ class InternetArchiveService:
             'output': 'json'
         }
         
-        response = requests.get(self.SEARCH_URL, params=params)
+        response = self.http.get(self.SEARCH_URL, params=params, headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Search results for '{query}' not modified, using cached copy")
+            return self.cache.revalidated('internet_archive.search', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to search Internet Archive: {response.status_code}")
             return []
@@ -118,8 +106,7 @@ class InternetArchiveService:
                 results.append(book)
             
             # Cache the results
-            with open(cache_file, 'w') as f:
-                json.dump(results, f)
+            self.cache.set('internet_archive.search', cache_key, results, response=response)
             
             return results
         except Exception as e:
@@ -136,22 +123,22 @@ class InternetArchiveService:
         Returns:
             Dictionary with book details including verification information
         """
-        cache_file = self.cache_dir / f"book_{identifier}.json"
+        cache_key = identifier
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info(f"Using cached book details for {identifier}")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('internet_archive.book', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached book details for {identifier}")
+            return cached.value
         
         logger.info(f"Fetching book details for {identifier}")
         self._respect_rate_limit()
         
         # Fetch the metadata
-        response = requests.get(f"{self.METADATA_URL}/{identifier}")
+        response = self.http.get(f"{self.METADATA_URL}/{identifier}", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Book details for {identifier} not modified, using cached copy")
+            return self.cache.revalidated('internet_archive.book', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch book metadata: {response.status_code}")
             return {}
@@ -187,8 +174,7 @@ class InternetArchiveService:
             book_details['license_verification'] = self._verify_license(metadata)
             
             # Cache the results
-            with open(cache_file, 'w') as f:
-                json.dump(book_details, f)
+            self.cache.set('internet_archive.book', cache_key, book_details, response=response)
             
             return book_details
         except Exception as e:
@@ -310,7 +296,7 @@ class InternetArchiveService:
         logger.info(f"Downloading {download_url} to {file_path}")
         self._respect_rate_limit()
         
-        response = requests.get(download_url, stream=True)
+        response = self.http.get(download_url, stream=True)
         if response.status_code != 200:
             logger.error(f"Failed to download book: {response.status_code}")
             return None
@@ -331,16 +317,14 @@ class InternetArchiveService:
         Returns:
             List of collection identifiers and names
         """
-        cache_file = self.cache_dir / "pd_fiction_collections.json"
+        cache_key = 'all'
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 30 days old
-            if cache_age < 2592000:  # 30 days in seconds
+        if use_cache:
+            cached = self.cache.get('internet_archive.collections', cache_key)
+            if cached is not None:
                 logger.info("Using cached PD fiction collections")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+                return cached
         
         logger.info("Fetching public domain fiction collections")
         
@@ -373,7 +357,6 @@ class InternetArchiveService:
         ]
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(collections, f)
+        self.cache.set('internet_archive.collections', cache_key, collections)
         
         return collections
@@ -1,12 +1,13 @@
 import os
-import requests
-import json
 import re
-import time
-from datetime import datetime
 from bs4 import BeautifulSoup
 import logging
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from .http_client import http_client
+from ..utils.rate_limiter import rate_limiter
+from ..utils.response_cache import response_cache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -22,31 +23,21 @@ class ProjectGutenbergService:
     # Project Gutenberg has rate limiting, so we need to be careful
     REQUEST_DELAY = 1  # seconds between requests
     
-    def __init__(self, cache_dir=None):
+    def __init__(self, cache=None, http=None):
         """Initialize the Project Gutenberg service.
         
         Args:
-            cache_dir: Directory to cache API responses and downloaded books
+            cache: ResponseCache for API responses; defaults to the shared cache
+            http: HttpClient to make requests with; defaults to the shared client
         """
-        if cache_dir:
-            self.cache_dir = Path(cache_dir)
-        else:
-            self.cache_dir = Path(__file__).parent.parent.parent / "data" / "cache" / "project_gutenberg"
-        
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.books_dir = Path(__file__).parent.parent.parent / "data" / "books" / "project_gutenberg"
         self.books_dir.mkdir(parents=True, exist_ok=True)
-        self.last_request_time = 0
+        self.http = http or http_client
+        self.cache = cache or response_cache
     
     def _respect_rate_limit(self):
-        """Ensure we don't exceed rate limits by adding delays between requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.REQUEST_DELAY:
-            time.sleep(self.REQUEST_DELAY - time_since_last_request)
-        
-        self.last_request_time = time.time()
+        """Wait for a turn in this source's request budget, shared by all processes."""
+        rate_limiter.acquire(urlsplit(self.BASE_URL).netloc, 1 / self.REQUEST_DELAY)
     
     def search_books(self, query, use_cache=True):
         """Search for books in the Project Gutenberg catalog.
@@ -58,18 +49,13 @@ class ProjectGutenbergService:
         Returns:
             List of matching book metadata dictionaries
         """
-        # Create a cache key from the query
-        cache_key = re.sub(r'[^a-zA-Z0-9]', '_', query.lower())
-        cache_file = self.cache_dir / f"search_{cache_key}.json"
+        cache_key = query.lower()
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info(f"Using cached search results for '{query}'")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('project_gutenberg.search', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached search results for '{query}'")
+            return cached.value
         
         logger.info(f"Searching Project Gutenberg for '{query}'")
         self._respect_rate_limit()
@@ -81,7 +67,10 @@ class ProjectGutenbergService:
             'include_content': 'fiction'  # Focus on fiction
         }
         
-        response = requests.get(self.CATALOG_URL, params=params)
+        response = self.http.get(self.CATALOG_URL, params=params, headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Search results for '{query}' not modified, using cached copy")
+            return self.cache.revalidated('project_gutenberg.search', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to search Project Gutenberg: {response.status_code}")
             return []
@@ -116,8 +105,7 @@ class ProjectGutenbergService:
                 results.append(book)
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(results, f)
+        self.cache.set('project_gutenberg.search', cache_key, results, response=response)
         
         return results
     
@@ -131,22 +119,22 @@ class ProjectGutenbergService:
         Returns:
             Dictionary with book details
         """
-        cache_file = self.cache_dir / f"book_{book_id}.json"
+        cache_key = str(book_id)
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info(f"Using cached book details for {book_id}")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('project_gutenberg.book', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached book details for {book_id}")
+            return cached.value
         
         logger.info(f"Fetching book details for {book_id}")
         self._respect_rate_limit()
         
         # Fetch the book page
-        response = requests.get(f"{self.BOOK_URL}/{book_id}")
+        response = self.http.get(f"{self.BOOK_URL}/{book_id}", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Book details for {book_id} not modified, using cached copy")
+            return self.cache.revalidated('project_gutenberg.book', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch book details: {response.status_code}")
             return {}
@@ -208,8 +196,7 @@ class ProjectGutenbergService:
                         })
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(book_details, f)
+        self.cache.set('project_gutenberg.book', cache_key, book_details, response=response)
         
         return book_details
     
@@ -248,21 +235,106 @@ class ProjectGutenbergService:
         filename = f"{book_id}.{format}"
         file_path = book_dir / filename
         
+        # Reuse a completed earlier download, e.g. when resuming a batch import
+        if file_path.exists():
+            logger.info(f"Using existing download {file_path}")
+            return file_path
+        
         logger.info(f"Downloading {download_url} to {file_path}")
         self._respect_rate_limit()
         
-        response = requests.get(download_url, stream=True)
+        response = self.http.get(download_url, stream=True)
         if response.status_code != 200:
             logger.error(f"Failed to download book: {response.status_code}")
             return None
         
-        with open(file_path, 'wb') as f:
+        # Write to a partial file so an interrupted download is never reused
+        part_path = file_path.with_name(f"{filename}.part")
+        with open(part_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
+        os.replace(part_path, file_path)
         
         logger.info(f"Downloaded {filename} successfully")
         return file_path
     
+    # Every marker the scanner looks for, matched at the start of a line in a
+    # single walk over the text
+    PG_MARKERS = re.compile(
+        r"^(?:"
+        r"(?P<start>\*{3}\s*START OF (?:THE |THIS )?PROJECT GUTENBERG E(?:BOOK|TEXT)[^\n]*)"
+        r"|(?P<end>\*{3}\s*END OF (?:THE |THIS )?PROJECT GUTENBERG E(?:BOOK|TEXT)[^\n]*)"
+        r"|(?P<footer>End of (?:the )?Project Gutenberg|This file should be named|This and all associated files)"
+        r"|(?P<header>The Project Gutenberg e(?:Book|text)|Project Gutenberg's|"
+        r"This eBook is for the use of anyone anywhere|This etext was prepared by)"
+        r")",
+        re.IGNORECASE | re.MULTILINE
+    )
+    PARAGRAPH_BREAK = re.compile(r"\r?\n[ \t]*\r?\n")
+    BLANK = re.compile(r"\s*")
+    
+    # Without an END marker, a footer line only ends the book if it is this
+    # close to the end; earlier mentions are part of the text
+    FOOTER_WINDOW = 32768
+    
+    # Footer lines this close together form one footer block, and a block
+    # this close before the END marker is the closing lines that go with it
+    CLOSING_WINDOW = 1024
+    
+    def find_pg_body(self, text_content):
+        """Locate the book's text between the Project Gutenberg header and footer.
+        
+        The text is scanned once for the ``*** START OF`` / ``*** END OF``
+        delimiters and for the header and footer lines older files use
+        instead. Header paragraphs are only skipped at the top of the text
+        and footer lines only end it near the bottom, so mentions of
+        Project Gutenberg inside the book are left alone.
+        
+        Args:
+            text_content: The text content of the book
+            
+        Returns:
+            Tuple of (start, end) offsets of the body, with surrounding
+            whitespace excluded
+        """
+        length = len(text_content)
+        start, end = 0, length
+        footer = footer_end = None
+        
+        for match in self.PG_MARKERS.finditer(text_content):
+            kind = match.lastgroup
+            if match.start() < start:
+                # Inside a header paragraph that was already skipped
+                continue
+            
+            if kind == 'start':
+                start = match.end()
+                footer = None
+            elif kind == 'end':
+                end = match.start()
+                if footer is not None and end - footer_end <= self.CLOSING_WINDOW:
+                    end = footer
+                break
+            elif kind == 'footer':
+                # Keep the start of the last block of footer lines
+                if footer is None or match.start() - footer_end > self.CLOSING_WINDOW:
+                    footer = match.start()
+                footer_end = match.end()
+            elif self.BLANK.fullmatch(text_content, start, match.start()):
+                # Header paragraph at the top of the text
+                paragraph_end = self.PARAGRAPH_BREAK.search(text_content, match.end())
+                start = paragraph_end.end() if paragraph_end else length
+        else:
+            if footer is not None and length - footer <= self.FOOTER_WINDOW:
+                end = footer
+        
+        while start < end and text_content[start].isspace():
+            start += 1
+        while end > start and text_content[end - 1].isspace():
+            end -= 1
+        
+        return start, end
+    
     def remove_pg_branding(self, text_content):
         """Remove Project Gutenberg branding from text content.
         
@@ -274,31 +346,8 @@ class ProjectGutenbergService:
         Returns:
             Text content with PG branding removed
         """
-        # Common patterns for PG headers and footers
-        pg_header_patterns = [
-            r"The Project Gutenberg eBook.*?\n\n",
-            r"Project Gutenberg's.*?\n\n",
-            r"This eBook is for the use of anyone anywhere.*?electronic works\.",
-            r"This etext was prepared by.*?\n\n"
-        ]
-        
-        pg_footer_patterns = [
-            r"End of the Project Gutenberg EBook.*",
-            r"End of Project Gutenberg's.*",
-            r"This file should be named.*",
-            r"This and all associated files.*",
-            r"\*\*\*END OF THE PROJECT GUTENBERG EBOOK.*"
-        ]
-        
-        # Remove headers
-        for pattern in pg_header_patterns:
-            text_content = re.sub(pattern, "", text_content, flags=re.DOTALL | re.IGNORECASE)
-        
-        # Remove footers
-        for pattern in pg_footer_patterns:
-            text_content = re.sub(pattern, "", text_content, flags=re.DOTALL | re.IGNORECASE)
-        
-        return text_content.strip()
+        start, end = self.find_pg_body(text_content)
+        return text_content[start:end]
     
     def get_popular_fiction(self, count=20, use_cache=True):
         """Get a list of popular fiction books from Project Gutenberg.
@@ -310,22 +359,22 @@ class ProjectGutenbergService:
         Returns:
             List of popular book metadata dictionaries
         """
-        cache_file = self.cache_dir / f"popular_fiction_{count}.json"
+        cache_key = str(count)
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 1 day old
-            if cache_age < 86400:  # 24 hours in seconds
-                logger.info(f"Using cached popular fiction list")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('project_gutenberg.popular', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached popular fiction list")
+            return cached.value
         
         logger.info(f"Fetching popular fiction from Project Gutenberg")
         self._respect_rate_limit()
         
         # Fetch the popular books page
-        response = requests.get(f"{self.BASE_URL}/browse/scores/top")
+        response = self.http.get(f"{self.BASE_URL}/browse/scores/top", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info("Popular fiction list not modified, using cached copy")
+            return self.cache.revalidated('project_gutenberg.popular', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch popular books: {response.status_code}")
             return []
@@ -361,7 +410,6 @@ class ProjectGutenbergService:
                     break
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(results, f)
+        self.cache.set('project_gutenberg.popular', cache_key, results, response=response)
         
         return results
@@ -1,10 +1,15 @@
 import os
-import requests
-import json
-from datetime import datetime
+import time
 from bs4 import BeautifulSoup
+from lxml import etree
 import logging
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from .http_client import http_client
+from ..utils.rate_limiter import rate_limiter
+from ..utils.response_cache import response_cache
+from ..utils.catalog_mirror import catalog_mirror
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -17,20 +22,29 @@ class StandardEbooksService:
     EBOOKS_URL = f"{BASE_URL}/ebooks"
     API_URL = f"{BASE_URL}/opds"
     
-    def __init__(self, cache_dir=None):
+    # XML namespace of the OPDS (Atom) feed
+    ATOM = '{http://www.w3.org/2005/Atom}'
+    
+    # Be polite to Standard Ebooks when crawling or importing in bulk
+    REQUEST_DELAY = 1  # seconds between requests
+    
+    def __init__(self, cache=None, http=None, catalog=None):
         """Initialize the Standard Ebooks service.
         
         Args:
-            cache_dir: Directory to cache API responses and downloaded books
+            cache: ResponseCache for API responses; defaults to the shared cache
+            http: HttpClient to make requests with; defaults to the shared client
+            catalog: CatalogMirror to search; defaults to the shared mirror
         """
-        if cache_dir:
-            self.cache_dir = Path(cache_dir)
-        else:
-            self.cache_dir = Path(__file__).parent.parent.parent / "data" / "cache" / "standard_ebooks"
-        
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.books_dir = Path(__file__).parent.parent.parent / "data" / "books" / "standard_ebooks"
         self.books_dir.mkdir(parents=True, exist_ok=True)
+        self.http = http or http_client
+        self.cache = cache or response_cache
+        self.catalog = catalog or catalog_mirror
+    
+    def _respect_rate_limit(self):
+        """Wait for a turn in this source's request budget, shared by all processes."""
+        rate_limiter.acquire(urlsplit(self.BASE_URL).netloc, 1 / self.REQUEST_DELAY)
     
     def get_all_books(self, use_cache=True):
         """Get all books from Standard Ebooks.
@@ -41,66 +55,130 @@ class StandardEbooksService:
         Returns:
             List of book metadata dictionaries
         """
-        cache_file = self.cache_dir / "all_books.json"
+        cache_key = 'all'
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 1 day old
-            if cache_age < 86400:  # 24 hours in seconds
-                logger.info("Using cached Standard Ebooks catalog")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('standard_ebooks.catalog', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info("Using cached Standard Ebooks catalog")
+            return cached.value
         
         logger.info("Fetching Standard Ebooks catalog")
         
         # Fetch the OPDS feed
-        response = requests.get(self.API_URL)
+        self._respect_rate_limit()
+        response = self.http.get(self.API_URL, headers=self.cache.conditional_headers(cached), stream=True)
+        if response.status_code == 304 and cached:
+            response.close()
+            logger.info("Standard Ebooks catalog not modified, using cached copy")
+            return self.cache.revalidated('standard_ebooks.catalog', cache_key, cached)
         if response.status_code != 200:
+            response.close()
             logger.error(f"Failed to fetch Standard Ebooks catalog: {response.status_code}")
             return []
         
-        # Parse the XML feed
-        soup = BeautifulSoup(response.content, 'lxml-xml')
-        entries = soup.find_all('entry')
-        
-        books = []
-        for entry in entries:
-            # Skip non-book entries
-            if not entry.find('link', {'type': 'application/epub+zip'}):
-                continue
-                
-            book = {
-                'title': entry.find('title').text if entry.find('title') else '',
-                'author': entry.find('author').find('name').text if entry.find('author') else '',
-                'id': entry.find('id').text if entry.find('id') else '',
-                'updated': entry.find('updated').text if entry.find('updated') else '',
-                'summary': entry.find('summary').text if entry.find('summary') else '',
-                'content': entry.find('content').text if entry.find('content') else '',
-                'links': [
-                    {
-                        'href': link['href'],
-                        'type': link['type'],
-                        'rel': link.get('rel', '')
-                    }
-                    for link in entry.find_all('link')
-                ]
-            }
-            
-            # Extract the URL identifier
-            for link in book['links']:
-                if link['type'] == 'text/html' and link['rel'] == 'alternate':
-                    book['url_identifier'] = link['href'].replace(self.BASE_URL, '')
-                    break
-            
-            books.append(book)
+        # Entries not updated since the last sync are reused instead of re-parsed
+        known = {book['id']: book for book in cached.value} if cached else {}
+        
+        # Parse the feed as it downloads rather than holding it all in memory
+        response.raw.decode_content = True
+        try:
+            books = list(self.iter_catalog(response.raw, known))
+        except etree.XMLSyntaxError as e:
+            logger.error(f"Failed to parse Standard Ebooks catalog: {str(e)}")
+            return []
+        finally:
+            response.close()
+        
+        changed = sum(1 for book in books if known.get(book['id']) is not book)
+        logger.info(f"Synced Standard Ebooks catalog: {len(books)} books, {changed} new or updated")
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(books, f)
+        self.cache.set('standard_ebooks.catalog', cache_key, books, response=response)
         
         return books
     
+    def iter_catalog(self, feed, known=None):
+        """Stream books out of an OPDS feed, one entry at a time.
+        
+        Each entry is freed as soon as it has been read, so memory use stays
+        flat however large the feed is.
+        
+        Args:
+            feed: Path or file-like object with the feed XML
+            known: Optional dictionary of book id to a book from an earlier
+                sync; entries whose updated timestamp has not changed yield
+                that book instead of being parsed again
+            
+        Yields:
+            Book metadata dictionaries, in feed order
+        """
+        known = known or {}
+        
+        for _, element in etree.iterparse(feed, events=('end',), tag=f'{self.ATOM}entry'):
+            try:
+                book = self._parse_entry(element, known)
+            finally:
+                # Free the entry and the already processed siblings before it
+                element.clear(keep_tail=True)
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+            
+            if book is not None:
+                yield book
+    
+    def _parse_entry(self, entry, known):
+        """Convert an OPDS entry element to a book dictionary.
+        
+        Args:
+            entry: The entry element
+            known: Dictionary of book id to previously synced books
+            
+        Returns:
+            Book metadata dictionary, or None for non-book entries
+        """
+        atom = self.ATOM
+        links = entry.findall(f'{atom}link')
+        
+        # Skip non-book entries
+        if not any(link.get('type') == 'application/epub+zip' for link in links):
+            return None
+        
+        book_id = entry.findtext(f'{atom}id', '')
+        updated = entry.findtext(f'{atom}updated', '')
+        previous = known.get(book_id)
+        if previous is not None and updated and previous.get('updated') == updated:
+            return previous
+        
+        author = entry.find(f'{atom}author')
+        summary = entry.find(f'{atom}summary')
+        content = entry.find(f'{atom}content')
+        
+        book = {
+            'title': entry.findtext(f'{atom}title', ''),
+            'author': author.findtext(f'{atom}name', '') if author is not None else '',
+            'id': book_id,
+            'updated': updated,
+            'summary': ''.join(summary.itertext()) if summary is not None else '',
+            'content': ''.join(content.itertext()) if content is not None else '',
+            'links': [
+                {
+                    'href': link.get('href'),
+                    'type': link.get('type'),
+                    'rel': link.get('rel', '')
+                }
+                for link in links
+            ]
+        }
+        
+        # Extract the URL identifier
+        for link in book['links']:
+            if link['type'] == 'text/html' and link['rel'] == 'alternate':
+                book['url_identifier'] = link['href'].replace(self.BASE_URL, '')
+                break
+        
+        return book
+    
     def get_book_details(self, url_identifier, use_cache=True):
         """Get detailed information about a specific book.
         
@@ -115,21 +193,22 @@ class StandardEbooksService:
         if url_identifier.startswith(self.BASE_URL):
             url_identifier = url_identifier.replace(self.BASE_URL, '')
         
-        cache_file = self.cache_dir / f"book_{url_identifier.replace('/', '_')}.json"
+        cache_key = url_identifier
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info(f"Using cached book details for {url_identifier}")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('standard_ebooks.book', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached book details for {url_identifier}")
+            return cached.value
         
         logger.info(f"Fetching book details for {url_identifier}")
         
         # Fetch the book page
-        response = requests.get(f"{self.BASE_URL}{url_identifier}")
+        self._respect_rate_limit()
+        response = self.http.get(f"{self.BASE_URL}{url_identifier}", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Book details for {url_identifier} not modified, using cached copy")
+            return self.cache.revalidated('standard_ebooks.book', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch book details: {response.status_code}")
             return {}
@@ -167,8 +246,7 @@ class StandardEbooksService:
                     book_details['metadata'][key] = dd.text.strip()
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(book_details, f)
+        self.cache.set('standard_ebooks.book', cache_key, book_details, response=response)
         
         return book_details
     
@@ -207,15 +285,24 @@ class StandardEbooksService:
         filename = download_url.split('/')[-1]
         file_path = book_dir / filename
         
+        # Reuse a completed earlier download, e.g. when resuming a batch import
+        if file_path.exists():
+            logger.info(f"Using existing download {file_path}")
+            return file_path
+        
         logger.info(f"Downloading {download_url} to {file_path}")
-        response = requests.get(download_url, stream=True)
+        self._respect_rate_limit()
+        response = self.http.get(download_url, stream=True)
         if response.status_code != 200:
             logger.error(f"Failed to download book: {response.status_code}")
             return None
         
-        with open(file_path, 'wb') as f:
+        # Write to a partial file so an interrupted download is never reused
+        part_path = file_path.with_name(f"{filename}.part")
+        with open(part_path, 'wb') as f:
             for chunk in response.iter_content(chunk_size=8192):
                 f.write(chunk)
+        os.replace(part_path, file_path)
         
         logger.info(f"Downloaded {filename} successfully")
         return file_path
@@ -223,24 +310,35 @@ class StandardEbooksService:
     def search_books(self, query):
         """Search for books in the Standard Ebooks catalog.
         
+        Searches the local catalog mirror, syncing it from the OPDS feed
+        first if it is older than the cached catalog's time to live.
+        
         Args:
             query: Search query string
             
         Returns:
-            List of matching book metadata dictionaries
+            List of matching book metadata dictionaries, best match first
         """
-        # Get all books first
-        all_books = self.get_all_books()
+        self.sync_catalog()
+        return self.catalog.search('standard_ebooks', query)
+    
+    def sync_catalog(self, force=False):
+        """Update the local catalog mirror from the OPDS feed if it is out of date.
         
-        # Simple search implementation - could be improved with better text matching
-        query = query.lower()
-        results = []
+        Args:
+            force: Sync even if the mirror is still fresh
+            
+        Returns:
+            True if the mirror was synced
+        """
+        synced_at = self.catalog.synced_at('standard_ebooks')
+        if not force and synced_at and time.time() - synced_at < self.cache.ttl('standard_ebooks.catalog'):
+            return False
         
-        for book in all_books:
-            # Search in title and author
-            if (query in book.get('title', '').lower() or 
-                query in book.get('author', '').lower() or
-                query in book.get('summary', '').lower()):
-                results.append(book)
+        books = self.get_all_books()
+        if not books:
+            # Keep the previous mirror rather than emptying it on a failed fetch
+            return False
         
-        return results
+        self.catalog.sync('standard_ebooks', books)
+        return True
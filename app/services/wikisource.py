@@ -1,12 +1,11 @@
-import os
-import requests
-import json
-import re
-import time
-from datetime import datetime
 from bs4 import BeautifulSoup
 import logging
 from pathlib import Path
+from urllib.parse import urlsplit
+
+from .http_client import http_client
+from ..utils.rate_limiter import rate_limiter
+from ..utils.response_cache import response_cache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -24,31 +23,21 @@ class WikisourceService:
     # Wikisource has rate limiting, so we need to be careful
     REQUEST_DELAY = 1  # seconds between requests
     
-    def __init__(self, cache_dir=None):
+    def __init__(self, cache=None, http=None):
         """Initialize the Wikisource service.
         
         Args:
-            cache_dir: Directory to cache API responses and downloaded content
+            cache: ResponseCache for API responses; defaults to the shared cache
+            http: HttpClient to make requests with; defaults to the shared client
         """
-        if cache_dir:
-            self.cache_dir = Path(cache_dir)
-        else:
-            self.cache_dir = Path(__file__).parent.parent.parent / "data" / "cache" / "wikisource"
-        
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.books_dir = Path(__file__).parent.parent.parent / "data" / "books" / "wikisource"
         self.books_dir.mkdir(parents=True, exist_ok=True)
-        self.last_request_time = 0
+        self.http = http or http_client
+        self.cache = cache or response_cache
     
     def _respect_rate_limit(self):
-        """Ensure we don't exceed rate limits by adding delays between requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.REQUEST_DELAY:
-            time.sleep(self.REQUEST_DELAY - time_since_last_request)
-        
-        self.last_request_time = time.time()
+        """Wait for a turn in this source's request budget, shared by all processes."""
+        rate_limiter.acquire(urlsplit(self.BASE_URL).netloc, 1 / self.REQUEST_DELAY)
     
     def search_books(self, query, use_cache=True):
         """Search for books in Wikisource.
@@ -60,18 +49,13 @@ class WikisourceService:
         Returns:
             List of matching book metadata dictionaries
         """
-        # Create a cache key from the query
-        cache_key = re.sub(r'[^a-zA-Z0-9]', '_', query.lower())
-        cache_file = self.cache_dir / f"search_{cache_key}.json"
+        cache_key = query.lower()
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 3 days old
-            if cache_age < 259200:  # 3 days in seconds
-                logger.info(f"Using cached search results for '{query}'")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('wikisource.search', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached search results for '{query}'")
+            return cached.value
         
         logger.info(f"Searching Wikisource for '{query}'")
         self._respect_rate_limit()
@@ -86,7 +70,10 @@ class WikisourceService:
             'format': 'json'
         }
         
-        response = requests.get(self.API_URL, params=params)
+        response = self.http.get(self.API_URL, params=params, headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Search results for '{query}' not modified, using cached copy")
+            return self.cache.revalidated('wikisource.search', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to search Wikisource: {response.status_code}")
             return []
@@ -111,8 +98,7 @@ class WikisourceService:
                 results.append(book)
             
             # Cache the results
-            with open(cache_file, 'w') as f:
-                json.dump(results, f)
+            self.cache.set('wikisource.search', cache_key, results, response=response)
             
             return results
         except Exception as e:
@@ -132,22 +118,22 @@ class WikisourceService:
         # Normalize the title
         title = title.replace(' ', '_')
         
-        cache_file = self.cache_dir / f"book_{title}.json"
+        cache_key = title
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info(f"Using cached book details for {title}")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('wikisource.book', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info(f"Using cached book details for {title}")
+            return cached.value
         
         logger.info(f"Fetching book details for {title}")
         self._respect_rate_limit()
         
         # Fetch the book page
-        response = requests.get(f"{self.BASE_URL}/wiki/{title}")
+        response = self.http.get(f"{self.BASE_URL}/wiki/{title}", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info(f"Book details for {title} not modified, using cached copy")
+            return self.cache.revalidated('wikisource.book', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch book details: {response.status_code}")
             return {}
@@ -210,8 +196,7 @@ class WikisourceService:
                 book_details['license'] = 'US PD'
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(book_details, f)
+        self.cache.set('wikisource.book', cache_key, book_details, response=response)
         
         return book_details
     
@@ -242,73 +227,8 @@ class WikisourceService:
         if book_details.get('sections', []):
             # This is an index page, we need to download all sections
             logger.info(f"Downloading multi-section book: {title}")
-            
-            # Create an index file
-            index_path = book_dir / f"{title}_index.html"
-            with open(index_path, 'w', encoding='utf-8') as f:
-                f.write(f"<html><head><title>{book_details['title']}</title></head><body>\n")
-                f.write(f"<h1>{book_details['title']}</h1>\n")
-                
-                if 'author' in book_details:
-                    f.write(f"<p>Author: {book_details['author']}</p>\n")
-                
-                f.write("<h2>Contents</h2>\n<ul>\n")
-                
-                # Download each section
-                all_content = ""
-                for i, section in enumerate(book_details['sections']):
-                    section_title = section['title']
-                    section_url = section['url']
-                    
-                    # Extract the page title from the URL
-                    section_page = section_url.split('/')[-1]
-                    
-                    f.write(f'<li><a href="{section_page}.html">{section_title}</a></li>\n')
-                    
-                    # Download the section content
-                    self._respect_rate_limit()
-                    response = requests.get(section_url)
-                    if response.status_code == 200:
-                        section_soup = BeautifulSoup(response.content, 'lxml')
-                        content_div = section_soup.select_one('#mw-content-text')
-                        
-                        if content_div:
-                            # Remove edit links, reference numbers, etc.
-                            for element in content_div.select('.mw-editsection, .reference'):
-                                element.decompose()
-                            
-                            section_content = content_div.text.strip()
-                            
-                            # Save the section content
-                            section_path = book_dir / f"{section_page}.html"
-                            with open(section_path, 'w', encoding='utf-8') as section_file:
-                                section_file.write(f"<html><head><title>{section_title}</title></head><body>\n")
-                                section_file.write(f"<h1>{section_title}</h1>\n")
-                                section_file.write(f"<div>{content_div.decode_contents()}</div>\n")
-                                section_file.write(f'<p><a href="{title}_index.html">Back to index</a></p>\n')
-                                section_file.write("</body></html>")
-                            
-                            all_content += f"\n\n{section_title}\n\n{section_content}"
-                    else:
-                        logger.error(f"Failed to download section {section_title}: {response.status_code}")
-                
-                f.write("</ul>\n")
-                f.write("<p>License: CC BY-SA 3.0</p>\n")
-                f.write("<p>Source: Wikisource</p>\n")
-                f.write("</body></html>")
-            
-            # Also save a text version if requested
-            if format.lower() == 'txt':
-                txt_path = book_dir / f"{title}.txt"
-                with open(txt_path, 'w', encoding='utf-8') as f:
-                    f.write(f"{book_details['title']}\n\n")
-                    if 'author' in book_details:
-                        f.write(f"Author: {book_details['author']}\n\n")
-                    f.write(all_content)
-                
-                return txt_path
-            
-            return index_path
+            sections = [self.fetch_section(section) for section in book_details['sections']]
+            return self.write_sections(title, book_details, sections, format)
         else:
             # This is a content page
             if format.lower() == 'html':
@@ -337,6 +257,100 @@ class WikisourceService:
             logger.info(f"Downloaded {title} successfully")
             return file_path
     
+    def fetch_section(self, section):
+        """Download and clean the content of one section of a multi-section book.
+        
+        Args:
+            section: Section dictionary with title and url
+            
+        Returns:
+            Tuple of (section, content HTML, content text); the content is
+            None if the section could not be downloaded
+        """
+        self._respect_rate_limit()
+        response = self.http.get(section['url'])
+        if response.status_code != 200:
+            logger.error(f"Failed to download section {section['title']}: {response.status_code}")
+            return section, None, None
+        
+        section_soup = BeautifulSoup(response.content, 'lxml')
+        content_div = section_soup.select_one('#mw-content-text')
+        if not content_div:
+            return section, None, None
+        
+        # Remove edit links, reference numbers, etc.
+        for element in content_div.select('.mw-editsection, .reference'):
+            element.decompose()
+        
+        return section, content_div.decode_contents(), content_div.text.strip()
+    
+    def write_sections(self, title, book_details, sections, format='html'):
+        """Write the index and section files of a multi-section book.
+        
+        Args:
+            title: The normalized Wikisource page title
+            book_details: Book details from get_book_details
+            sections: Results of fetch_section, in reading order
+            format: The format to download (html, txt)
+            
+        Returns:
+            Path to the index file, or to the text file for txt
+        """
+        book_dir = self.books_dir / title
+        book_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Create an index file
+        index_path = book_dir / f"{title}_index.html"
+        all_content = ""
+        with open(index_path, 'w', encoding='utf-8') as f:
+            f.write(f"<html><head><title>{book_details['title']}</title></head><body>\n")
+            f.write(f"<h1>{book_details['title']}</h1>\n")
+            
+            if 'author' in book_details:
+                f.write(f"<p>Author: {book_details['author']}</p>\n")
+            
+            f.write("<h2>Contents</h2>\n<ul>\n")
+            
+            for section, content_html, content_text in sections:
+                section_title = section['title']
+                
+                # Extract the page title from the URL
+                section_page = section['url'].split('/')[-1]
+                
+                f.write(f'<li><a href="{section_page}.html">{section_title}</a></li>\n')
+                
+                if content_html is None:
+                    continue
+                
+                # Save the section content
+                section_path = book_dir / f"{section_page}.html"
+                with open(section_path, 'w', encoding='utf-8') as section_file:
+                    section_file.write(f"<html><head><title>{section_title}</title></head><body>\n")
+                    section_file.write(f"<h1>{section_title}</h1>\n")
+                    section_file.write(f"<div>{content_html}</div>\n")
+                    section_file.write(f'<p><a href="{title}_index.html">Back to index</a></p>\n')
+                    section_file.write("</body></html>")
+                
+                all_content += f"\n\n{section_title}\n\n{content_text}"
+            
+            f.write("</ul>\n")
+            f.write("<p>License: CC BY-SA 3.0</p>\n")
+            f.write("<p>Source: Wikisource</p>\n")
+            f.write("</body></html>")
+        
+        # Also save a text version if requested
+        if format.lower() == 'txt':
+            txt_path = book_dir / f"{title}.txt"
+            with open(txt_path, 'w', encoding='utf-8') as f:
+                f.write(f"{book_details['title']}\n\n")
+                if 'author' in book_details:
+                    f.write(f"Author: {book_details['author']}\n\n")
+                f.write(all_content)
+            
+            return txt_path
+        
+        return index_path
+    
     def get_featured_works(self, use_cache=True):
         """Get a list of featured works from Wikisource.
         
@@ -346,22 +360,22 @@ class WikisourceService:
         Returns:
             List of featured work metadata dictionaries
         """
-        cache_file = self.cache_dir / "featured_works.json"
+        cache_key = 'all'
         
         # Check cache first if enabled
-        if use_cache and cache_file.exists():
-            cache_age = datetime.now().timestamp() - cache_file.stat().st_mtime
-            # Use cache if less than 7 days old
-            if cache_age < 604800:  # 7 days in seconds
-                logger.info("Using cached featured works")
-                with open(cache_file, 'r') as f:
-                    return json.load(f)
+        cached = self.cache.lookup('wikisource.featured', cache_key) if use_cache else None
+        if cached and cached.fresh:
+            logger.info("Using cached featured works")
+            return cached.value
         
         logger.info("Fetching featured works from Wikisource")
         self._respect_rate_limit()
         
         # Fetch the featured works page
-        response = requests.get(f"{self.BASE_URL}/wiki/Wikisource:Featured_texts")
+        response = self.http.get(f"{self.BASE_URL}/wiki/Wikisource:Featured_texts", headers=self.cache.conditional_headers(cached))
+        if response.status_code == 304 and cached:
+            logger.info("Featured works not modified, using cached copy")
+            return self.cache.revalidated('wikisource.featured', cache_key, cached)
         if response.status_code != 200:
             logger.error(f"Failed to fetch featured works: {response.status_code}")
             return []
@@ -388,7 +402,6 @@ class WikisourceService:
                     })
         
         # Cache the results
-        with open(cache_file, 'w') as f:
-            json.dump(results, f)
+        self.cache.set('wikisource.featured', cache_key, results, response=response)
         
         return results
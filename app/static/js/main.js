@@ -120,7 +120,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const query = this.value.trim();
             if (query.length < 3) return;
 
-            fetch(`/api/search?q=${encodeURIComponent(query)}`)
+            fetch(`/api/search?q=${encodeURIComponent(query)}&limit=8&fields=id,title,author`)
                 .then(response => response.json())
                 .then(data => {
                     // Handle autocomplete suggestions
@@ -0,0 +1,99 @@
+import os
+import logging
+from functools import lru_cache
+
+from .text_processor import TextProcessor
+from .chapter_index import ChapterIndex
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class BookReader:
+    """Serves a book's text one page at a time.
+
+    Pages start at chapter boundaries from the book's ``ChapterIndex`` and,
+    for long chapters, at the first paragraph that begins more than
+    ``PAGE_BYTES`` into the page. Each page is described by its byte offsets
+    in the text file, so serving it is a single positioned read of that
+    range.
+    """
+
+    # Target page size; pages are cut at the first paragraph break past this
+    PAGE_BYTES = 32 * 1024
+
+    def __init__(self, text_processor=None):
+        """Initialize the book reader.
+
+        Args:
+            text_processor: TextProcessor used for chapter detection
+        """
+        self.text_processor = text_processor or TextProcessor()
+        self.chapter_index = ChapterIndex(self.text_processor)
+
+    def get_pages(self, text_file_path):
+        """Get the page table for a text file.
+
+        Tables are cached per file, keyed on size and modification time so
+        a rewritten file gets a fresh table.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Returns:
+            List of page dictionaries with number, chapter, title, start and
+            end (byte offsets, end exclusive)
+        """
+        stat = os.stat(text_file_path)
+        return _cached_pages(self, str(text_file_path), stat.st_size, stat.st_mtime_ns)
+
+    def build_pages(self, text_file_path):
+        """Build the page table for a text file from its chapter index.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Returns:
+            List of page dictionaries with number, chapter, title, start and
+            end (byte offsets, end exclusive)
+        """
+        pages = []
+
+        for chapter in self.chapter_index.load_or_build(text_file_path):
+            page_start = chapter['start']
+
+            for paragraph_start in chapter['paragraphs'][1:]:
+                if paragraph_start - page_start >= self.PAGE_BYTES:
+                    pages.append(self._page(pages, chapter, page_start, paragraph_start))
+                    page_start = paragraph_start
+
+            pages.append(self._page(pages, chapter, page_start, chapter['end']))
+
+        return pages
+
+    def _page(self, pages, chapter, start, end):
+        """Page dictionary for the next page of a chapter."""
+        return {
+            'number': len(pages) + 1,
+            'chapter': chapter['number'],
+            'title': chapter['title'],
+            'start': start,
+            'end': end
+        }
+
+    def read_page(self, text_file_path, page):
+        """Read the text of a single page.
+
+        Args:
+            text_file_path: Path to the book's text file
+            page: Page dictionary from get_pages
+
+        Returns:
+            Page text
+        """
+        return self.chapter_index.read_range(text_file_path, page['start'], page['end']).strip()
+
+@lru_cache(maxsize=128)
+def _cached_pages(reader, text_file_path, size, mtime_ns):
+    """Page table cache shared by all readers."""
+    return reader.build_pages(text_file_path)
@@ -0,0 +1,316 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def fold(text):
+    """Lowercase text and strip accents, so "Brontë" and "bronte" compare equal."""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+def normalize_author(name):
+    """Normalize an author name for matching.
+
+    Accents, punctuation and case are dropped and "Last, First" is turned
+    around, so "Austen, Jane", "Jane Austen" and "JANE AUSTEN" all give
+    "jane austen".
+
+    Args:
+        name: Author name as given by the source
+
+    Returns:
+        Normalized name
+    """
+    name = fold(name)
+    if name.count(',') == 1:
+        last, first = name.split(',')
+        name = f'{first} {last}'
+    return ' '.join(re.sub(r'[^\w\s]', ' ', name).split())
+
+class CatalogMirror:
+    """Local, indexed copy of the upstream catalogs for fast searching.
+
+    Books are stored one row each in a SQLite file, with their full
+    metadata as JSON next to the columns that are searched. A trigram FTS5
+    index over title, author and summary answers substring queries without
+    scanning the catalog, and plain indexes on the normalized title and
+    author serve prefix and author lookups. Syncs only rewrite books whose
+    ``updated`` timestamp changed.
+
+    The database path can be set with the ``CATALOG_MIRROR_DB`` environment
+    variable.
+    """
+
+    # BM25 column weights: title, author, summary, normalized author
+    COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 5.0)
+
+    # Shortest query the trigram index can answer; shorter ones use LIKE
+    MIN_MATCH_LENGTH = 3
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS catalog_book (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            book_id TEXT NOT NULL,
+            title TEXT NOT NULL,
+            title_key TEXT NOT NULL,
+            author TEXT NOT NULL,
+            author_key TEXT NOT NULL,
+            summary TEXT NOT NULL,
+            updated TEXT,
+            data TEXT NOT NULL,
+            UNIQUE (source, book_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_catalog_book_title_key ON catalog_book (source, title_key)",
+        "CREATE INDEX IF NOT EXISTS ix_catalog_book_author_key ON catalog_book (source, author_key)",
+        """
+        CREATE TABLE IF NOT EXISTS catalog_sync (
+            source TEXT PRIMARY KEY,
+            synced_at REAL NOT NULL,
+            books INTEGER NOT NULL
+        )
+        """
+    ]
+
+    FTS_SCHEMA = [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS catalog_fts USING fts5(
+            title, author, summary, author_key,
+            content='catalog_book', content_rowid='id',
+            tokenize='trigram'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_ai AFTER INSERT ON catalog_book BEGIN
+            INSERT INTO catalog_fts(rowid, title, author, summary, author_key)
+            VALUES (new.id, new.title, new.author, new.summary, new.author_key);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_ad AFTER DELETE ON catalog_book BEGIN
+            INSERT INTO catalog_fts(catalog_fts, rowid, title, author, summary, author_key)
+            VALUES ('delete', old.id, old.title, old.author, old.summary, old.author_key);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS catalog_fts_au AFTER UPDATE ON catalog_book BEGIN
+            INSERT INTO catalog_fts(catalog_fts, rowid, title, author, summary, author_key)
+            VALUES ('delete', old.id, old.title, old.author, old.summary, old.author_key);
+            INSERT INTO catalog_fts(rowid, title, author, summary, author_key)
+            VALUES (new.id, new.title, new.author, new.summary, new.author_key);
+        END
+        """
+    ]
+
+    def __init__(self, db_path=None):
+        """Initialize the catalog mirror.
+
+        Args:
+            db_path: Path to the mirror's SQLite file
+        """
+        if db_path:
+            self.db_path = Path(db_path)
+        elif os.environ.get('CATALOG_MIRROR_DB'):
+            self.db_path = Path(os.environ['CATALOG_MIRROR_DB'])
+        else:
+            self.db_path = Path(__file__).parent.parent.parent / "data" / "catalog_mirror.db"
+
+        self.fts_enabled = False
+        self._initialized = False
+        self._local = threading.local()
+
+    def _connect(self):
+        """Get this thread's connection to the mirror, opening it if needed."""
+        connection = getattr(self._local, 'connection', None)
+        # Connections must not be shared with a forked child
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+
+        if not self._initialized:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            try:
+                for statement in self.FTS_SCHEMA:
+                    connection.execute(statement)
+                self.fts_enabled = True
+            except sqlite3.OperationalError as e:
+                logger.error(f"Trigram index unavailable, falling back to LIKE search: {str(e)}")
+            self._initialized = True
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def sync(self, source, books):
+        """Bring a source's mirror up to date with its upstream catalog.
+
+        Books are matched on their ``id``; new books are added, books whose
+        ``updated`` timestamp changed are rewritten and books no longer in
+        the catalog are removed.
+
+        Args:
+            source: Source the catalog belongs to
+            books: Complete list of book metadata dictionaries
+
+        Returns:
+            Number of books added or changed
+        """
+        connection = self._connect()
+        rows = [
+            (
+                source, book['id'], book.get('title', ''), fold(book.get('title', '')),
+                book.get('author', ''), normalize_author(book.get('author', '')),
+                book.get('summary', ''), book.get('updated'), json.dumps(book)
+            )
+            for book in books
+        ]
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.executemany(
+                "INSERT INTO catalog_book "
+                "(source, book_id, title, title_key, author, author_key, summary, updated, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, book_id) DO UPDATE SET "
+                "title = excluded.title, title_key = excluded.title_key, author = excluded.author, "
+                "author_key = excluded.author_key, summary = excluded.summary, "
+                "updated = excluded.updated, data = excluded.data "
+                "WHERE catalog_book.updated IS NOT excluded.updated",
+                rows
+            )
+            changed = cursor.rowcount
+
+            connection.execute(
+                "DELETE FROM catalog_book WHERE source = ? AND book_id NOT IN (SELECT value FROM json_each(?))",
+                (source, json.dumps([row[1] for row in rows]))
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO catalog_sync (source, synced_at, books) VALUES (?, ?, ?)",
+                (source, time.time(), len(rows))
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+        logger.info(f"Mirrored {source} catalog: {len(rows)} books, {changed} added or changed")
+        return changed
+
+    def synced_at(self, source):
+        """Time of a source's last sync, or None if it was never synced."""
+        row = self._connect().execute(
+            "SELECT synced_at FROM catalog_sync WHERE source = ?", (source,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def build_match_expression(query):
+        """Turn user input into a trigram MATCH expression for substring search.
+
+        The query is matched as one quoted phrase so FTS5 operators in it are
+        treated as plain text. If accents change the query, the unaccented
+        form is matched too, so "bronte" finds "Brontë".
+
+        Args:
+            query: Search query string
+
+        Returns:
+            MATCH expression
+        """
+        phrases = {query.lower(), fold(query)}
+        return ' OR '.join('"{}"'.format(phrase.replace('"', '""')) for phrase in sorted(phrases))
+
+    def search(self, source, query, limit=None):
+        """Find books whose title, author or summary contains the query.
+
+        Args:
+            source: Source to search
+            query: Search query string
+            limit: Maximum number of books to return
+
+        Returns:
+            List of book metadata dictionaries, best match first
+        """
+        query = query.strip()
+        if not query:
+            return []
+
+        connection = self._connect()
+        limit = -1 if limit is None else limit
+
+        if self.fts_enabled and len(query) >= self.MIN_MATCH_LENGTH:
+            weights = ', '.join(str(weight) for weight in self.COLUMN_WEIGHTS)
+            rows = connection.execute(
+                f"SELECT b.data FROM catalog_fts JOIN catalog_book b ON b.id = catalog_fts.rowid "
+                f"WHERE catalog_fts MATCH ? AND b.source = ? "
+                f"ORDER BY bm25(catalog_fts, {weights}), b.id LIMIT ?",
+                (self.build_match_expression(query), source, limit)
+            )
+        else:
+            pattern = '%{}%'.format(query.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+            rows = connection.execute(
+                "SELECT data FROM catalog_book WHERE source = ? AND ("
+                "lower(title) LIKE ? ESCAPE '\\' OR lower(author) LIKE ? ESCAPE '\\' "
+                "OR lower(summary) LIKE ? ESCAPE '\\') ORDER BY id LIMIT ?",
+                (source, pattern, pattern, pattern, limit)
+            )
+
+        return [json.loads(data) for data, in rows]
+
+    def titles_with_prefix(self, source, prefix, limit=10):
+        """Find books whose title starts with a prefix, for autocompletion.
+
+        Args:
+            source: Source to search
+            prefix: Start of the title, in any case or accents
+            limit: Maximum number of books to return
+
+        Returns:
+            List of book metadata dictionaries ordered by title
+        """
+        key = fold(prefix.strip())
+        if not key:
+            return []
+
+        rows = self._connect().execute(
+            "SELECT data FROM catalog_book WHERE source = ? AND title_key >= ? AND title_key < ? "
+            "ORDER BY title_key LIMIT ?",
+            (source, key, key + '\U0010ffff', limit)
+        )
+        return [json.loads(data) for data, in rows]
+
+    def books_by_author(self, source, author):
+        """Find books by an author, however the name is written.
+
+        Args:
+            source: Source to search
+            author: Author name, e.g. "Austen, Jane" or "jane austen"
+
+        Returns:
+            List of book metadata dictionaries ordered by title
+        """
+        rows = self._connect().execute(
+            "SELECT data FROM catalog_book WHERE source = ? AND author_key = ? ORDER BY title_key",
+            (source, normalize_author(author))
+        )
+        return [json.loads(data) for data, in rows]
+
+# Shared by every service in this process
+catalog_mirror = CatalogMirror()
@@ -0,0 +1,350 @@
+import time
+import logging
+import threading
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .. import db
+from ..models.book import Book, Genre, book_genre
+from ..models.license import License
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Facet dimensions, in the order they are shown in the browse sidebar
+FACETS = ('source', 'license', 'genre', 'decade')
+
+class FacetSnapshot:
+    """Book ids grouped by every facet value, plus the facet labels.
+
+    Once published a snapshot's book sets are not changed again; changes
+    are applied to a copy, so requests can read them without locking.
+    """
+
+    def __init__(self):
+        self.members = {facet: {} for facet in FACETS}
+        self.book_facets = {}
+        self.all_ids = set()
+        self.licenses = []
+        self.license_names = {}
+        self.license_short_names = {}
+        self.genres = []
+        self.counts = {}
+        self.pending = set()
+        self.built_at = time.monotonic()
+
+    def copy(self):
+        """Copy of the snapshot that can be patched without affecting readers of this one."""
+        snapshot = FacetSnapshot()
+        snapshot.members = {
+            facet: {value: set(book_ids) for value, book_ids in members.items()}
+            for facet, members in self.members.items()
+        }
+        snapshot.book_facets = dict(self.book_facets)
+        snapshot.all_ids = set(self.all_ids)
+        snapshot.licenses = self.licenses
+        snapshot.license_names = self.license_names
+        snapshot.license_short_names = self.license_short_names
+        snapshot.genres = self.genres
+        snapshot.built_at = self.built_at
+        return snapshot
+
+    def add_book(self, book_id, values):
+        """Record a book under each of its facet values."""
+        self.book_facets[book_id] = values
+        self.all_ids.add(book_id)
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                self.members[facet].setdefault(value, set()).add(book_id)
+
+    def remove_book(self, book_id):
+        """Forget a book and drop it from every facet value."""
+        values = self.book_facets.pop(book_id, None)
+        self.all_ids.discard(book_id)
+        if not values:
+            return
+        for facet, facet_values in values.items():
+            for value in facet_values:
+                members = self.members[facet].get(value)
+                if members is not None:
+                    members.discard(book_id)
+                    if not members:
+                        del self.members[facet][value]
+
+class CatalogStats:
+    """In-memory facet counts for the browse pages.
+
+    The first request builds a snapshot of which books carry each source,
+    license, genre and decade, using one pass over the book and book_genre
+    tables. Counts for any combination of filters are then set
+    intersections, memoized until the catalog changes, so the filter
+    sidebar costs no queries.
+
+    Books added, changed or deleted through this process are queued by a
+    flush listener and patched into a copy of the snapshot on the next
+    read, which then replaces it. New licenses or genres, or an explicit
+    invalidate(), drop the snapshot entirely, and it is rebuilt after
+    ``TTL`` seconds so changes made by other processes show up eventually.
+
+    A lock guards only the queue of changed books and the swap of the
+    current snapshot; no queries run while it is held.
+    """
+
+    # Seconds before the snapshot is rebuilt from scratch
+    TTL = 300
+
+    EXTENSION_KEY = 'catalog_stats'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the facet snapshot for the current application."""
+        with self._lock:
+            current_app.extensions.pop(self.EXTENSION_KEY, None)
+
+    def mark_changed(self, book_ids):
+        """Queue books whose facet values may have changed.
+
+        Args:
+            book_ids: IDs of books that were added, changed or deleted
+        """
+        with self._lock:
+            snapshot = current_app.extensions.get(self.EXTENSION_KEY)
+            if snapshot is not None:
+                snapshot.pending.update(book_ids)
+
+    def _snapshot(self):
+        """Current facet snapshot, built or patched as needed."""
+        with self._lock:
+            snapshot = current_app.extensions.get(self.EXTENSION_KEY)
+            expired = snapshot is None or time.monotonic() - snapshot.built_at >= self.TTL
+            if expired or not snapshot.pending:
+                book_ids = None
+            else:
+                book_ids, snapshot.pending = snapshot.pending, set()
+
+        if expired:
+            fresh = self._build()
+        elif book_ids:
+            fresh = self._patched(snapshot, book_ids)
+        else:
+            return snapshot
+
+        with self._lock:
+            current = current_app.extensions.get(self.EXTENSION_KEY)
+            if current is snapshot:
+                # Keep changes queued while the new snapshot was being made
+                if snapshot is not None:
+                    fresh.pending.update(snapshot.pending)
+                current_app.extensions[self.EXTENSION_KEY] = fresh
+            elif current is not None and book_ids:
+                # Another request replaced the snapshot first; hand the changes on
+                current.pending.update(book_ids)
+
+        return fresh
+
+    def _build(self):
+        """Build a facet snapshot from the database."""
+        logger.info("Building catalog facet snapshot")
+        snapshot = FacetSnapshot()
+
+        licenses = License.query.order_by(License.name).all()
+        snapshot.licenses = [(license.short_name, license.name) for license in licenses]
+        snapshot.license_names = dict(snapshot.licenses)
+        snapshot.license_short_names = {license.id: license.short_name for license in licenses}
+        snapshot.genres = [name for name, in db.session.query(Genre.name).order_by(Genre.name)]
+
+        for book_id, values in self._load_facet_values(snapshot).items():
+            snapshot.add_book(book_id, values)
+
+        return snapshot
+
+    def _patched(self, snapshot, book_ids):
+        """Copy of the snapshot with the given books reloaded."""
+        snapshot = snapshot.copy()
+
+        for book_id in book_ids:
+            snapshot.remove_book(book_id)
+
+        for book_id, values in self._load_facet_values(snapshot, book_ids).items():
+            snapshot.add_book(book_id, values)
+
+        return snapshot
+
+    def _load_facet_values(self, snapshot, book_ids=None):
+        """Load the facet values of some or all books.
+
+        Args:
+            snapshot: Snapshot providing the license lookup
+            book_ids: Optional IDs to restrict the load to
+
+        Returns:
+            Dictionary mapping book id to {facet: [values]}
+        """
+        books = db.session.query(Book.id, Book.source, Book.license_id, Book.publication_year)
+        genres = db.session.query(book_genre.c.book_id, Genre.name).join(Genre, Genre.id == book_genre.c.genre_id)
+
+        if book_ids is not None:
+            books = books.filter(Book.id.in_(book_ids))
+            genres = genres.filter(book_genre.c.book_id.in_(book_ids))
+
+        values = {}
+        for book_id, source, license_id, year in books:
+            license = snapshot.license_short_names.get(license_id)
+            values[book_id] = {
+                'source': [source] if source else [],
+                'license': [license] if license else [],
+                'genre': [],
+                'decade': [year // 10 * 10] if year else []
+            }
+
+        for book_id, genre in genres:
+            if book_id in values:
+                values[book_id]['genre'].append(genre)
+
+        return values
+
+    def _matching_ids(self, snapshot, filters):
+        """Book ids matching every active filter."""
+        active = [(facet, value) for facet, value in filters.items() if value is not None and value != '']
+        if not active:
+            return snapshot.all_ids
+
+        sets = [snapshot.members[facet].get(value, set()) for facet, value in active]
+        return set.intersection(*sorted(sets, key=len))
+
+    def _normalize(self, source=None, license=None, genre=None, decade=None):
+        """Filters as a dictionary keyed by facet name."""
+        return {'source': source or None, 'license': license or None,
+                'genre': genre or None, 'decade': decade}
+
+    def count_books(self, source=None, license=None, genre=None, decade=None):
+        """Count the books matching the browse filters.
+
+        Args:
+            source: Source name filter
+            license: License short name filter
+            genre: Genre name filter
+            decade: Decade filter, e.g. 1890
+
+        Returns:
+            Number of matching books
+        """
+        snapshot = self._snapshot()
+        filters = self._normalize(source, license, genre, decade)
+        key = tuple(filters[facet] for facet in FACETS)
+
+        if key not in snapshot.counts:
+            snapshot.counts[key] = len(self._matching_ids(snapshot, filters))
+
+        return snapshot.counts[key]
+
+    def facets(self, source=None, license=None, genre=None, decade=None):
+        """Facet options and counts for the browse sidebar.
+
+        Each option's count is the number of books that would match if that
+        option were selected, keeping the other active filters.
+
+        Args:
+            source: Source name filter
+            license: License short name filter
+            genre: Genre name filter
+            decade: Decade filter, e.g. 1890
+
+        Returns:
+            Dictionary mapping facet name to a list of
+            {'value', 'label', 'count'} dictionaries
+        """
+        snapshot = self._snapshot()
+        filters = self._normalize(source, license, genre, decade)
+
+        options = {
+            'source': [(value, value) for value in sorted(snapshot.members['source'])],
+            'license': snapshot.licenses,
+            'genre': [(name, name) for name in snapshot.genres],
+            'decade': [(value, f'{value}s') for value in sorted(snapshot.members['decade'])]
+        }
+
+        result = {}
+        for facet in FACETS:
+            # Count each option against the other filters only
+            others = dict(filters, **{facet: None})
+            base = self._matching_ids(snapshot, others)
+
+            result[facet] = [
+                {
+                    'value': value,
+                    'label': label,
+                    'count': len(base & snapshot.members[facet].get(value, set()))
+                }
+                for value, label in options[facet]
+            ]
+
+        return result
+
+def filter_books(query, source=None, license=None, genre=None, decade=None):
+    """Apply the browse filters to a book query.
+
+    Args:
+        query: Query over books
+        source: Source name filter
+        license: License short name filter
+        genre: Genre name filter
+        decade: Decade filter, e.g. 1890
+
+    Returns:
+        Filtered query
+    """
+    if source:
+        query = query.filter(Book.source == source)
+
+    if license:
+        query = query.join(Book.license).filter(License.short_name == license)
+
+    if genre:
+        query = query.join(Book.genres).filter(Genre.name == genre)
+
+    if decade is not None:
+        query = query.filter(Book.publication_year.between(decade, decade + 9))
+
+    return query
+
+catalog_stats = CatalogStats()
+
+@event.listens_for(Session, 'after_flush')
+def _track_catalog_changes(session, flush_context):
+    """Remember changed books until the transaction commits.
+
+    Applying them before the commit would let another request reload the
+    old values into the snapshot and keep them there until it expires.
+    """
+    if not has_app_context():
+        return
+
+    changed = session.new | session.dirty | session.deleted
+    pending = session.info.setdefault('catalog_changes', {'invalidate': False, 'book_ids': set()})
+
+    if any(isinstance(obj, (License, Genre)) for obj in changed):
+        pending['invalidate'] = True
+
+    pending['book_ids'].update(obj.id for obj in changed if isinstance(obj, Book) and obj.id is not None)
+
+@event.listens_for(Session, 'after_commit')
+def _apply_catalog_changes(session):
+    """Queue committed books, or drop the snapshot when facet labels changed."""
+    pending = session.info.pop('catalog_changes', None)
+    if pending is None or not has_app_context():
+        return
+
+    if pending['invalidate']:
+        catalog_stats.invalidate()
+    elif pending['book_ids']:
+        catalog_stats.mark_changed(pending['book_ids'])
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    """Forget changes that were rolled back."""
+    session.info.pop('catalog_changes', None)
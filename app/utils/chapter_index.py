@@ -0,0 +1,232 @@
+import os
+import json
+import logging
+
+from .. import db
+from ..models.chapter import BookChapter
+from .text_processor import TextProcessor
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class ChapterIndex:
+    """Precomputed chapter and paragraph offsets for a book's text file.
+
+    The index is built once, at import time, by streaming the text file and
+    is stored twice: as a compact JSON sidecar next to the text file (with
+    every paragraph offset, for readers that need to cut pages or excerpts)
+    and as ``BookChapter`` rows (for queries and the API). Consumers can
+    then seek straight to a chapter with ``os.pread`` instead of scanning
+    the file or re-running the chapter regexes.
+    """
+
+    SIDECAR_SUFFIX = '.chapters.json'
+    SIDECAR_VERSION = 1
+
+    def __init__(self, text_processor=None):
+        """Initialize the chapter index.
+
+        Args:
+            text_processor: TextProcessor used for chapter detection
+        """
+        self.text_processor = text_processor or TextProcessor()
+
+    def sidecar_path(self, text_file_path):
+        """Path of the sidecar file for a text file."""
+        return os.path.splitext(str(text_file_path))[0] + self.SIDECAR_SUFFIX
+
+    def build(self, text_file_path):
+        """Scan a text file and build its chapter index.
+
+        The file is read one line at a time. Chapters start at lines matching
+        the ``TextProcessor`` chapter markers; any text before the first
+        heading becomes chapter 0.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Returns:
+            List of chapter dictionaries with number, title, start, end,
+            char_start, words and paragraphs (byte offsets of each
+            paragraph start)
+        """
+        chapter_pattern = self.text_processor.chapter_pattern()
+        chapters = []
+        current = None
+        offset = 0
+        char_offset = 0
+        in_paragraph = False
+
+        def start_chapter(number, title):
+            return {
+                'number': number,
+                'title': title,
+                'start': offset,
+                'end': offset,
+                'char_start': char_offset,
+                'words': 0,
+                'paragraphs': []
+            }
+
+        with open(text_file_path, 'rb') as f:
+            for raw_line in f:
+                line = raw_line.decode('utf-8', errors='replace')
+                is_blank = not line.strip()
+
+                if not is_blank and chapter_pattern.match(line):
+                    if current and current['paragraphs']:
+                        chapters.append(current)
+                    current = start_chapter(None, line.strip())
+                    in_paragraph = False
+                elif current is None and not is_blank:
+                    current = start_chapter(0, None)
+
+                if current is not None and not is_blank:
+                    if not in_paragraph:
+                        current['paragraphs'].append(offset)
+                    current['words'] += len(line.split())
+
+                in_paragraph = not is_blank
+                offset += len(raw_line)
+                char_offset += len(line)
+
+                if current is not None:
+                    current['end'] = offset
+
+        if current and current['paragraphs']:
+            chapters.append(current)
+
+        # Number chapters consecutively, keeping 0 for text before the first heading
+        first = 0 if chapters and chapters[0]['title'] is None else 1
+        for number, chapter in enumerate(chapters, start=first):
+            chapter['number'] = number
+
+        return chapters
+
+    def write_sidecar(self, text_file_path, chapters):
+        """Write a chapter index to the sidecar file next to the text file.
+
+        Args:
+            text_file_path: Path to the book's text file
+            chapters: Chapter index from build()
+        """
+        stat = os.stat(text_file_path)
+        sidecar = {
+            'version': self.SIDECAR_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'chapters': chapters
+        }
+
+        path = self.sidecar_path(text_file_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def load_sidecar(self, text_file_path):
+        """Load the sidecar for a text file if it is still current.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Returns:
+            Chapter index, or None if the sidecar is missing or stale
+        """
+        path = self.sidecar_path(text_file_path)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                sidecar = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable chapter sidecar {path}: {str(e)}")
+            return None
+
+        stat = os.stat(text_file_path)
+        if (sidecar.get('version') != self.SIDECAR_VERSION or
+                sidecar.get('size') != stat.st_size or
+                sidecar.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+
+        return sidecar['chapters']
+
+    def load_or_build(self, text_file_path):
+        """Load a text file's chapter index, building the sidecar if needed.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Returns:
+            Chapter index
+        """
+        chapters = self.load_sidecar(text_file_path)
+        if chapters is None:
+            logger.info(f"Building chapter index for {text_file_path}")
+            chapters = self.build(text_file_path)
+            try:
+                self.write_sidecar(text_file_path, chapters)
+            except OSError as e:
+                logger.warning(f"Could not write chapter sidecar for {text_file_path}: {str(e)}")
+        return chapters
+
+    def store(self, book, chapters=None):
+        """Build a book's chapter index and store it in the sidecar and database.
+
+        Also fills in the book's word count. The caller commits the session.
+
+        Args:
+            book: Book with a text file
+            chapters: Chapter index already built from the current text file
+                and written to its sidecar; the text is rescanned if not given
+
+        Returns:
+            Chapter index, or None if the book has no text file
+        """
+        if not book.text_file_path or not os.path.exists(book.text_file_path):
+            return None
+
+        if chapters is None:
+            chapters = self.build(book.text_file_path)
+            self.write_sidecar(book.text_file_path, chapters)
+
+        # Remove the old rows first so renumbered chapters don't collide
+        if book.chapters:
+            book.chapters = []
+            db.session.flush()
+
+        book.chapters = [
+            BookChapter(
+                number=chapter['number'],
+                title=chapter['title'][:255] if chapter['title'] else None,
+                start_offset=chapter['start'],
+                end_offset=chapter['end'],
+                word_count=chapter['words'],
+                paragraph_count=len(chapter['paragraphs'])
+            )
+            for chapter in chapters
+        ]
+        book.word_count = sum(chapter['words'] for chapter in chapters)
+
+        return chapters
+
+    def read_range(self, text_file_path, start, end):
+        """Read a byte range of a text file without scanning it.
+
+        Args:
+            text_file_path: Path to the book's text file
+            start: Start byte offset
+            end: End byte offset (exclusive)
+
+        Returns:
+            Decoded text of the range
+        """
+        fd = os.open(text_file_path, os.O_RDONLY)
+        try:
+            data = os.pread(fd, end - start, start)
+        finally:
+            os.close(fd)
+
+        return data.decode('utf-8', errors='replace')
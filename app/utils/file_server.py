@@ -0,0 +1,344 @@
+import os
+import gzip
+import json
+import uuid
+import shutil
+import hashlib
+import logging
+import mimetypes
+from datetime import datetime, timezone
+from flask import request, current_app
+from werkzeug.wsgi import wrap_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+mimetypes.add_type('application/epub+zip', '.epub')
+
+class BookFileServer:
+    """Serves stored book files with validators and byte-range support.
+
+    Responses carry a strong ETag derived from the SHA-256 of the file
+    content, which is computed once and kept in a ``.sha256`` sidecar next
+    to the file. Conditional requests (If-None-Match, If-Modified-Since,
+    If-Range) and single or multiple byte ranges are handled here rather
+    than by ``send_file``. Whole files and single ranges are handed to the
+    server's ``wsgi.file_wrapper``, which lets gunicorn send them with
+    ``sendfile(2)`` instead of copying them through Python.
+
+    Text and HTML files are also compressed once at import time into
+    ``.br`` and ``.gz`` siblings, and the variant matching the client's
+    Accept-Encoding is served as-is with Content-Encoding set. Brotli
+    variants are only written when the optional ``brotli`` package is
+    installed.
+    """
+
+    HASH_SUFFIX = '.sha256'
+
+    # Content codings with precompressed variants, in order of preference
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    # Only formats that aren't already compressed get variants
+    COMPRESSIBLE_EXTENSIONS = ('.txt', '.html')
+
+    # Bytes read at a time when hashing or streaming a file
+    CHUNK_SIZE = 64 * 1024
+
+    def hash_path(self, file_path):
+        """Path of the content hash sidecar for a file."""
+        return f"{file_path}{self.HASH_SUFFIX}"
+
+    def content_hash(self, file_path):
+        """Get the SHA-256 of a file, computing and storing it if needed.
+
+        The stored hash is reused as long as the file's size and
+        modification time match the ones it was computed for.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            Hex digest of the file content
+        """
+        file_path = str(file_path)
+        stat = os.stat(file_path)
+        hash_path = self.hash_path(file_path)
+
+        try:
+            with open(hash_path, 'r') as f:
+                stored = json.load(f)
+            if stored.get('size') == stat.st_size and stored.get('mtime_ns') == stat.st_mtime_ns:
+                return stored['sha256']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        sha256 = digest.hexdigest()
+
+        try:
+            tmp_path = f"{hash_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'sha256': sha256, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}, f)
+            os.replace(tmp_path, hash_path)
+        except OSError as e:
+            logger.warning(f"Could not store content hash for {file_path}: {str(e)}")
+
+        return sha256
+
+    def compress(self, file_path):
+        """Write the precompressed variants of a file.
+
+        Args:
+            file_path: Path to the file
+
+        Returns:
+            List of variant paths written
+        """
+        file_path = str(file_path)
+        written = []
+
+        for encoding, suffix in self.ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+
+            variant_path = f"{file_path}{suffix}"
+            tmp_path = f"{variant_path}.tmp"
+
+            if encoding == 'gzip':
+                # mtime=0 keeps the output, and so its ETag, reproducible
+                with open(file_path, 'rb') as src, open(tmp_path, 'wb') as raw, \
+                        gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as dst:
+                    shutil.copyfileobj(src, dst, self.CHUNK_SIZE)
+            else:
+                compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=11)
+                with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                    for chunk in iter(lambda: src.read(self.CHUNK_SIZE), b''):
+                        dst.write(compressor.process(chunk))
+                    dst.write(compressor.finish())
+
+            os.replace(tmp_path, variant_path)
+            written.append(variant_path)
+
+        return written
+
+    def prepare_files(self, book):
+        """Precompress and hash a book's stored files.
+
+        Called at import time so downloads don't pay for compression or
+        hashing.
+
+        Args:
+            book: Book whose files should be prepared
+        """
+        for file_path in (book.epub_file_path, book.text_file_path, book.html_file_path):
+            if not file_path or not os.path.exists(file_path):
+                continue
+
+            self.content_hash(file_path)
+
+            if file_path.endswith(self.COMPRESSIBLE_EXTENSIONS):
+                for variant_path in self.compress(file_path):
+                    self.content_hash(variant_path)
+
+    def _select_variant(self, file_path, stat):
+        """Pick the precompressed variant the client accepts, if any.
+
+        Variants older than the file are ignored.
+
+        Returns:
+            (path, stat, content coding) of the variant, or of the file itself
+            with a coding of None
+        """
+        if not file_path.endswith(self.COMPRESSIBLE_EXTENSIONS):
+            return file_path, stat, None
+
+        accepted = request.accept_encodings
+        for encoding, suffix in self.ENCODINGS:
+            if not accepted.quality(encoding):
+                continue
+            try:
+                variant_stat = os.stat(f"{file_path}{suffix}")
+            except OSError:
+                continue
+            if variant_stat.st_mtime_ns >= stat.st_mtime_ns:
+                return f"{file_path}{suffix}", variant_stat, encoding
+
+        return file_path, stat, None
+
+    def send(self, file_path, download_name=None, mimetype=None, as_attachment=True):
+        """Build a response for a stored file in the current request.
+
+        Args:
+            file_path: Path to the file
+            download_name: Filename offered to the client; defaults to the file's name
+            mimetype: Content type; guessed from the filename by default
+            as_attachment: Whether to ask the browser to download the file
+
+        Returns:
+            Flask response (200, 206, 304 or 416)
+        """
+        file_path = str(file_path)
+        download_name = download_name or os.path.basename(file_path)
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+
+        compressible = file_path.endswith(self.COMPRESSIBLE_EXTENSIONS)
+
+        # Each encoding is its own representation, with its own ETag and ranges
+        file_path, stat, encoding = self._select_variant(file_path, os.stat(file_path))
+        size = stat.st_size
+        etag = self.content_hash(file_path)
+        last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+        response = current_app.response_class(mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Accept-Ranges'] = 'bytes'
+        response.headers['Cache-Control'] = 'public, no-cache'
+        if as_attachment:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+
+        if self._not_modified(etag, last_modified):
+            response.status_code = 304
+            return response
+
+        ranges = self._requested_ranges(etag, last_modified, size)
+
+        if ranges == []:
+            response.status_code = 416
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if not ranges:
+            return self._stream(response, file_path, 0, size)
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            response.status_code = 206
+            response.headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+            return self._stream(response, file_path, start, end - start)
+
+        return self._multipart(response, file_path, ranges, size, mimetype)
+
+    def _not_modified(self, etag, last_modified):
+        """Whether the client's cached copy is still current."""
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(etag)
+
+        if request.if_modified_since:
+            return last_modified <= request.if_modified_since
+
+        return False
+
+    def _requested_ranges(self, etag, last_modified, size):
+        """Resolve the Range header against the file size.
+
+        Returns:
+            None to send the whole file, an empty list if no range can be
+            satisfied, or a list of (start, end) byte ranges, end exclusive
+        """
+        requested = request.range
+        if requested is None or requested.units != 'bytes':
+            return None
+
+        # A stale If-Range means the client wants the whole new file
+        if_range = request.if_range
+        if if_range.etag is not None and (if_range.etag != etag or request.headers.get('If-Range', '').startswith('W/')):
+            return None
+        if if_range.date is not None and if_range.date != last_modified:
+            return None
+
+        ranges = []
+        for start, stop in requested.ranges:
+            if start < 0:
+                start, stop = max(size + start, 0), size
+            else:
+                stop = size if stop is None else min(stop, size)
+            if start < stop:
+                ranges.append((start, stop))
+
+        ranges.sort()
+        merged = []
+        for start, stop in ranges:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+            else:
+                merged.append((start, stop))
+
+        return merged
+
+    def _stream(self, response, file_path, start, length):
+        """Attach a byte range of the file as the response body."""
+        response.headers['Content-Length'] = str(length)
+
+        f = open(file_path, 'rb')
+        f.seek(start)
+
+        # gunicorn sends file_wrapper bodies with sendfile() from the current
+        # position for Content-Length bytes; other servers read to EOF, so
+        # partial bodies elsewhere are streamed from Python instead
+        server = request.environ.get('SERVER_SOFTWARE', '')
+        if start + length == os.fstat(f.fileno()).st_size or server.startswith('gunicorn'):
+            response.response = wrap_file(request.environ, f, self.CHUNK_SIZE)
+        else:
+            response.response = self._read_range(f, length)
+        response.direct_passthrough = True
+        return response
+
+    def _read_range(self, f, length, close=True):
+        """Yield a byte range from an open file positioned at its start."""
+        try:
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            if close:
+                f.close()
+
+    def _multipart(self, response, file_path, ranges, size, mimetype):
+        """Attach several byte ranges as a multipart/byteranges body."""
+        boundary = uuid.uuid4().hex
+        parts = []
+        for start, stop in ranges:
+            header = (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {mimetype}\r\n"
+                f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+            ).encode('ascii')
+            parts.append((header, start, stop))
+        closing = f"\r\n--{boundary}--\r\n".encode('ascii')
+
+        def generate():
+            with open(file_path, 'rb') as f:
+                for header, start, stop in parts:
+                    yield header
+                    f.seek(start)
+                    yield from self._read_range(f, stop - start, close=False)
+            yield closing
+
+        response.status_code = 206
+        response.mimetype = 'multipart/byteranges'
+        response.headers['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+        response.headers['Content-Length'] = str(
+            sum(len(header) + stop - start for header, start, stop in parts) + len(closing))
+        response.response = generate()
+        response.direct_passthrough = True
+        return response
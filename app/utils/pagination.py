@@ -0,0 +1,113 @@
+import json
+import base64
+import binascii
+from sqlalchemy import tuple_
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page as an opaque cursor.
+    
+    Args:
+        values: JSON-serializable list of sort key values
+        
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, length):
+    """Decode a cursor produced by encode_cursor.
+    
+    Args:
+        cursor: Cursor string from the client
+        length: Expected number of sort key values
+        
+    Returns:
+        List of sort key values
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    
+    # Only scalars can be bound as SQL parameters
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    
+    return values
+
+class KeysetPage:
+    """One page of results from keyset_paginate."""
+    
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+def keyset_paginate(query, sort_columns, per_page, after=None, before=None, total=None):
+    """Paginate a query by seeking past a sort key instead of using OFFSET.
+    
+    The sort columns must form a unique key (e.g. title and id) and should
+    be backed by an index so every page is a short index range scan no
+    matter how deep it is.
+    
+    Args:
+        query: SQLAlchemy query to paginate
+        sort_columns: Columns making up the ascending sort key
+        per_page: Number of items per page
+        after: Cursor of the row before the page (from next_cursor)
+        before: Cursor of the row after the page (from prev_cursor)
+        total: Optional total item count to attach to the page
+        
+    Returns:
+        KeysetPage
+        
+    Raises:
+        ValueError: If a cursor is malformed
+    """
+    key = tuple_(*sort_columns)
+    
+    if before:
+        values = decode_cursor(before, len(sort_columns))
+        query = query.filter(key < tuple_(*values)).order_by(*[column.desc() for column in sort_columns])
+    else:
+        if after:
+            values = decode_cursor(after, len(sort_columns))
+            query = query.filter(key > tuple_(*values))
+        query = query.order_by(*sort_columns)
+    
+    items = query.limit(per_page + 1).all()
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    
+    if before:
+        items.reverse()
+    
+    def cursor_for(item):
+        return encode_cursor([getattr(item, column.key) for column in sort_columns])
+    
+    next_cursor = None
+    prev_cursor = None
+    if items:
+        if (has_more and not before) or before:
+            next_cursor = cursor_for(items[-1])
+        if (has_more and before) or after:
+            prev_cursor = cursor_for(items[0])
+    
+    return KeysetPage(items, next_cursor=next_cursor, prev_cursor=prev_cursor, total=total)
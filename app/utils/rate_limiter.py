@@ -0,0 +1,179 @@
+import os
+import time
+import sqlite3
+import logging
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class RateLimiter:
+    """Per-host token bucket shared by every process on the machine.
+
+    Bucket state lives in a small SQLite file, so gunicorn workers, import
+    workers and batch threads all draw from the same budget for a host.
+    Each acquire() updates the bucket inside a ``BEGIN IMMEDIATE``
+    transaction: tokens refill at ``rate`` per second up to ``burst``, and
+    the caller takes one. When the bucket is empty the balance goes
+    negative, which reserves the next free slot for the caller; callers are
+    therefore served in the order they asked, whichever process they are
+    in. Time spent waiting is recorded per host.
+
+    The database path can be set with the ``RATE_LIMIT_DB`` environment
+    variable.
+    """
+
+    # Requests allowed back to back after the host has been idle
+    DEFAULT_BURST = 2
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_bucket (
+            host TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rate_limit_stats (
+            host TEXT PRIMARY KEY,
+            acquired INTEGER NOT NULL DEFAULT 0,
+            waited INTEGER NOT NULL DEFAULT 0,
+            total_wait REAL NOT NULL DEFAULT 0,
+            max_wait REAL NOT NULL DEFAULT 0
+        )
+        """
+    ]
+
+    def __init__(self, db_path=None):
+        """Initialize the rate limiter.
+
+        Args:
+            db_path: Path to the shared SQLite file
+        """
+        if db_path:
+            self.db_path = Path(db_path)
+        elif os.environ.get('RATE_LIMIT_DB'):
+            self.db_path = Path(os.environ['RATE_LIMIT_DB'])
+        else:
+            self.db_path = Path(__file__).parent.parent.parent / "data" / "rate_limits.db"
+
+        self._initialized = False
+
+    def _connect(self):
+        """Open a connection to the shared database, creating it if needed."""
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+
+        if not self._initialized:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._initialized = True
+
+        return connection
+
+    def reserve(self, host, rate, burst=None):
+        """Take a token from a host's bucket without waiting for it.
+
+        Args:
+            host: Host name the request is for
+            rate: Tokens added per second
+            burst: Bucket capacity
+
+        Returns:
+            Seconds the caller must wait before sending its request
+        """
+        burst = burst or self.DEFAULT_BURST
+        connection = self._connect()
+
+        try:
+            connection.execute("BEGIN IMMEDIATE")
+            now = time.time()
+
+            row = connection.execute(
+                "SELECT tokens, updated_at FROM rate_limit_bucket WHERE host = ?", (host,)
+            ).fetchone()
+
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            tokens -= 1
+            wait = -tokens / rate if tokens < 0 else 0.0
+
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limit_bucket (host, tokens, updated_at) VALUES (?, ?, ?)",
+                (host, tokens, now)
+            )
+            connection.execute(
+                "INSERT INTO rate_limit_stats (host, acquired, waited, total_wait, max_wait) "
+                "VALUES (?, 1, ?, ?, ?) "
+                "ON CONFLICT(host) DO UPDATE SET "
+                "acquired = acquired + 1, waited = waited + excluded.waited, "
+                "total_wait = total_wait + excluded.total_wait, "
+                "max_wait = MAX(max_wait, excluded.max_wait)",
+                (host, 1 if wait > 0 else 0, wait, wait)
+            )
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        return wait
+
+    def acquire(self, host, rate, burst=None):
+        """Wait until a request to a host is allowed.
+
+        If the shared store is unavailable the caller is let through after
+        one full interval, so a broken store slows requests down rather than
+        letting them through unthrottled.
+
+        Args:
+            host: Host name the request is for
+            rate: Requests allowed per second
+            burst: Requests allowed back to back after an idle period
+
+        Returns:
+            Seconds spent waiting
+        """
+        try:
+            wait = self.reserve(host, rate, burst)
+        except sqlite3.Error as e:
+            logger.error(f"Rate limit store unavailable, falling back to a fixed delay: {str(e)}")
+            wait = 1 / rate
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Acquire and wait-time counters for every host.
+
+        Returns:
+            Dictionary mapping host to its counters, including the mean wait
+            in seconds
+        """
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT host, acquired, waited, total_wait, max_wait FROM rate_limit_stats"
+            ).fetchall()
+        finally:
+            connection.close()
+
+        return {
+            host: {
+                'acquired': acquired,
+                'waited': waited,
+                'total_wait_seconds': total_wait,
+                'max_wait_seconds': max_wait,
+                'mean_wait_seconds': total_wait / acquired if acquired else 0.0
+            }
+            for host, acquired, waited, total_wait, max_wait in rows
+        }
+
+# Shared by every service in this process
+rate_limiter = RateLimiter()
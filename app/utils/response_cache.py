@@ -0,0 +1,391 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from collections import namedtuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# A cached value, whether it is still fresh, and the upstream validators it
+# can be revalidated with
+CacheEntry = namedtuple('CacheEntry', ['value', 'fresh', 'etag', 'last_modified'])
+
+class ResponseCache:
+    """Cache for upstream API responses, shared by every process.
+
+    Entries live in one SQLite file, keyed by a namespace such as
+    ``project_gutenberg.search`` and an exact key, so different queries can
+    never share an entry. Each namespace has its own time to live. Values
+    are stored as JSON in a single statement, so readers never see a half
+    written entry. When the file grows past its size limit the least
+    recently used entries are evicted; the total size is kept up to date
+    by triggers in a one-row table, so checking it does not scan the cache.
+    Hit and miss counts are kept per namespace for the admin stats endpoint.
+
+    Entries also keep the upstream response's ``ETag`` and ``Last-Modified``
+    validators. Once an entry expires, lookup() still returns it so the
+    caller can send a conditional request; if the server answers 304 Not
+    Modified, revalidated() makes the entry fresh again without it being
+    downloaded or parsed a second time.
+
+    The database path and size limit can be set with the
+    ``RESPONSE_CACHE_DB`` and ``RESPONSE_CACHE_MAX_BYTES`` environment
+    variables.
+    """
+
+    # Seconds an entry stays fresh, per namespace
+    TTLS = {
+        'standard_ebooks.catalog': DAY,
+        'standard_ebooks.book': 7 * DAY,
+        'project_gutenberg.search': 7 * DAY,
+        'project_gutenberg.book': 7 * DAY,
+        'project_gutenberg.popular': DAY,
+        'internet_archive.search': 3 * DAY,
+        'internet_archive.book': 7 * DAY,
+        'internet_archive.collections': 30 * DAY,
+        'wikisource.search': 3 * DAY,
+        'wikisource.book': 7 * DAY,
+        'wikisource.featured': 7 * DAY
+    }
+    DEFAULT_TTL = DAY
+
+    MAX_BYTES = 256 * 1024 * 1024
+
+    # Eviction frees space down to this fraction of the limit, so it does
+    # not run again on the very next write
+    EVICT_TO = 0.9
+
+    # Last-used times are only rewritten when older than this, so hot
+    # entries do not turn every read into a write
+    TOUCH_INTERVAL = 60
+
+    SCHEMA = [
+        """
+        CREATE TABLE IF NOT EXISTS response_cache (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)"
+    ]
+
+    # Statements that bring the schema up to each version, kept in
+    # PRAGMA user_version so existing cache files are upgraded in place
+    MIGRATIONS = {
+        1: [
+            "ALTER TABLE response_cache ADD COLUMN etag TEXT",
+            "ALTER TABLE response_cache ADD COLUMN last_modified TEXT"
+        ],
+        2: [
+            """
+            CREATE TABLE response_cache_size (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                total_bytes INTEGER NOT NULL
+            )
+            """,
+            "INSERT INTO response_cache_size (id, total_bytes) SELECT 0, COALESCE(SUM(size), 0) FROM response_cache",
+            """
+            CREATE TRIGGER response_cache_size_ai AFTER INSERT ON response_cache BEGIN
+                UPDATE response_cache_size SET total_bytes = total_bytes + new.size;
+            END
+            """,
+            """
+            CREATE TRIGGER response_cache_size_ad AFTER DELETE ON response_cache BEGIN
+                UPDATE response_cache_size SET total_bytes = total_bytes - old.size;
+            END
+            """,
+            """
+            CREATE TRIGGER response_cache_size_au AFTER UPDATE OF size ON response_cache BEGIN
+                UPDATE response_cache_size SET total_bytes = total_bytes + new.size - old.size;
+            END
+            """
+        ]
+    }
+    SCHEMA_VERSION = 2
+
+    def __init__(self, db_path=None, max_bytes=None):
+        """Initialize the response cache.
+
+        Args:
+            db_path: Path to the shared SQLite file
+            max_bytes: Total size of cached values to keep
+        """
+        if db_path:
+            self.db_path = Path(db_path)
+        elif os.environ.get('RESPONSE_CACHE_DB'):
+            self.db_path = Path(os.environ['RESPONSE_CACHE_DB'])
+        else:
+            self.db_path = Path(__file__).parent.parent.parent / "data" / "cache" / "cache.db"
+
+        self.max_bytes = max_bytes or int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', self.MAX_BYTES))
+        self._initialized = False
+        self._local = threading.local()
+        self._stats = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """Get this thread's connection to the cache, opening it if needed."""
+        connection = getattr(self._local, 'connection', None)
+        # Connections must not be shared with a forked child
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        connection = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        if not self._initialized:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._migrate(connection)
+            self._initialized = True
+
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _migrate(self, connection):
+        """Upgrade an older cache file to the current schema."""
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Read inside the transaction so two processes do not both migrate
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            for target in range(version + 1, self.SCHEMA_VERSION + 1):
+                for statement in self.MIGRATIONS[target]:
+                    connection.execute(statement)
+            if version < self.SCHEMA_VERSION:
+                connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+                logger.info(f"Upgraded response cache schema from version {version} to {self.SCHEMA_VERSION}")
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+    def ttl(self, namespace):
+        """Seconds entries in a namespace stay fresh."""
+        return self.TTLS.get(namespace, self.DEFAULT_TTL)
+
+    def lookup(self, namespace, key):
+        """Get a cached entry, even if it has expired.
+
+        Args:
+            namespace: Cache namespace
+            key: Exact cache key
+
+        Returns:
+            CacheEntry, or None if nothing is cached for the key
+        """
+        now = time.time()
+        try:
+            connection = self._connect()
+            row = connection.execute(
+                "SELECT value, fetched_at, accessed_at, etag, last_modified FROM response_cache "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+
+            if row is None:
+                self._record(namespace, 'misses')
+                return None
+
+            if now - row[1] >= self.ttl(namespace):
+                self._record(namespace, 'misses')
+                return CacheEntry(json.loads(row[0]), False, row[3], row[4])
+
+            if now - row[2] >= self.TOUCH_INTERVAL:
+                connection.execute(
+                    "UPDATE response_cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, namespace, key)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Response cache unavailable: {str(e)}")
+            self._record(namespace, 'misses')
+            return None
+
+        self._record(namespace, 'hits')
+        return CacheEntry(json.loads(row[0]), True, row[3], row[4])
+
+    def get(self, namespace, key):
+        """Get a fresh cached value.
+
+        Args:
+            namespace: Cache namespace
+            key: Exact cache key
+
+        Returns:
+            The cached value, or None if it is missing or expired
+        """
+        entry = self.lookup(namespace, key)
+        return entry.value if entry and entry.fresh else None
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Request headers that revalidate an expired entry.
+
+        Args:
+            entry: CacheEntry from lookup(), or None
+
+        Returns:
+            Dictionary of If-None-Match / If-Modified-Since headers; empty if
+            the entry has no validators
+        """
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def revalidated(self, namespace, key, entry):
+        """Mark an entry fresh again after the server answered 304 Not Modified.
+
+        Args:
+            namespace: Cache namespace
+            key: Exact cache key
+            entry: The CacheEntry that was revalidated
+
+        Returns:
+            The entry's value
+        """
+        now = time.time()
+        try:
+            self._connect().execute(
+                "UPDATE response_cache SET fetched_at = ?, accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, now, namespace, key)
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Failed to refresh cached {namespace} {key}: {str(e)}")
+
+        self._record(namespace, 'revalidated')
+        return entry.value
+
+    def set(self, namespace, key, value, response=None):
+        """Store a value, replacing any previous entry for the key.
+
+        Args:
+            namespace: Cache namespace
+            key: Exact cache key
+            value: JSON-serializable value
+            response: Upstream response the value was built from; its ETag
+                and Last-Modified headers are kept for revalidation
+        """
+        data = json.dumps(value)
+        now = time.time()
+        try:
+            connection = self._connect()
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete
+            # would not fire the size trigger
+            connection.execute(
+                "INSERT INTO response_cache "
+                "(namespace, key, value, size, fetched_at, accessed_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (namespace, key) DO UPDATE SET "
+                "value = excluded.value, size = excluded.size, fetched_at = excluded.fetched_at, "
+                "accessed_at = excluded.accessed_at, etag = excluded.etag, last_modified = excluded.last_modified",
+                (namespace, key, data, len(data.encode('utf-8')), now, now,
+                 response.headers.get('ETag') if response is not None else None,
+                 response.headers.get('Last-Modified') if response is not None else None)
+            )
+            self._evict(connection)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to cache {namespace} {key}: {str(e)}")
+
+    def delete(self, namespace, key=None):
+        """Remove one entry, or every entry in a namespace if key is None."""
+        connection = self._connect()
+        if key is None:
+            connection.execute("DELETE FROM response_cache WHERE namespace = ?", (namespace,))
+        else:
+            connection.execute("DELETE FROM response_cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def _total_bytes(self, connection):
+        """Size of all cached values, from the trigger-maintained total."""
+        return connection.execute("SELECT total_bytes FROM response_cache_size").fetchone()[0]
+
+    def _evict(self, connection):
+        """Drop least recently used entries while the cache is over its size limit."""
+        if self._total_bytes(connection) <= self.max_bytes:
+            return
+
+        target = self.max_bytes * self.EVICT_TO
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have evicted in the meantime
+            total = self._total_bytes(connection)
+            doomed = []
+            rows = connection.execute("SELECT namespace, key, size FROM response_cache ORDER BY accessed_at")
+            for namespace, key, size in rows:
+                if total <= target:
+                    break
+                doomed.append((namespace, key))
+                total -= size
+            rows.close()
+            connection.executemany("DELETE FROM response_cache WHERE namespace = ? AND key = ?", doomed)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._lock:
+            self._evictions += len(doomed)
+        if doomed:
+            logger.info(f"Evicted {len(doomed)} cached responses")
+
+    def _stats_for(self, namespace):
+        """Counters for a namespace; callers must hold the lock."""
+        stats = self._stats.get(namespace)
+        if stats is None:
+            stats = self._stats[namespace] = {'hits': 0, 'misses': 0, 'revalidated': 0}
+        return stats
+
+    def _record(self, namespace, counter):
+        """Count a lookup outcome."""
+        with self._lock:
+            self._stats_for(namespace)[counter] += 1
+
+    def stats(self):
+        """Lookup counters for this process and entry counts for the whole cache.
+
+        Returns:
+            Dictionary with per-namespace counters, the total size in bytes
+            and the number of entries this process evicted
+        """
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT namespace, COUNT(*), SUM(size) FROM response_cache GROUP BY namespace"
+        ).fetchall()
+
+        with self._lock:
+            namespaces = {namespace: dict(stats) for namespace, stats in self._stats.items()}
+            evictions = self._evictions
+
+        for namespace, entries, size in rows:
+            namespaces.setdefault(namespace, {'hits': 0, 'misses': 0, 'revalidated': 0})
+            namespaces[namespace].update(entries=entries, bytes=size)
+
+        return {
+            'namespaces': namespaces,
+            'total_bytes': sum(size for namespace, entries, size in rows),
+            'max_bytes': self.max_bytes,
+            'evictions': evictions
+        }
+
+# Shared by every service in this process
+response_cache = ResponseCache()
@@ -0,0 +1,213 @@
+import re
+import logging
+from flask import current_app
+
+from .. import db
+from ..models.book import Book
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class BookSearchIndex:
+    """Full-text index over book metadata backed by an SQLite FTS5 table.
+
+    The ``book_fts`` virtual table is an external-content index over the
+    ``book`` table, kept in sync by triggers so every insert, update and
+    delete made through any connection is reflected immediately. Results are
+    ranked with BM25, weighting title matches above author and description.
+    """
+
+    TABLE_NAME = 'book_fts'
+
+    # BM25 column weights: title, author, description
+    COLUMN_WEIGHTS = (10.0, 5.0, 1.0)
+
+    SCHEMA = [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+            title, author, description,
+            content='book', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+            INSERT INTO book_fts(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF title, author, description ON book BEGIN
+            INSERT INTO book_fts(book_fts, rowid, title, author, description)
+            VALUES ('delete', old.id, old.title, old.author, old.description);
+            INSERT INTO book_fts(rowid, title, author, description)
+            VALUES (new.id, new.title, new.author, new.description);
+        END
+        """
+    ]
+
+    def ensure_index(self):
+        """Create the FTS table and sync triggers if they don't exist yet.
+
+        Must be called inside an application context. Existing books are
+        indexed the first time the table is created.
+
+        Returns:
+            True if the full-text index is available, False otherwise
+        """
+        if db.engine.dialect.name != 'sqlite':
+            current_app.config['BOOK_FTS_ENABLED'] = False
+            return False
+
+        try:
+            exists = db.session.execute(
+                db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': self.TABLE_NAME}
+            ).first() is not None
+
+            for statement in self.SCHEMA:
+                db.session.execute(db.text(statement))
+
+            if not exists:
+                logger.info("Building book full-text index")
+                self.rebuild()
+
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Full-text index unavailable, falling back to LIKE search: {str(e)}")
+            current_app.config['BOOK_FTS_ENABLED'] = False
+            return False
+
+        current_app.config['BOOK_FTS_ENABLED'] = True
+        return True
+
+    def rebuild(self):
+        """Rebuild the full-text index from the contents of the book table."""
+        db.session.execute(db.text(f"INSERT INTO {self.TABLE_NAME}({self.TABLE_NAME}) VALUES ('rebuild')"))
+
+    @staticmethod
+    def build_match_expression(query):
+        """Turn free-form user input into a safe FTS5 MATCH expression.
+
+        Every word is quoted so FTS5 operators in the input are treated as
+        plain text, and the last word is matched as a prefix so results
+        update sensibly while the user is still typing.
+
+        Args:
+            query: Search query string
+
+        Returns:
+            MATCH expression, or an empty string if the query has no words
+        """
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return ''
+
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def _like_filter(self, query):
+        """Substring filter used when the FTS index is unavailable."""
+        return (
+            (Book.title.ilike(f'%{query}%')) |
+            (Book.author.ilike(f'%{query}%')) |
+            (Book.description.ilike(f'%{query}%'))
+        )
+
+    def _ranked_matches(self, match):
+        """Subquery of matching book ids and their BM25 scores."""
+        weights = ', '.join(str(weight) for weight in self.COLUMN_WEIGHTS)
+        return db.text(
+            f"SELECT rowid AS book_id, bm25({self.TABLE_NAME}, {weights}) AS score "
+            f"FROM {self.TABLE_NAME} WHERE {self.TABLE_NAME} MATCH :match"
+        ).bindparams(match=match).columns(book_id=db.Integer, score=db.Float).subquery('fts')
+
+    def search(self, query, fields=None):
+        """Search books by title, author and description.
+
+        Args:
+            query: Search query string
+            fields: Optional list of Book.to_dict() fields to load (see
+                Book.listing_query); everything by default
+
+        Returns:
+            Book query ordered by relevance, best match first
+        """
+        if not current_app.config.get('BOOK_FTS_ENABLED'):
+            return Book.listing_query(fields=fields).filter(self._like_filter(query)).order_by(Book.title)
+
+        match = self.build_match_expression(query)
+        if not match:
+            return Book.query.filter(db.false())
+
+        fts = self._ranked_matches(match)
+        return Book.listing_query(fields=fields).join(fts, Book.id == fts.c.book_id).order_by(fts.c.score, Book.id)
+
+    def search_page(self, query, limit, after=None, fields=None):
+        """Fetch one page of search results using keyset pagination.
+
+        Args:
+            query: Search query string
+            limit: Maximum number of books to return
+            after: Sort key of the last book on the previous page, as
+                returned in the previous call's next key
+            fields: Optional list of Book.to_dict() fields to load (see
+                Book.listing_query); everything by default
+
+        Returns:
+            Tuple of (list of books, sort key to continue from or None)
+        """
+        if not current_app.config.get('BOOK_FTS_ENABLED'):
+            page_query = Book.listing_query(fields=fields).add_columns(Book.title).filter(self._like_filter(query))
+            sort_columns = (Book.title, Book.id)
+        else:
+            match = self.build_match_expression(query)
+            if not match:
+                return [], None
+
+            fts = self._ranked_matches(match)
+            page_query = Book.listing_query(fields=fields).add_columns(fts.c.score).join(fts, Book.id == fts.c.book_id)
+            sort_columns = (fts.c.score, Book.id)
+
+        if after is not None:
+            page_query = page_query.filter(db.tuple_(*sort_columns) > db.tuple_(*after))
+
+        rows = page_query.order_by(*sort_columns).limit(limit + 1).all()
+
+        books = [book for book, _ in rows[:limit]]
+        next_key = None
+        if len(rows) > limit:
+            book, key = rows[limit - 1]
+            next_key = [key, book.id]
+
+        return books, next_key
+
+    def count(self, query):
+        """Count the books matching a query without ranking or loading them.
+
+        Args:
+            query: Search query string
+
+        Returns:
+            Number of matching books
+        """
+        if not current_app.config.get('BOOK_FTS_ENABLED'):
+            return Book.query.filter(self._like_filter(query)).count()
+
+        match = self.build_match_expression(query)
+        if not match:
+            return 0
+
+        return db.session.execute(
+            db.text(f"SELECT count(*) FROM {self.TABLE_NAME} WHERE {self.TABLE_NAME} MATCH :match"),
+            {'match': match}
+        ).scalar()
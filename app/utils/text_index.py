@@ -0,0 +1,355 @@
+import os
+import html
+import logging
+from datetime import datetime
+from flask import current_app
+
+from .. import db
+from ..models.book import Book
+from .search_index import BookSearchIndex
+from .text_processor import TextProcessor
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class BookTextIndex:
+    """Positional full-text index over the stored text of every book.
+
+    Each book's text file is streamed line by line and cut into passages at
+    paragraph breaks. Passages are stored in an FTS5 table, with their book,
+    chapter and character offsets kept in ``book_text_passage`` so hits can
+    be mapped straight back into the text file. Books are indexed one at a
+    time and skipped when their text file hasn't changed, so importing a
+    book never triggers a full rebuild.
+    """
+
+    FTS_TABLE = 'book_text_fts'
+    PASSAGE_TABLE = 'book_text_passage'
+    STATE_TABLE = 'book_text_index_state'
+
+    # Paragraphs longer than this are cut at the next line break
+    MAX_PASSAGE_CHARS = 2000
+
+    # Number of passages written per INSERT batch
+    BATCH_SIZE = 500
+
+    # Sentinels used to locate highlighted terms before HTML escaping
+    MARK_START = '\x01'
+    MARK_END = '\x02'
+
+    SCHEMA = [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS book_text_fts USING fts5(
+            body,
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS book_text_passage (
+            id INTEGER PRIMARY KEY,
+            book_id INTEGER NOT NULL,
+            chapter INTEGER NOT NULL,
+            chapter_title TEXT,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_book_text_passage_book_id ON book_text_passage (book_id)",
+        """
+        CREATE TABLE IF NOT EXISTS book_text_index_state (
+            book_id INTEGER PRIMARY KEY,
+            file_path TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            file_mtime REAL NOT NULL,
+            passage_count INTEGER NOT NULL,
+            indexed_at TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS book_text_index_ad AFTER DELETE ON book BEGIN
+            DELETE FROM book_text_fts WHERE rowid IN (
+                SELECT id FROM book_text_passage WHERE book_id = old.id
+            );
+            DELETE FROM book_text_passage WHERE book_id = old.id;
+            DELETE FROM book_text_index_state WHERE book_id = old.id;
+        END
+        """
+    ]
+
+    def __init__(self, text_processor=None):
+        """Initialize the book text index.
+
+        Args:
+            text_processor: TextProcessor used for chapter detection
+        """
+        self.text_processor = text_processor or TextProcessor()
+
+    def ensure_index(self):
+        """Create the index tables if they don't exist yet.
+
+        Must be called inside an application context.
+
+        Returns:
+            True if the book text index is available, False otherwise
+        """
+        if db.engine.dialect.name != 'sqlite':
+            current_app.config['BOOK_TEXT_INDEX_ENABLED'] = False
+            return False
+
+        try:
+            for statement in self.SCHEMA:
+                db.session.execute(db.text(statement))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Book text index unavailable: {str(e)}")
+            current_app.config['BOOK_TEXT_INDEX_ENABLED'] = False
+            return False
+
+        current_app.config['BOOK_TEXT_INDEX_ENABLED'] = True
+        return True
+
+    def iter_passages(self, text_file_path):
+        """Stream passages out of a text file.
+
+        The file is read one line at a time, so memory use is bounded by the
+        passage size rather than the book size.
+
+        Args:
+            text_file_path: Path to the book's text file
+
+        Yields:
+            Dictionaries with chapter, chapter_title, start_offset,
+            end_offset and body; offsets are character positions in the file
+        """
+        chapter_pattern = self.text_processor.chapter_pattern()
+        chapter = 0
+        chapter_title = None
+
+        offset = 0
+        start = None
+        lines = []
+        length = 0
+
+        def make_passage():
+            body = ''.join(lines)
+            return {
+                'chapter': chapter,
+                'chapter_title': chapter_title,
+                'start_offset': start,
+                'end_offset': start + len(body.rstrip()),
+                'body': body.rstrip()
+            }
+
+        with open(text_file_path, 'r', encoding='utf-8', newline='') as f:
+            for line in f:
+                is_blank = not line.strip()
+                is_heading = not is_blank and chapter_pattern.match(line) is not None
+
+                # Paragraph breaks, chapter headings and oversized paragraphs end a passage
+                if lines and (is_blank or is_heading or length >= self.MAX_PASSAGE_CHARS):
+                    yield make_passage()
+                    lines = []
+                    length = 0
+
+                if is_heading:
+                    chapter += 1
+                    chapter_title = line.strip()
+
+                if not is_blank:
+                    if not lines:
+                        start = offset
+                    lines.append(line)
+                    length += len(line)
+
+                offset += len(line)
+
+        if lines:
+            yield make_passage()
+
+    def index_book(self, book, force=False):
+        """Index (or re-index) the text of a single book.
+
+        Args:
+            book: Book to index
+            force: Re-index even if the text file hasn't changed
+
+        Returns:
+            Number of passages indexed, or None if the book was skipped
+        """
+        if not current_app.config.get('BOOK_TEXT_INDEX_ENABLED'):
+            return None
+
+        if not book.text_file_path or not os.path.exists(book.text_file_path):
+            self.remove_book(book.id)
+            return None
+
+        stat = os.stat(book.text_file_path)
+
+        if not force:
+            state = db.session.execute(
+                db.text(f"SELECT file_path, file_size, file_mtime FROM {self.STATE_TABLE} WHERE book_id = :book_id"),
+                {'book_id': book.id}
+            ).first()
+            if state and tuple(state) == (book.text_file_path, stat.st_size, stat.st_mtime):
+                return None
+
+        logger.info(f"Indexing text of book {book.id}: {book.text_file_path}")
+
+        try:
+            self.remove_book(book.id, commit=False)
+
+            next_id = db.session.execute(
+                db.text(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {self.PASSAGE_TABLE}")
+            ).scalar()
+
+            count = 0
+            batch = []
+            for passage in self.iter_passages(book.text_file_path):
+                passage['id'] = next_id + count
+                passage['book_id'] = book.id
+                batch.append(passage)
+                count += 1
+
+                if len(batch) >= self.BATCH_SIZE:
+                    self._write_passages(batch)
+                    batch = []
+
+            if batch:
+                self._write_passages(batch)
+
+            db.session.execute(
+                db.text(
+                    f"INSERT OR REPLACE INTO {self.STATE_TABLE} "
+                    "(book_id, file_path, file_size, file_mtime, passage_count, indexed_at) "
+                    "VALUES (:book_id, :file_path, :file_size, :file_mtime, :passage_count, :indexed_at)"
+                ),
+                {
+                    'book_id': book.id,
+                    'file_path': book.text_file_path,
+                    'file_size': stat.st_size,
+                    'file_mtime': stat.st_mtime,
+                    'passage_count': count,
+                    'indexed_at': datetime.utcnow().isoformat()
+                }
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return count
+
+    def _write_passages(self, passages):
+        """Write a batch of passages to the passage and FTS tables."""
+        db.session.execute(
+            db.text(
+                f"INSERT INTO {self.PASSAGE_TABLE} "
+                "(id, book_id, chapter, chapter_title, start_offset, end_offset) "
+                "VALUES (:id, :book_id, :chapter, :chapter_title, :start_offset, :end_offset)"
+            ),
+            passages
+        )
+        db.session.execute(
+            db.text(f"INSERT INTO {self.FTS_TABLE} (rowid, body) VALUES (:id, :body)"),
+            passages
+        )
+
+    def remove_book(self, book_id, commit=True):
+        """Remove a book's passages from the index.
+
+        Args:
+            book_id: ID of the book to remove
+            commit: Whether to commit the session afterwards
+        """
+        params = {'book_id': book_id}
+        db.session.execute(
+            db.text(
+                f"DELETE FROM {self.FTS_TABLE} WHERE rowid IN "
+                f"(SELECT id FROM {self.PASSAGE_TABLE} WHERE book_id = :book_id)"
+            ),
+            params
+        )
+        db.session.execute(db.text(f"DELETE FROM {self.PASSAGE_TABLE} WHERE book_id = :book_id"), params)
+        db.session.execute(db.text(f"DELETE FROM {self.STATE_TABLE} WHERE book_id = :book_id"), params)
+
+        if commit:
+            db.session.commit()
+
+    def index_all(self, force=False):
+        """Index every book whose text has changed since it was last indexed.
+
+        Args:
+            force: Re-index every book regardless of its state
+
+        Returns:
+            Dictionary with counts of indexed and skipped books
+        """
+        stats = {'indexed': 0, 'skipped': 0, 'failed': 0}
+
+        for book in Book.query.filter(Book.text_file_path.isnot(None)).order_by(Book.id).yield_per(100):
+            try:
+                if self.index_book(book, force=force) is None:
+                    stats['skipped'] += 1
+                else:
+                    stats['indexed'] += 1
+            except Exception as e:
+                logger.error(f"Failed to index book {book.id}: {str(e)}")
+                stats['failed'] += 1
+
+        return stats
+
+    def search(self, query, limit=20):
+        """Search the text of all indexed books.
+
+        Args:
+            query: Search query string
+            limit: Maximum number of hits to return
+
+        Returns:
+            List of hit dictionaries with book_id, title, chapter,
+            chapter_title, start_offset, end_offset, match_offset and an
+            HTML snippet with matches wrapped in <mark> tags
+        """
+        if not current_app.config.get('BOOK_TEXT_INDEX_ENABLED'):
+            return []
+
+        match = BookSearchIndex.build_match_expression(query)
+        if not match:
+            return []
+
+        rows = db.session.execute(
+            db.text(
+                f"SELECT p.book_id, b.title, p.chapter, p.chapter_title, p.start_offset, p.end_offset, "
+                f"snippet({self.FTS_TABLE}, 0, :mark_start, :mark_end, '…', 24) AS snippet, "
+                f"highlight({self.FTS_TABLE}, 0, :mark_start, :mark_end) AS highlighted "
+                f"FROM {self.FTS_TABLE} "
+                f"JOIN {self.PASSAGE_TABLE} p ON p.id = {self.FTS_TABLE}.rowid "
+                f"JOIN book b ON b.id = p.book_id "
+                f"WHERE {self.FTS_TABLE} MATCH :match "
+                f"ORDER BY rank LIMIT :limit"
+            ),
+            {'match': match, 'limit': limit, 'mark_start': self.MARK_START, 'mark_end': self.MARK_END}
+        ).mappings()
+
+        hits = []
+        for row in rows:
+            match_position = row['highlighted'].find(self.MARK_START)
+            hits.append({
+                'book_id': row['book_id'],
+                'title': row['title'],
+                'chapter': row['chapter'],
+                'chapter_title': row['chapter_title'],
+                'start_offset': row['start_offset'],
+                'end_offset': row['end_offset'],
+                'match_offset': row['start_offset'] + max(match_position, 0),
+                'snippet': self._render_snippet(row['snippet'])
+            })
+
+        return hits
+
+    def _render_snippet(self, snippet):
+        """Escape a raw snippet and turn the match sentinels into <mark> tags."""
+        escaped = html.escape(snippet)
+        return escaped.replace(self.MARK_START, '<mark>').replace(self.MARK_END, '</mark>')
@@ -1,9 +1,13 @@
 import re
 import logging
 import html
+import zipfile
+import posixpath
 import markdown
 from bs4 import BeautifulSoup
+from lxml import etree
 from pathlib import Path
+from urllib.parse import unquote
 import ebooklib
 from ebooklib import epub
 
@@ -11,12 +15,127 @@ from ebooklib import epub
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class HtmlTextTarget:
+    """lxml parser target that collects the text of an HTML document as it is parsed.
+    
+    No tree is built: the document head, scripts and styles are skipped as
+    they stream past, whitespace inside text is collapsed the way a browser would, and
+    block elements such as paragraphs and headings are separated by blank
+    lines instead of being run together.
+    """
+    
+    # Elements whose contents are not displayed as text
+    SKIP_TAGS = frozenset({'head', 'script', 'style'})
+    
+    # Elements that start and end a paragraph of their own
+    BLOCK_TAGS = frozenset({
+        'address', 'article', 'aside', 'blockquote', 'body', 'caption', 'dd', 'div', 'dl', 'dt',
+        'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+        'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul'
+    })
+    
+    # Runs of HTML whitespace other than a lone space, which needs no change
+    WHITESPACE = re.compile(r'[ \t\n\r\f]{2,}|[\t\n\r\f]')
+    
+    def __init__(self):
+        self.parts = []
+        self.skip_depth = 0
+        self.pre_depth = 0
+        self.pending_breaks = 0
+        self.line_start = True
+    
+    def start(self, tag, attrib):
+        tag = tag.lower()
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif self.skip_depth:
+            return
+        elif tag == 'br':
+            self._break(1)
+        elif tag in self.BLOCK_TAGS:
+            self._break(2)
+        
+        if tag == 'pre':
+            self.pre_depth += 1
+    
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in self.SKIP_TAGS:
+            self.skip_depth -= 1
+        elif tag in self.BLOCK_TAGS and not self.skip_depth:
+            self._break(2)
+        
+        if tag == 'pre':
+            self.pre_depth -= 1
+    
+    def data(self, data):
+        if self.skip_depth:
+            return
+        
+        if not self.pre_depth:
+            data = self.WHITESPACE.sub(' ', data)
+            if self.line_start or self.parts[-1].endswith(' '):
+                data = data.lstrip(' ')
+        if not data:
+            return
+        
+        if self.pending_breaks and self.parts:
+            self.parts.append('\n' * self.pending_breaks)
+        self.pending_breaks = 0
+        self.parts.append(data)
+        self.line_start = data.endswith('\n')
+    
+    def _break(self, newlines):
+        """End the current line, or paragraph if newlines is 2."""
+        if self.parts and not self.pre_depth:
+            self.parts[-1] = self.parts[-1].rstrip(' ')
+        self.pending_breaks = max(self.pending_breaks, newlines)
+        self.line_start = True
+    
+    def close(self):
+        return ''.join(self.parts)
+
 class TextProcessor:
     """Utility for processing and converting text content from various sources."""
     
-    def __init__(self):
-        """Initialize the text processor."""
-        pass
+    # Default regex patterns for chapter headings
+    CHAPTER_MARKERS = [
+        r'^CHAPTER [IVXLCDM]+\.?',  # CHAPTER I, CHAPTER II, etc.
+        r'^CHAPTER \d+\.?',         # CHAPTER 1, CHAPTER 2, etc.
+        r'^Chapter [IVXLCDM]+\.?',  # Chapter I, Chapter II, etc.
+        r'^Chapter \d+\.?',         # Chapter 1, Chapter 2, etc.
+        r'^\d+\.',                  # 1., 2., etc.
+        r'^[IVXLCDM]+\.',           # I., II., etc.
+    ]
+    
+    # Runs of spaces, and of three or more newlines, collapsed by clean_text
+    WHITESPACE_RUNS = re.compile(r' {2,}|\n{3,}')
+    
+    # XML namespaces of the EPUB container and package (OPF) documents
+    CONTAINER_NS = '{urn:oasis:names:tc:opendocument:xmlns:container}'
+    OPF_NS = '{http://www.idpf.org/2007/opf}'
+    
+    # Media types of the spine documents that hold a book's text
+    EPUB_DOCUMENT_TYPES = frozenset({'application/xhtml+xml', 'text/html'})
+    
+    # Ways html_to_text can extract text
+    HTML_EXTRACTORS = ('lxml', 'beautifulsoup')
+    
+    def __init__(self, html_extractor='lxml'):
+        """Initialize the text processor.
+        
+        Args:
+            html_extractor: 'lxml' to stream HTML through an lxml parser
+                target, or 'beautifulsoup' for the original extraction, which
+                runs paragraphs together as get_text() does
+        """
+        if html_extractor not in self.HTML_EXTRACTORS:
+            raise ValueError(f"Unknown HTML extractor: {html_extractor}")
+        self.html_extractor = html_extractor
+    
+    def _collapse_whitespace(self, text):
+        """Collapse space runs to one space and newline runs to a blank line, in one pass."""
+        return self.WHITESPACE_RUNS.sub(lambda match: ' ' if match.group()[0] == ' ' else '\n\n', text)
     
     def clean_text(self, text):
         """Clean text content by removing extra whitespace, normalizing line breaks, etc.
@@ -30,20 +149,54 @@ class TextProcessor:
         if not text:
             return ""
         
-        # Replace multiple spaces with a single space
-        text = re.sub(r' +', ' ', text)
+        return ''.join(self.iter_clean_text([text]))
+    
+    def iter_clean_text(self, chunks):
+        """Clean text that arrives in chunks, without joining it first.
         
-        # Replace multiple newlines with at most two
-        text = re.sub(r'\n{3,}', '\n\n', text)
+        Produces exactly what clean_text() would for the joined chunks, so a
+        large book can be cleaned while it is read and written out. Trailing
+        whitespace in each chunk is held back until the next chunk shows
+        whether it is part of a longer run or the end of the text.
         
-        # Strip leading/trailing whitespace
-        text = text.strip()
+        Args:
+            chunks: Iterable of text chunks
+            
+        Yields:
+            Cleaned text chunks
+        """
+        pending = ''
+        started = False
         
-        return text
+        for chunk in chunks:
+            if not chunk:
+                continue
+            
+            text = pending + chunk if pending else chunk
+            end = len(text)
+            while end and text[end - 1].isspace():
+                end -= 1
+            
+            if not end:
+                # Only whitespace so far; leading whitespace is dropped
+                pending = self._collapse_whitespace(text) if started else ''
+                continue
+            
+            pending = text[end:]
+            body = text[:end] if pending else text
+            if not started:
+                body = body.lstrip()
+                started = True
+            
+            yield self._collapse_whitespace(body)
     
     def html_to_text(self, html_content):
         """Convert HTML content to plain text.
         
+        Paragraphs, headings and other blocks are separated by blank lines
+        unless the text processor was created with the 'beautifulsoup'
+        extractor.
+        
         Args:
             html_content: HTML content
             
@@ -53,6 +206,23 @@ class TextProcessor:
         if not html_content:
             return ""
         
+        # Clean up text
+        return self.clean_text(self._extract_html_text(html_content))
+    
+    def _extract_html_text(self, html_content):
+        """Text of an HTML document before clean-up."""
+        if self.html_extractor == 'beautifulsoup':
+            return self._soup_to_text(html_content)
+        
+        # EPUB documents are UTF-8; feed() also accepts text that starts
+        # with an XML encoding declaration, which fromstring() rejects
+        encoding = 'utf-8' if isinstance(html_content, bytes) else None
+        parser = etree.HTMLParser(target=HtmlTextTarget(), encoding=encoding)
+        parser.feed(html_content)
+        return parser.close()
+    
+    def _soup_to_text(self, html_content):
+        """Extract text with BeautifulSoup, as html_to_text originally did."""
         # Parse HTML
         soup = BeautifulSoup(html_content, 'lxml')
         
@@ -61,12 +231,7 @@ class TextProcessor:
             script.decompose()
         
         # Get text
-        text = soup.get_text()
-        
-        # Clean up text
-        text = self.clean_text(text)
-        
-        return text
+        return soup.get_text()
     
     def text_to_html(self, text, title=None, author=None):
         """Convert plain text to HTML.
@@ -79,17 +244,88 @@ class TextProcessor:
         Returns:
             HTML content
         """
-        if not text:
-            return ""
+        return ''.join(self.iter_html([text], title=title, author=author))
+    
+    def write_html(self, chunks, out, title=None, author=None, chapters=None):
+        """Convert plain text to HTML, writing it to a file as it is converted.
         
-        # Escape HTML entities
-        text = html.escape(text)
+        Writes exactly what text_to_html() returns for the joined chunks,
+        without holding the whole text or document in memory.
         
-        # Convert paragraphs (blank lines) to <p> tags
-        paragraphs = text.split('\n\n')
-        html_paragraphs = [f"<p>{p.replace('\n', '<br>')}</p>" for p in paragraphs if p.strip()]
+        Args:
+            chunks: Iterable of plain text chunks, e.g. a text file read in blocks
+            out: Text file object to write the HTML to
+            title: Optional title for the HTML document
+            author: Optional author for the HTML document
+            chapters: Optional chapter index of the text (see ChapterIndex);
+                each chapter's paragraph gets an id for deep links
+        """
+        for piece in self.iter_html(chunks, title=title, author=author, chapters=chapters):
+            out.write(piece)
+    
+    def iter_html(self, chunks, title=None, author=None, chapters=None):
+        """Convert plain text that arrives in chunks to HTML, one paragraph at a time.
         
-        # Build HTML document
+        Paragraphs are split on blank lines exactly as text_to_paragraphs()
+        splits them, however the chunks divide the text. A paragraph that
+        spans chunks is kept as a list of pieces until its end is seen.
+        
+        If a chapter index is given, the paragraph containing each chapter's
+        ``char_start`` gets the id ``chapter-<number>``.
+        
+        Args:
+            chunks: Iterable of plain text chunks
+            title: Optional title for the HTML document
+            author: Optional author for the HTML document
+            chapters: Optional chapter index of the text
+            
+        Yields:
+            Pieces of the HTML document; nothing if the text is empty
+        """
+        anchors = sorted((chapter['char_start'], chapter['number']) for chapter in chapters or [])
+        started = False
+        pending = []
+        offset = 0
+        
+        def paragraph_html(paragraph):
+            nonlocal offset
+            end = offset + len(paragraph)
+            offset = end + 2
+            if not paragraph.strip():
+                # Anchors in blank text move on to the next paragraph
+                return ''
+            
+            numbers = []
+            while anchors and anchors[0][0] < end:
+                numbers.append(anchors.pop(0)[1])
+            return "\n" + self._paragraph_html(html.escape(paragraph), numbers)
+        
+        for chunk in chunks:
+            if not chunk:
+                continue
+            
+            if not started:
+                yield self._html_header(title, author)
+                started = True
+            
+            if pending and pending[-1].endswith('\n') and chunk.startswith('\n'):
+                # A blank line split across the chunks
+                pending[-1] = pending[-1][:-1]
+                parts = [''] + chunk[1:].split('\n\n')
+            else:
+                parts = chunk.split('\n\n')
+            
+            pending.append(parts[0])
+            for part in parts[1:]:
+                yield paragraph_html(''.join(pending))
+                pending = [part]
+        
+        if started:
+            yield paragraph_html(''.join(pending))
+            yield "\n</body>\n</html>"
+    
+    def _html_header(self, title=None, author=None):
+        """Start of the HTML document text_to_html() produces, up to the first paragraph."""
         html_content = []
         html_content.append("<!DOCTYPE html>")
         html_content.append("<html>")
@@ -113,12 +349,33 @@ class TextProcessor:
         if author:
             html_content.append(f"<h2>by {html.escape(author)}</h2>")
         
-        html_content.extend(html_paragraphs)
+        return "\n".join(html_content)
+    
+    def _paragraph_html(self, paragraph, chapter_numbers=()):
+        """Wrap an escaped paragraph in <p>, with the ids of chapters starting in it."""
+        ids = [f"chapter-{number}" for number in chapter_numbers]
+        if not ids:
+            return "<p>" + paragraph.replace('\n', '<br>') + "</p>"
+        
+        # Further chapters starting in the same paragraph get empty anchors
+        extra = ''.join(f'<a id="{anchor_id}"></a>' for anchor_id in ids[1:])
+        return f'<p id="{ids[0]}">' + extra + paragraph.replace('\n', '<br>') + "</p>"
+    
+    def text_to_paragraphs(self, text):
+        """Convert plain text to a list of escaped HTML paragraphs.
         
-        html_content.append("</body>")
-        html_content.append("</html>")
+        Args:
+            text: Plain text content
+            
+        Returns:
+            List of <p> elements, one per blank-line separated paragraph
+        """
+        # Escape HTML entities
+        text = html.escape(text)
         
-        return "\n".join(html_content)
+        # Convert paragraphs (blank lines) to <p> tags
+        paragraphs = text.split('\n\n')
+        return [self._paragraph_html(p) for p in paragraphs if p.strip()]
     
     def markdown_to_html(self, markdown_content, title=None, author=None):
         """Convert Markdown content to HTML.
@@ -289,6 +546,92 @@ class TextProcessor:
                 'content': []
             }
     
+    def iter_epub_documents(self, epub_path):
+        """Read an EPUB's content documents in reading order, one at a time.
+        
+        The EPUB is opened as a zip file and only its container and package
+        documents are parsed up front; each document listed in the package's
+        spine is read from the archive when it is reached. The navigation
+        document is skipped, as it only repeats the table of contents.
+        
+        Args:
+            epub_path: Path to the EPUB file
+            
+        Yields:
+            Dictionaries with the id, name (path inside the EPUB) and raw
+            content bytes of each document, in spine order
+            
+        Raises:
+            zipfile.BadZipFile, KeyError or lxml.etree.XMLSyntaxError if
+            the file is not a readable EPUB
+        """
+        container_ns, opf_ns = self.CONTAINER_NS, self.OPF_NS
+        parser = etree.XMLParser(resolve_entities=False, no_network=True)
+        
+        with zipfile.ZipFile(epub_path) as archive:
+            container = etree.fromstring(archive.read('META-INF/container.xml'), parser)
+            rootfile = container.find(f'{container_ns}rootfiles/{container_ns}rootfile')
+            if rootfile is None or not rootfile.get('full-path'):
+                raise KeyError(f"No package document listed in {epub_path}")
+            
+            opf_path = rootfile.get('full-path')
+            package = etree.fromstring(archive.read(opf_path), parser)
+            manifest = {
+                item.get('id'): item
+                for item in package.iterfind(f'{opf_ns}manifest/{opf_ns}item')
+            }
+            
+            # Document hrefs are URLs relative to the package document
+            base = posixpath.dirname(opf_path)
+            
+            for itemref in package.iterfind(f'{opf_ns}spine/{opf_ns}itemref'):
+                item = manifest.get(itemref.get('idref'))
+                if item is None or item.get('media-type') not in self.EPUB_DOCUMENT_TYPES:
+                    continue
+                if 'nav' in (item.get('properties') or '').split():
+                    continue
+                
+                name = posixpath.normpath(posixpath.join(base, unquote(item.get('href', ''))))
+                try:
+                    content = archive.read(name)
+                except KeyError:
+                    logger.warning(f"Spine document {name} missing from {epub_path}")
+                    continue
+                
+                yield {
+                    'id': item.get('id'),
+                    'name': name,
+                    'content': content
+                }
+    
+    def iter_epub_text(self, epub_path):
+        """Extract an EPUB's plain text as a stream of chunks, in reading order.
+        
+        Documents are extracted one at a time, separated by blank lines, and
+        the stream is cleaned with iter_clean_text(), so only one document
+        and its text are held in memory at once and the text can be written
+        out as it is extracted. The joined chunks are the book's text.
+        
+        Args:
+            epub_path: Path to the EPUB file
+            
+        Returns:
+            Iterator of cleaned text chunks
+        """
+        return self.iter_clean_text(self._iter_epub_raw_text(epub_path))
+    
+    def _iter_epub_raw_text(self, epub_path):
+        """Text of each EPUB document before clean-up, with blank lines between them."""
+        started = False
+        for document in self.iter_epub_documents(epub_path):
+            text = self._extract_html_text(document['content'])
+            if not text or text.isspace():
+                continue
+            if started:
+                yield "\n\n"
+            started = True
+            yield text
+    
     def extract_text_from_epub(self, epub_path):
         """Extract plain text from an EPUB file.
         
@@ -296,16 +639,13 @@ class TextProcessor:
             epub_path: Path to the EPUB file
             
         Returns:
-            Plain text content
+            Plain text content, with the documents in reading order
         """
-        book_data = self.extract_epub_content(epub_path)
-        
-        text_content = []
-        for item in book_data.get('content', []):
-            html_content = item.get('content', '')
-            text_content.append(self.html_to_text(html_content))
-        
-        return "\n\n".join(text_content)
+        try:
+            return ''.join(self.iter_epub_text(epub_path))
+        except Exception as e:
+            logger.error(f"Error extracting EPUB text: {e}")
+            return ""
     
     def split_into_chapters(self, text, chapter_markers=None):
         """Split text into chapters based on markers.
@@ -320,23 +660,10 @@ class TextProcessor:
         if not text:
             return []
         
-        if not chapter_markers:
-            # Default chapter markers
-            chapter_markers = [
-                r'^CHAPTER [IVXLCDM]+\.?',  # CHAPTER I, CHAPTER II, etc.
-                r'^CHAPTER \d+\.?',         # CHAPTER 1, CHAPTER 2, etc.
-                r'^Chapter [IVXLCDM]+\.?',  # Chapter I, Chapter II, etc.
-                r'^Chapter \d+\.?',         # Chapter 1, Chapter 2, etc.
-                r'^\d+\.',                  # 1., 2., etc.
-                r'^[IVXLCDM]+\.',           # I., II., etc.
-            ]
-        
-        # Combine all patterns
-        combined_pattern = '|'.join(f'({pattern})' for pattern in chapter_markers)
-        
         # Find all chapter starts
+        chapter_pattern = self.chapter_pattern(chapter_markers)
         chapter_starts = []
-        for match in re.finditer(combined_pattern, text, re.MULTILINE):
+        for match in chapter_pattern.finditer(text):
             chapter_starts.append(match.start())
         
         # If no chapters found, return the whole text as one chapter
@@ -351,3 +678,19 @@ class TextProcessor:
             chapters.append(text[start:end].strip())
         
         return chapters
+    
+    def chapter_pattern(self, chapter_markers=None):
+        """Compile chapter heading markers into a single multiline regex.
+        
+        Args:
+            chapter_markers: List of regex patterns for chapter headings
+            
+        Returns:
+            Compiled regex matching any of the markers at the start of a line
+        """
+        if not chapter_markers:
+            chapter_markers = self.CHAPTER_MARKERS
+        
+        # Combine all patterns
+        combined_pattern = '|'.join(f'({pattern})' for pattern in chapter_markers)
+        return re.compile(combined_pattern, re.MULTILINE)
@@ -0,0 +1,136 @@
+"""
+Batch importer for the Remixable Fiction Library.
+This script queues imports for every book listed in a manifest and, with --run,
+imports them right away with one thread per source. Each source's requests stay
+serialized behind its REQUEST_DELAY while different sources download in parallel.
+Progress lives in the import job table, so re-running the same manifest after a
+crash continues the same batch: books that were already imported are skipped,
+finished downloads are reused and the crashed run's jobs are requeued at once.
+
+Manifests are CSV files of "source,identifier" lines (a header line and lines
+starting with # are ignored) or JSON lists of {"source": ..., "identifier": ...}.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import socket
+import argparse
+import logging
+import threading
+
+from app import create_app, db
+from app.models.import_job import ImportJob
+from app.services.import_queue import ImportQueue
+from app.services.book_importer import BookImporter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def read_manifest(path):
+    """Read (source, identifier) pairs from a manifest file.
+
+    Args:
+        path: Path to a CSV or JSON manifest
+
+    Returns:
+        List of (source, identifier) tuples
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            return [(item.get('source'), item.get('identifier')) for item in json.load(f)]
+
+        items = []
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#') or row[0].strip() == 'source':
+                continue
+            if len(row) >= 2:
+                items.append((row[0].strip(), row[1].strip()))
+        return items
+
+def run_source(app, source, poll_interval, stop):
+    """Import one source's queued jobs until none are left.
+
+    Args:
+        app: Flask application
+        source: Source whose jobs this thread runs
+        poll_interval: Seconds to wait while retries are not yet due
+        stop: Event that ends the loop early
+    """
+    with app.app_context():
+        queue = ImportQueue(worker_id=f"{socket.gethostname()}:{os.getpid()}:{source}")
+
+        while not stop.is_set():
+            if queue.work([source]) is not None:
+                continue
+
+            unfinished = db.session.query(ImportJob.id).filter(
+                ImportJob.source == source,
+                ImportJob.status.in_(('queued', 'running'))
+            ).count()
+            if not unfinished:
+                break
+
+            # Waiting for a retry to come due, or for a crashed run's lease to expire
+            stop.wait(poll_interval)
+            queue.requeue_stale()
+
+def main():
+    """Queue, and optionally run, the imports listed in a manifest."""
+    parser = argparse.ArgumentParser(description='Import the books listed in a manifest.')
+    parser.add_argument('manifest', help='CSV or JSON manifest of (source, identifier) pairs')
+    parser.add_argument('--run', action='store_true', help='Import the books now instead of leaving them to worker.py')
+    parser.add_argument('--poll-interval', type=float, default=5.0, help='Seconds to wait for retries to come due')
+    parser.add_argument('--batch-id', help="Batch to resume; defaults to the batch of the manifest's unfinished jobs")
+    args = parser.parse_args()
+
+    items = read_manifest(args.manifest)
+    app = create_app()
+
+    with app.app_context():
+        queue = ImportQueue()
+        batch_id = args.batch_id or queue.find_batch(items)
+        if batch_id:
+            # Jobs a crashed run left running would otherwise wait out their lease
+            logger.info(f"Resuming batch {batch_id}")
+            queue.requeue_orphaned(batch_id)
+        queue.requeue_stale()
+        result = queue.enqueue_batch(items, batch_id=batch_id)
+
+    logger.info(f"Batch {result['batch_id']}: {result['queued']} queued, {result['pending']} already pending, "
+                f"{result['imported']} already imported, {result['invalid']} invalid")
+
+    if not args.run:
+        return 0
+
+    sources = sorted({source for source, identifier in items if source in BookImporter.SOURCES})
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=run_source, args=(app, source, args.poll_interval, stop), name=source)
+        for source in sources
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping after the current imports; run again to resume")
+        stop.set()
+
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        status = queue.batch_status(result['batch_id'])
+    for source, counts in status.items():
+        logger.info(f"{source}: {counts}")
+
+    return 0 if all(counts['failed'] == 0 for counts in status.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
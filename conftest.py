@@ -0,0 +1,29 @@
+"""
+Shared pytest fixtures for the Remixable Fiction Library tests.
+Each test gets its own application bound to a throwaway SQLite database.
+"""
+
+import pytest
+
+from app import create_app, db
+from app.models.license import License
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Create an application instance backed by a temporary database."""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'library.db'}",
+    })
+
+    with app.app_context():
+        License.seed_default_licenses(db.session)
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    """Test client for the application."""
+    return app.test_client()
@@ -0,0 +1,64 @@
+"""
+Offline indexer for the Remixable Fiction Library.
+This script builds or updates the full-text index over the stored text of every book,
+the chapter index of books imported before chapter indexes were stored, and
+the precompressed download variants of their text and HTML files.
+Books whose text file hasn't changed since they were last indexed are skipped.
+"""
+
+import os
+import sys
+import argparse
+import logging
+
+from app import create_app, db
+from app.models.book import Book
+from app.utils.text_index import BookTextIndex
+from app.utils.chapter_index import ChapterIndex
+from app.utils.file_server import BookFileServer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def main():
+    """Index the text of all books."""
+    parser = argparse.ArgumentParser(description='Build the full-text index over book contents.')
+    parser.add_argument('--rebuild', action='store_true', help='Re-index every book, even if unchanged')
+    args = parser.parse_args()
+    
+    app = create_app()
+    
+    with app.app_context():
+        # Backfill chapter indexes for books that don't have one yet
+        chapter_index = ChapterIndex()
+        failed = 0
+        for book in Book.query.filter(Book.text_file_path.isnot(None)).order_by(Book.id):
+            if (args.rebuild or not book.chapters) and os.path.exists(book.text_file_path):
+                try:
+                    chapter_index.store(book)
+                    db.session.commit()
+                except Exception as e:
+                    logger.error(f"Failed to build chapter index for book {book.id}: {str(e)}")
+                    db.session.rollback()
+                    failed += 1
+        
+        # Backfill precompressed variants for books imported before they were written
+        file_server = BookFileServer()
+        for book in Book.query.order_by(Book.id):
+            paths = [p for p in (book.text_file_path, book.html_file_path) if p and os.path.exists(p)]
+            if args.rebuild or any(not os.path.exists(f"{p}.gz") for p in paths):
+                try:
+                    file_server.prepare_files(book)
+                except Exception as e:
+                    logger.error(f"Failed to prepare files of book {book.id}: {str(e)}")
+                    failed += 1
+        
+        stats = BookTextIndex().index_all(force=args.rebuild)
+        stats['failed'] += failed
+    
+    logger.info(f"Indexed {stats['indexed']} books, skipped {stats['skipped']}, failed {stats['failed']}")
+    return 0 if stats['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
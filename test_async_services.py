@@ -0,0 +1,81 @@
+"""
+Tests for the asyncio variants of the source services.
+"""
+
+import time
+import asyncio
+import threading
+
+from app.services.async_services import AsyncProjectGutenbergService, AsyncWikisourceService
+
+
+class FakeService:
+    """Stands in for a source service; each call blocks briefly like a request."""
+
+    DELAY = 0.2
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.written = None
+
+    def _request(self):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.DELAY)
+        with self.lock:
+            self.running -= 1
+
+    def get_book_details(self, book_id, use_cache=True):
+        if book_id == 'missing':
+            raise RuntimeError('not found')
+        if book_id == 'Big_Book':
+            return {
+                'title': 'Big Book',
+                'sections': [{'title': f'Part {n}', 'url': f'https://example.org/wiki/Big_Book/{n}'} for n in range(6)]
+            }
+        self._request()
+        return {'id': book_id}
+
+    def fetch_section(self, section):
+        self._request()
+        if section['title'] == 'Part 3':
+            raise RuntimeError('section failed')
+        return section, f"<p>{section['title']}</p>", section['title']
+
+    def write_sections(self, title, book_details, sections, format='html'):
+        self.written = sections
+        return f'/books/{title}_index.html'
+
+
+def test_get_many_book_details_runs_concurrently():
+    """Bulk details are fetched in parallel, capped, and keyed by identifier."""
+    service = FakeService()
+    client = AsyncProjectGutenbergService(service=service, concurrency=3)
+
+    started = time.monotonic()
+    details = asyncio.run(client.get_many_book_details(['1', '2', '3', 'missing', '5', '6']))
+    elapsed = time.monotonic() - started
+
+    assert details == {'1': {'id': '1'}, '2': {'id': '2'}, '3': {'id': '3'},
+                       'missing': None, '5': {'id': '5'}, '6': {'id': '6'}}
+    assert service.max_running == 3
+    # Five blocking calls three at a time take two rounds, not five
+    assert elapsed < FakeService.DELAY * 4
+
+
+def test_wikisource_sections_fetched_concurrently_in_order():
+    """Sections download in parallel and are written in reading order."""
+    service = FakeService()
+    client = AsyncWikisourceService(service=service, concurrency=4)
+
+    path = asyncio.run(client.download_book('Big Book'))
+
+    assert path == '/books/Big_Book_index.html'
+    assert service.max_running == 4
+    assert [section['title'] for section, html, text in service.written] == [f'Part {n}' for n in range(6)]
+    # A failed section is written as missing rather than failing the book
+    assert service.written[3][1] is None
+    assert service.written[2][1] == '<p>Part 2</p>'
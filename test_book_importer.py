@@ -0,0 +1,51 @@
+"""
+Tests for importing downloaded books into the library.
+"""
+
+import pytest
+
+from app.models.book import Book
+from app.services.book_importer import BookImporter, ImportFailed
+from app.utils.text_processor import TextProcessor
+
+
+class FakeProjectGutenberg:
+    """Project Gutenberg service that serves one already downloaded EPUB."""
+
+    def __init__(self, epub_path):
+        self.epub_path = epub_path
+
+    def get_book_details(self, book_id):
+        return {'title': 'Emma', 'author': 'Jane Austen', 'url': f'https://www.gutenberg.org/ebooks/{book_id}'}
+
+    def download_book(self, book_id, format='epub'):
+        return self.epub_path if format == 'epub' else None
+
+    def remove_pg_branding(self, text):
+        return text
+
+
+def test_project_gutenberg_epub_is_imported(app, tmp_path):
+    epub_path = tmp_path / 'pg158.epub'
+    TextProcessor().create_epub('Emma', 'Jane Austen', 'CHAPTER I\n\nEmma Woodhouse.', str(epub_path))
+    importer = BookImporter(standard_ebooks_service=object(), project_gutenberg_service=FakeProjectGutenberg(epub_path))
+
+    book = importer.import_book('project_gutenberg', '158')
+
+    with open(book.text_file_path, encoding='utf-8') as f:
+        assert 'Emma Woodhouse.' in f.read()
+    with open(book.html_file_path, encoding='utf-8') as f:
+        assert '<p id="chapter-1">CHAPTER I' in f.read()
+
+
+def test_broken_project_gutenberg_epub_fails_the_import(app, tmp_path):
+    epub_path = tmp_path / 'pg158.epub'
+    epub_path.write_bytes(b'not a zip file')
+    importer = BookImporter(standard_ebooks_service=object(), project_gutenberg_service=FakeProjectGutenberg(epub_path))
+
+    with pytest.raises(ImportFailed) as excinfo:
+        importer.import_book('project_gutenberg', '158')
+
+    assert not excinfo.value.retryable
+    assert Book.query.filter_by(source='project_gutenberg', source_id='158').first() is None
+    assert not (tmp_path / 'pg158.txt').exists()
@@ -0,0 +1,120 @@
+"""
+Tests for the paged book reader.
+"""
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.utils.book_reader import BookReader
+
+
+def write_book(tmp_path, chapters=3, paragraphs=3):
+    """Write a text file with numbered chapters."""
+    parts = ['Title Page\n\nBy Somebody\n']
+    for chapter in range(1, chapters + 1):
+        parts.append(f'CHAPTER {chapter}.\n')
+        for paragraph in range(paragraphs):
+            parts.append(f'Paragraph {paragraph} of chapter {chapter}, with ünïcode.\n')
+    text_file = tmp_path / 'book.txt'
+    text_file.write_text('\n'.join(parts), encoding='utf-8')
+    return text_file
+
+
+def test_pages_start_at_chapter_headings(tmp_path):
+    """Every chapter starts a page and pages cover the whole file."""
+    text_file = write_book(tmp_path)
+    reader = BookReader()
+
+    pages = reader.get_pages(text_file)
+
+    assert [page['title'] for page in pages] == [None, 'CHAPTER 1.', 'CHAPTER 2.', 'CHAPTER 3.']
+    assert pages[0]['start'] == 0
+    assert pages[-1]['end'] == text_file.stat().st_size
+    assert all(a['end'] == b['start'] for a, b in zip(pages, pages[1:]))
+    assert reader.read_page(text_file, pages[2]).startswith('CHAPTER 2.\n\nParagraph 0 of chapter 2, with ünïcode.')
+
+
+def test_long_chapters_split_at_paragraph_breaks(tmp_path):
+    """Chapters longer than the page size continue on further pages."""
+    text_file = write_book(tmp_path, chapters=1, paragraphs=40)
+    reader = BookReader()
+    reader.PAGE_BYTES = 200
+
+    pages = reader.build_pages(text_file)
+
+    assert len(pages) > 3
+    assert {page['chapter'] for page in pages[1:]} == {1}
+    for page in pages[1:]:
+        assert reader.read_page(text_file, page).startswith(('CHAPTER 1.', 'Paragraph'))
+
+
+def test_read_page_route(client, tmp_path):
+    """The reader serves one page with navigation and prefetch hints."""
+    text_file = write_book(tmp_path)
+    license = License.query.first()
+    book = Book(title='Paged', author='Somebody', source='project_gutenberg',
+                license_id=license.id, text_file_path=str(text_file))
+    db.session.add(book)
+    db.session.commit()
+
+    response = client.get(f'/book/{book.id}/read?page=2')
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'Paragraph 0 of chapter 1' in body
+    assert 'chapter 2' not in body
+    assert f'/book/{book.id}/read?page=3>; rel="prefetch"' in response.headers['Link']
+    assert client.get(f'/book/{book.id}/read?page=99').status_code == 302
+
+
+def test_chapter_index_api(client, tmp_path):
+    """Chapters are stored at import and served by seeking into the file."""
+    from app.utils.chapter_index import ChapterIndex
+
+    text_file = write_book(tmp_path)
+    license = License.query.first()
+    book = Book(title='Indexed', author='Somebody', source='project_gutenberg',
+                license_id=license.id, text_file_path=str(text_file))
+    db.session.add(book)
+    ChapterIndex().store(book)
+    db.session.commit()
+
+    data = client.get(f'/api/books/{book.id}/chapters').get_json()
+
+    assert [chapter['number'] for chapter in data['chapters']] == [0, 1, 2, 3]
+    assert data['chapters'][2]['title'] == 'CHAPTER 2.'
+    assert data['chapters'][2]['paragraph_count'] == 4
+    assert data['word_count'] == sum(chapter['word_count'] for chapter in data['chapters'])
+    assert (tmp_path / 'book.chapters.json').exists()
+
+    chapter = client.get(f'/api/books/{book.id}/chapters/3').get_json()
+    assert chapter['text'].startswith('CHAPTER 3.')
+    assert chapter['text'].endswith('Paragraph 2 of chapter 3, with ünïcode.')
+
+
+def test_storing_chapter_index_rescans_the_text(app, tmp_path):
+    """Re-indexing rebuilds the chapters even if the sidecar looks current."""
+    import json
+    from app.utils.chapter_index import ChapterIndex
+
+    text_file = write_book(tmp_path)
+    license = License.query.first()
+    book = Book(title='Reindexed', author='Somebody', source='project_gutenberg',
+                license_id=license.id, text_file_path=str(text_file))
+    db.session.add(book)
+    chapter_index = ChapterIndex()
+    chapter_index.store(book)
+    db.session.commit()
+
+    # Empty the sidecar without touching the size and mtime it records
+    sidecar_file = tmp_path / 'book.chapters.json'
+    sidecar = json.loads(sidecar_file.read_text())
+    sidecar['chapters'] = []
+    sidecar_file.write_text(json.dumps(sidecar))
+
+    chapters = chapter_index.store(book)
+    db.session.commit()
+
+    assert [chapter['number'] for chapter in chapters] == [0, 1, 2, 3]
+    assert [chapter.number for chapter in book.chapters] == [0, 1, 2, 3]
+    assert len(json.loads(sidecar_file.read_text())['chapters']) == 4
@@ -0,0 +1,50 @@
+"""
+Tests for keyset pagination of the browse page.
+"""
+
+import re
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.utils.pagination import encode_cursor
+
+
+def add_books(count):
+    """Add books titled so they sort in creation order."""
+    license = License.query.filter_by(short_name='PD-US').first()
+    for number in range(count):
+        db.session.add(Book(title=f'Book {number:02d}', author='Anonymous',
+                            source='project_gutenberg', license_id=license.id))
+    db.session.commit()
+
+
+def test_browse_pages_forward_and_back(client):
+    """Next links visit every book once; a previous link returns the page before."""
+    add_books(45)
+
+    pages = []
+    url = '/browse'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        pages.append(re.findall(r'Book \d\d', html))
+        next_link = re.search(r'href="([^"]*after=[^"]*)">Next', html)
+        url = next_link.group(1).replace('&amp;', '&') if next_link else None
+
+    titles = [title for page in pages for title in dict.fromkeys(page)]
+    assert titles == [f'Book {number:02d}' for number in range(45)]
+
+    previous = re.search(r'href="([^"]*before=[^"]*)">Previous', html).group(1).replace('&amp;', '&')
+    assert list(dict.fromkeys(re.findall(r'Book \d\d', client.get(previous).get_data(as_text=True)))) == \
+        [f'Book {number:02d}' for number in range(20, 40)]
+
+
+def test_browse_redirects_on_bad_cursor(client):
+    """Garbage cursors and cursors holding non-scalar values both redirect."""
+    add_books(3)
+
+    for cursor in ('nonsense', encode_cursor([{'a': 1}, 2]), encode_cursor(['Book 01'])):
+        for direction in ('after', 'before'):
+            response = client.get(f'/browse?{direction}={cursor}')
+            assert response.status_code == 302
+            assert '/browse' in response.headers['Location']
@@ -0,0 +1,67 @@
+"""
+Tests for the indexed local mirror of upstream catalogs.
+"""
+
+from app.utils.catalog_mirror import CatalogMirror, normalize_author
+
+
+def book(book_id, title, author, summary='', updated='2024-01-01'):
+    return {'id': book_id, 'title': title, 'author': author, 'summary': summary, 'updated': updated}
+
+
+CATALOG = [
+    book('1', 'Wuthering Heights', 'Emily Brontë', 'A tale of passion on the moors'),
+    book('2', 'Emma', 'Jane Austen', 'A young matchmaker meddles'),
+    book('3', 'Persuasion', 'Jane Austen', 'Second chances'),
+    book('4', 'The War of the Worlds', 'H. G. Wells', 'Martians invade England'),
+]
+
+
+def test_normalize_author():
+    """Different spellings of a name normalize to the same key."""
+    assert normalize_author('Austen, Jane') == 'jane austen'
+    assert normalize_author('  JANE   Austen ') == 'jane austen'
+    assert normalize_author('Brontë, Emily') == 'emily bronte'
+    assert normalize_author('H. G. Wells') == 'h g wells'
+
+
+def test_search_matches_substrings_like_the_old_scan(tmp_path):
+    """Trigram search finds the same books as a substring scan, ranked by field."""
+    mirror = CatalogMirror(tmp_path / 'catalog.db')
+    mirror.sync('standard_ebooks', CATALOG)
+
+    assert mirror.fts_enabled
+    assert sorted(b['id'] for b in mirror.search('standard_ebooks', 'austen')) == ['2', '3']
+    assert [b['id'] for b in mirror.search('standard_ebooks', 'ering hei')] == ['1']
+    # Title matches rank above summary matches
+    assert [b['id'] for b in mirror.search('standard_ebooks', 'emma')] == ['2']
+    assert [b['id'] for b in mirror.search('standard_ebooks', 'ma')] == ['2', '4']
+    # Accents and FTS syntax in the query are harmless
+    assert [b['id'] for b in mirror.search('standard_ebooks', 'bronte')] == ['1']
+    assert mirror.search('standard_ebooks', '"war" OR') == []
+    assert mirror.search('project_gutenberg', 'austen') == []
+
+
+def test_prefix_and_author_lookups(tmp_path):
+    """Titles can be looked up by prefix and books by normalized author."""
+    mirror = CatalogMirror(tmp_path / 'catalog.db')
+    mirror.sync('standard_ebooks', CATALOG)
+
+    assert [b['id'] for b in mirror.titles_with_prefix('standard_ebooks', 'the w')] == ['4']
+    assert [b['id'] for b in mirror.titles_with_prefix('standard_ebooks', 'E')] == ['2']
+    assert [b['id'] for b in mirror.books_by_author('standard_ebooks', 'Austen, Jane')] == ['2', '3']
+
+
+def test_sync_rewrites_only_changed_books(tmp_path):
+    """Unchanged books are left alone, changed ones rewritten and removed ones dropped."""
+    mirror = CatalogMirror(tmp_path / 'catalog.db')
+    assert mirror.synced_at('standard_ebooks') is None
+    assert mirror.sync('standard_ebooks', CATALOG) == 4
+    assert mirror.sync('standard_ebooks', CATALOG) == 0
+
+    updated = [CATALOG[0], book('2', 'Emma (revised)', 'Jane Austen', updated='2024-02-01')]
+    assert mirror.sync('standard_ebooks', updated) == 1
+
+    assert [b['title'] for b in mirror.search('standard_ebooks', 'emma')] == ['Emma (revised)']
+    assert mirror.search('standard_ebooks', 'persuasion') == []
+    assert mirror.synced_at('standard_ebooks') is not None
@@ -0,0 +1,94 @@
+"""
+Tests for the in-memory browse facet counts.
+"""
+
+from app import db
+from app.models.book import Book, Genre
+from app.models.license import License
+from app.utils.catalog_stats import catalog_stats
+
+
+def add_book(title, source, license, year=None, genres=()):
+    """Add a book to the test database."""
+    book = Book(title=title, author='Anonymous', source=source, publication_year=year,
+                license=License.query.filter_by(short_name=license).one())
+    book.genres = list(genres)
+    db.session.add(book)
+    db.session.commit()
+    return book
+
+
+def option_counts(facets, facet):
+    """Map facet values to counts, skipping empty options."""
+    return {option['value']: option['count'] for option in facets[facet] if option['count']}
+
+
+def test_facet_counts_respect_other_filters(app):
+    """Each facet is counted against the other active filters."""
+    horror = Genre(name='Horror')
+    romance = Genre(name='Romance')
+    db.session.add_all([horror, romance])
+
+    add_book('Dracula', 'standard_ebooks', 'CC0', 1897, [horror])
+    add_book('Carmilla', 'project_gutenberg', 'PD-US', 1872, [horror, romance])
+    add_book('Emma', 'project_gutenberg', 'PD-US', 1815, [romance])
+
+    facets = catalog_stats.facets(genre='Horror')
+
+    assert option_counts(facets, 'source') == {'standard_ebooks': 1, 'project_gutenberg': 1}
+    assert option_counts(facets, 'decade') == {1890: 1, 1870: 1}
+    assert option_counts(facets, 'genre') == {'Horror': 2, 'Romance': 2}
+    assert catalog_stats.count_books(source='project_gutenberg', genre='Romance') == 2
+    assert catalog_stats.count_books(license='CC0', decade=1810) == 0
+
+
+def test_facets_follow_catalog_changes(app):
+    """Imports, edits and deletes are patched into the cached counts."""
+    book = add_book('Dracula', 'standard_ebooks', 'CC0', 1897)
+    assert catalog_stats.count_books(source='standard_ebooks') == 1
+
+    add_book('Emma', 'standard_ebooks', 'CC0', 1815)
+    assert catalog_stats.count_books(source='standard_ebooks') == 2
+
+    book.source = 'project_gutenberg'
+    db.session.commit()
+    assert catalog_stats.count_books(source='standard_ebooks') == 1
+    assert catalog_stats.count_books(source='project_gutenberg') == 1
+
+    db.session.delete(book)
+    db.session.commit()
+    assert catalog_stats.count_books() == 1
+    assert option_counts(catalog_stats.facets(), 'decade') == {1810: 1}
+
+
+def test_changes_are_applied_to_a_copy(app):
+    """A snapshot being read by another request is never changed in place."""
+    add_book('Dracula', 'standard_ebooks', 'CC0', 1897)
+    catalog_stats.count_books()
+    snapshot = app.extensions[catalog_stats.EXTENSION_KEY]
+    all_ids = set(snapshot.all_ids)
+    members = {value: set(ids) for value, ids in snapshot.members['source'].items()}
+
+    add_book('Emma', 'project_gutenberg', 'PD-US', 1815)
+    assert catalog_stats.count_books() == 2
+
+    assert app.extensions[catalog_stats.EXTENSION_KEY] is not snapshot
+    assert snapshot.all_ids == all_ids
+    assert snapshot.members['source'] == members
+
+
+def test_changes_are_applied_on_commit(app):
+    """A request reading between flush and commit can't keep the old values."""
+    book = add_book('Dracula', 'standard_ebooks', 'CC0', 1897)
+    assert catalog_stats.count_books(source='standard_ebooks') == 1
+
+    book.source = 'project_gutenberg'
+    db.session.flush()
+
+    # Another request, with its own session, still sees the committed row
+    with app.app_context():
+        assert catalog_stats.count_books(source='standard_ebooks') == 1
+
+    db.session.commit()
+    assert catalog_stats.count_books(source='standard_ebooks') == 0
+    assert catalog_stats.count_books(source='project_gutenberg') == 1
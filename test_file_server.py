@@ -0,0 +1,96 @@
+"""
+Tests for book downloads with validators and byte ranges.
+"""
+
+import gzip
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.utils.file_server import BookFileServer
+
+
+def add_book(tmp_path, content=b'0123456789' * 100):
+    """Store a book with a text file and return its id."""
+    text_file = tmp_path / 'book.txt'
+    text_file.write_bytes(content)
+    book = Book(title='Download Me', author='Somebody', source='project_gutenberg',
+                license_id=License.query.first().id, text_file_path=str(text_file))
+    db.session.add(book)
+    db.session.commit()
+    return book.id
+
+
+def test_download_revalidates_with_etag(client, tmp_path):
+    """Full downloads carry a strong content ETag that yields 304s."""
+    book_id = add_book(tmp_path)
+
+    response = client.get(f'/book/{book_id}/download/text')
+    assert response.status_code == 200
+    assert response.data == b'0123456789' * 100
+    assert response.headers['Accept-Ranges'] == 'bytes'
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+    assert not etag.startswith('W/')
+
+    response = client.get(f'/book/{book_id}/download/text', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    response = client.get(f'/book/{book_id}/download/text',
+                          headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+
+def test_download_serves_byte_ranges(client, tmp_path):
+    """Single, suffix, multiple and unsatisfiable ranges."""
+    book_id = add_book(tmp_path)
+    url = f'/book/{book_id}/download/text'
+
+    response = client.get(url, headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == b'0123456789'
+    assert response.headers['Content-Range'] == 'bytes 10-19/1000'
+    assert response.headers['Content-Length'] == '10'
+
+    response = client.get(url, headers={'Range': 'bytes=-5'})
+    assert response.status_code == 206
+    assert response.data == b'56789'
+
+    response = client.get(url, headers={'Range': 'bytes=0-1,5-6'})
+    assert response.status_code == 206
+    assert response.mimetype == 'multipart/byteranges'
+    assert b'Content-Range: bytes 0-1/1000\r\n\r\n01\r\n' in response.data
+    assert b'Content-Range: bytes 5-6/1000\r\n\r\n56\r\n' in response.data
+    assert int(response.headers['Content-Length']) == len(response.data)
+
+    response = client.get(url, headers={'Range': 'bytes=5000-'})
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == 'bytes */1000'
+
+    response = client.get(url, headers={'Range': 'bytes=0-1', 'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert len(response.data) == 1000
+
+
+def test_download_serves_precompressed_variant(client, tmp_path):
+    """Clients accepting gzip get the stored .gz sibling as-is."""
+    book_id = add_book(tmp_path)
+    book = db.session.get(Book, book_id)
+    BookFileServer().prepare_files(book)
+    url = f'/book/{book_id}/download/text'
+
+    plain = client.get(url)
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Type'].startswith('text/plain')
+    assert response.headers['ETag'] != plain.headers['ETag']
+    assert gzip.decompress(response.data) == plain.data
+
+    response = client.get(url, headers={'Accept-Encoding': 'gzip',
+                                        'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
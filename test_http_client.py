@@ -0,0 +1,81 @@
+"""
+Tests for the shared HTTP client, against a local HTTP server.
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.http_client import HttpClient
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Answers 503 (with Retry-After) or 429 a few times before succeeding."""
+
+    protocol_version = 'HTTP/1.1'
+    failures = {}
+    connections = set()
+
+    def do_GET(self):
+        FlakyHandler.connections.add(self.client_address)
+        remaining = FlakyHandler.failures.get(self.path, 0)
+        if remaining:
+            FlakyHandler.failures[self.path] = remaining - 1
+            status, headers = (503, {'Retry-After': '0'}) if self.path == '/retry-after' else (429, {})
+        else:
+            status, headers = 200, {}
+
+        body = f'{status} {self.path}'.encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Local HTTP server on a free port."""
+    FlakyHandler.failures = {}
+    FlakyHandler.connections = set()
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_retries_transient_statuses(server):
+    """429 and 5xx responses are retried until the request succeeds."""
+    client = HttpClient(max_retries=3)
+    client.BACKOFF_BASE = 0.01
+    FlakyHandler.failures = {'/backoff': 2, '/retry-after': 1}
+
+    assert client.get(f'{server}/backoff').text == '200 /backoff'
+    assert client.get(f'{server}/retry-after').text == '200 /retry-after'
+
+    stats = client.stats()[server.split('//')[1]]
+    assert stats['requests'] == 5
+    assert stats['retries'] == 3
+    assert stats['statuses'] == {'429': 2, '503': 1, '200': 2}
+
+
+def test_gives_up_after_max_retries_and_reuses_connections(server):
+    """The last failing response is returned, and keep-alive is used."""
+    client = HttpClient(max_retries=1)
+    client.BACKOFF_BASE = 0.01
+    FlakyHandler.failures = {'/down': 5}
+
+    assert client.get(f'{server}/down').status_code == 429
+
+    for _ in range(3):
+        client.get(f'{server}/up')
+
+    # Five requests over the one pooled connection
+    assert len(FlakyHandler.connections) == 1
@@ -0,0 +1,181 @@
+"""
+Tests for the background import job queue.
+"""
+
+import socket
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.services.book_importer import ImportFailed
+from app.services.import_queue import ImportQueue
+
+
+class FakeImporter:
+    """Importer that creates a book, or fails a set number of times first."""
+
+    def __init__(self, failures=0, retryable=True):
+        self.failures = failures
+        self.retryable = retryable
+        self.calls = 0
+
+    def import_book(self, source, identifier, requested_by=None, progress=None):
+        self.calls += 1
+        progress(50, 'Halfway')
+        if self.calls <= self.failures:
+            raise ImportFailed('Upstream unavailable', retryable=self.retryable)
+        book = Book(title=f'Book {identifier}', author='Somebody', source=source,
+                    source_id=identifier, license_id=License.query.first().id)
+        db.session.add(book)
+        db.session.commit()
+        return book
+
+
+def test_enqueue_reuses_pending_job(app):
+    """Queueing the same book twice gives back the unfinished job."""
+    queue = ImportQueue(FakeImporter())
+
+    job = queue.enqueue('project_gutenberg', '84')
+
+    assert queue.enqueue('project_gutenberg', '84').id == job.id
+    assert queue.enqueue('project_gutenberg', ' 84\n').id == job.id
+    assert queue.enqueue('project_gutenberg', '85').id != job.id
+
+
+def test_worker_runs_job_and_reports_progress(client):
+    """A claimed job runs to completion and its state is served by the API."""
+    queue = ImportQueue(FakeImporter(), worker_id='test')
+    job = queue.enqueue('project_gutenberg', '84')
+
+    assert queue.work().status == 'succeeded'
+    assert queue.work() is None
+
+    data = client.get(f'/api/import/jobs/{job.id}').get_json()
+    assert data['status'] == 'succeeded'
+    assert data['progress'] == 100
+    assert data['attempts'] == 1
+    assert db.session.get(Book, data['book_id']).source_id == '84'
+
+    assert 'Job #' in client.get(f'/import/status/{job.id}').get_data(as_text=True)
+
+
+def test_failed_jobs_retry_with_backoff(app):
+    """Retryable failures are rescheduled until max_attempts, then fail."""
+    queue = ImportQueue(FakeImporter(failures=5), worker_id='test')
+    job = queue.enqueue('project_gutenberg', '84')
+
+    queue.work()
+    assert job.status == 'queued'
+    assert job.next_run_at > datetime.utcnow()
+    assert job.error == 'Upstream unavailable'
+
+    # Not due yet
+    assert queue.claim() is None
+
+    for _ in range(job.max_attempts - 1):
+        job.next_run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        queue.work()
+
+    assert job.status == 'failed'
+    assert job.attempts == job.max_attempts
+
+
+def test_permanent_failures_and_stale_leases(app):
+    """Non-retryable errors fail at once; abandoned running jobs are requeued."""
+    queue = ImportQueue(FakeImporter(failures=1, retryable=False), worker_id='test')
+    failed = queue.enqueue('project_gutenberg', '84')
+    queue.work()
+    assert failed.status == 'failed'
+    assert failed.attempts == 1
+
+    stale = queue.enqueue('project_gutenberg', '85')
+    assert queue.claim().id == stale.id
+    stale.locked_at = datetime.utcnow() - timedelta(seconds=queue.LEASE_TIMEOUT + 1)
+    db.session.commit()
+
+    assert queue.requeue_stale() == 1
+    db.session.refresh(stale)
+    assert stale.status == 'queued'
+
+
+def test_stale_lease_without_attempts_left_fails(app):
+    """A job that keeps losing its worker fails once its attempts are used up."""
+    queue = ImportQueue(FakeImporter(), worker_id='test')
+    job = queue.enqueue('project_gutenberg', '86')
+
+    for attempt in range(1, job.max_attempts + 1):
+        assert queue.claim().id == job.id
+        job.locked_at = datetime.utcnow() - timedelta(seconds=queue.LEASE_TIMEOUT + 1)
+        db.session.commit()
+
+        assert queue.requeue_stale() == (1 if attempt < job.max_attempts else 0)
+        db.session.refresh(job)
+
+    assert job.status == 'failed'
+    assert job.attempts == job.max_attempts
+    assert job.locked_by is None
+    assert queue.claim() is None
+
+
+def test_batch_skips_imported_and_pending_books(client):
+    """Re-queueing a manifest only adds books that are still missing."""
+    queue = ImportQueue(FakeImporter(), worker_id='test')
+    queue.enqueue('project_gutenberg', '1')
+    queue.work()
+    queue.enqueue('project_gutenberg', '2')
+
+    result = queue.enqueue_batch([
+        ('project_gutenberg', '1'),
+        ('project_gutenberg', '2'),
+        ('project_gutenberg', '3'),
+        ('project_gutenberg', '3'),
+        ('standard_ebooks', '/ebooks/jane-austen/emma'),
+        ('nowhere', '4'),
+    ])
+
+    assert (result['imported'], result['pending'], result['queued'], result['invalid']) == (1, 1, 2, 1)
+
+    # Workers restricted to one source only see that source's jobs
+    job = queue.claim(sources=['standard_ebooks'])
+    assert job.identifier == '/ebooks/jane-austen/emma'
+    queue.run(job)
+
+    data = client.get(f"/api/import/batch/{result['batch_id']}").get_json()
+    assert data['sources']['standard_ebooks']['succeeded'] == 1
+    assert data['sources']['project_gutenberg']['queued'] == 1
+
+    # Queueing batches is for administrators
+    response = client.post('/api/import/batch', json={'items': []})
+    assert response.status_code == 403
+
+
+def test_resumed_batch_requeues_the_crashed_run_at_once(app):
+    """Re-running a manifest continues its batch without waiting out leases."""
+    items = [('project_gutenberg', '1'), ('project_gutenberg', '2')]
+    first_run = ImportQueue(FakeImporter(), worker_id='test').enqueue_batch(items)
+
+    # A run on this host claimed a job and then died
+    crashed = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                             capture_output=True, text=True, check=True)
+    queue = ImportQueue(FakeImporter(), worker_id=f"{socket.gethostname()}:{crashed.stdout.strip()}:project_gutenberg")
+    job = queue.claim()
+    # Jobs held by workers that are still running are left alone
+    other = ImportQueue(FakeImporter(), worker_id='elsewhere:1').claim()
+
+    queue = ImportQueue(FakeImporter(), worker_id='test')
+    batch_id = queue.find_batch(items + [('project_gutenberg', '3')])
+    assert batch_id == first_run['batch_id']
+    assert queue.requeue_orphaned(batch_id) == 1
+
+    db.session.refresh(job)
+    db.session.refresh(other)
+    assert job.status == 'queued'
+    assert other.status == 'running'
+
+    result = queue.enqueue_batch(items + [('project_gutenberg', '3')], batch_id=batch_id)
+    assert (result['batch_id'], result['pending'], result['queued']) == (batch_id, 2, 1)
+    assert queue.batch_status(batch_id)['project_gutenberg']['queued'] == 2
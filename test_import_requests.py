@@ -0,0 +1,47 @@
+"""
+Tests for the persistent community import request store.
+"""
+
+from app.models.import_request import ImportRequest
+
+
+def submit(client, identifier, title='Emma'):
+    """Submit the public import request form."""
+    return client.post('/import/request', data={
+        'source': 'project_gutenberg',
+        'identifier': identifier,
+        'title': title,
+        'author': 'Jane Austen'
+    })
+
+
+def test_requests_are_stored_and_deduplicated(client):
+    """A repeat request for the same book points at the first one."""
+    first = submit(client, '158')
+    request_id = ImportRequest.query.one().id
+    assert first.headers['Location'].endswith(f'/import/status/{request_id}')
+
+    repeat = submit(client, ' 158 ', title='Emma again')
+    assert repeat.headers['Location'] == first.headers['Location']
+    assert ImportRequest.query.count() == 1
+
+    body = client.get(f'/import/status/{request_id}').get_data(as_text=True)
+    assert 'Emma' in body
+    assert 'Pending Review' in body
+
+
+def test_import_list_is_paginated_and_filterable(client):
+    """The request list pages through requests, newest first."""
+    for number in range(30):
+        submit(client, str(number), title=f'Book {number}')
+
+    first_page = client.get('/import/list').get_data(as_text=True)
+    assert 'Book 29' in first_page
+    assert 'Book 0<' not in first_page
+    assert 'Page 1 of 2' in first_page
+
+    second_page = client.get('/import/list?page=2').get_data(as_text=True)
+    assert 'Book 0<' in second_page
+
+    rejected = client.get('/import/list?status=rejected').get_data(as_text=True)
+    assert 'No Import Requests Yet' in rejected
@@ -0,0 +1,74 @@
+"""
+Tests for stripping the Project Gutenberg header and footer.
+"""
+
+from app.services.project_gutenberg import ProjectGutenbergService
+
+HEADER = """The Project Gutenberg eBook of Emma, by Jane Austen
+
+This eBook is for the use of anyone anywhere in the United States and
+most other parts of the world at no cost and with almost no restrictions
+whatsoever.
+
+Title: Emma
+
+*** START OF THE PROJECT GUTENBERG EBOOK EMMA ***
+"""
+
+FOOTER = """
+End of the Project Gutenberg EBook of Emma, by Jane Austen
+
+*** END OF THE PROJECT GUTENBERG EBOOK EMMA ***
+
+Updated editions will replace the previous one.
+This file should be named 158-0.txt or 158-0.zip
+"""
+
+BODY = """CHAPTER I
+
+Emma Woodhouse, handsome, clever, and rich.
+
+CHAPTER II
+
+Mr. Weston was a native of Highbury."""
+
+
+def test_strips_between_start_and_end_markers():
+    """Everything outside the delimiters goes, including the closing line."""
+    service = ProjectGutenbergService()
+    body = BODY.replace("CHAPTER II", "End of Project Gutenberg's influence, said no one.\n\n" + "More text.\n" * 200 + "\nCHAPTER II")
+    text = HEADER + "\n\n" + body + "\n\n" + FOOTER
+
+    start, end = service.find_pg_body(text)
+
+    assert text[start:end] == body
+    assert service.remove_pg_branding(text) == body
+
+
+def test_mentions_inside_the_book_are_kept():
+    """A footer phrase early in the book no longer truncates everything after it."""
+    service = ProjectGutenbergService()
+    body = BODY.replace("CHAPTER II", "End of Project Gutenberg's influence, said no one.\n\n" + "More text.\n" * 200 + "\nCHAPTER II")
+    text = "Project Gutenberg's Emma, by Jane Austen\n\n" + body + "\n\n" + "More text.\n" * 5000
+
+    result = service.remove_pg_branding(text)
+
+    assert result.startswith('CHAPTER I')
+    assert "End of Project Gutenberg's influence" in result
+    assert result.endswith('More text.')
+
+
+def test_old_files_without_markers():
+    """Header paragraphs at the top and footer lines at the end are removed."""
+    service = ProjectGutenbergService()
+    text = ("The Project Gutenberg Etext of Emma\r\nby Jane Austen\r\n\r\n"
+            "This etext was prepared by a volunteer.\r\n\r\n"
+            + BODY +
+            "\r\n\r\nEnd of the Project Gutenberg Etext of Emma\r\nThis file should be named emma10.txt\r\n")
+
+    assert service.remove_pg_branding(text) == BODY
+
+
+def test_text_without_branding_is_unchanged():
+    service = ProjectGutenbergService()
+    assert service.remove_pg_branding("\n  " + BODY + "\n") == BODY
@@ -0,0 +1,99 @@
+"""
+Tests that listing pages run a fixed number of queries regardless of page size.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models.book import Book, Genre
+from app.models.license import License
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def catalog(app):
+    """Fill the database with books spread over licenses and genres."""
+    licenses = License.query.all()
+    genres = [Genre(name=f'Genre {number}') for number in range(4)]
+    db.session.add_all(genres)
+
+    for number in range(40):
+        book = Book(title=f'Mystery Book {number:02d}', author='Anonymous',
+                    source='project_gutenberg', license=licenses[number % len(licenses)])
+        book.genres = [genres[number % 4], genres[(number + 1) % 4]]
+        db.session.add(book)
+
+    db.session.commit()
+    db.session.expire_all()
+
+
+@pytest.mark.parametrize('url', [
+    '/api/books?per_page={size}',
+    '/api/public/books?per_page={size}',
+    '/api/search?q=mystery&limit={size}',
+])
+def test_listing_query_count_is_independent_of_page_size(client, catalog, url):
+    """Small and large pages issue the same number of queries."""
+    counts = []
+    for size in (2, 30):
+        with count_queries() as statements:
+            response = client.get(url.format(size=size))
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_browse_query_count_is_independent_of_result_size(client, catalog):
+    """A full browse page costs as many queries as a nearly empty one."""
+    # Build the in-memory facet snapshot first
+    client.get('/browse')
+
+    counts = []
+    for url in ('/browse', '/browse?source=project_gutenberg&license=CC0&genre=Genre%200'):
+        with count_queries() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1]
+
+
+def test_search_loads_only_the_requested_fields(client, catalog):
+    """A typeahead search selects only its columns and skips the eager loads."""
+    with count_queries() as statements:
+        response = client.get('/api/search?q=mystery&limit=10&fields=id,title,author')
+    assert response.status_code == 200
+    assert set(response.get_json()['books'][0]) == {'id', 'title', 'author'}
+
+    assert len(statements) == 1
+    assert 'book.description' not in statements[0]
+
+    with count_queries() as statements:
+        books = client.get('/api/search?q=mystery&limit=10&fields=id,license,genres').get_json()['books']
+    assert all(book['license'] and book['genres'] for book in books)
+    assert len(statements) == 3
+
+
+def test_public_books_api_does_not_load_genres(client, catalog):
+    with count_queries() as statements:
+        response = client.get('/api/public/books?per_page=10')
+    assert response.status_code == 200
+    assert not any('book_genre' in statement for statement in statements)
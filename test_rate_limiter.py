@@ -0,0 +1,41 @@
+"""
+Tests for the cross-process token bucket rate limiter.
+"""
+
+import pytest
+
+from app.utils.rate_limiter import RateLimiter
+
+
+def test_bucket_allows_burst_then_queues_callers(tmp_path):
+    """Limiters sharing a store hand out consecutive slots to every caller."""
+    # Two limiters on the same file behave like two worker processes
+    first = RateLimiter(tmp_path / 'rate_limits.db')
+    second = RateLimiter(tmp_path / 'rate_limits.db')
+
+    waits = [
+        first.reserve('example.org', rate=1, burst=2),
+        second.reserve('example.org', rate=1, burst=2),
+        first.reserve('example.org', rate=1, burst=2),
+        second.reserve('example.org', rate=1, burst=2),
+    ]
+
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(1, abs=0.05)
+    assert waits[3] == pytest.approx(2, abs=0.05)
+
+    # Other hosts have their own bucket
+    assert first.reserve('example.com', rate=1, burst=2) == 0
+
+    stats = second.stats()['example.org']
+    assert stats['acquired'] == 4
+    assert stats['waited'] == 2
+    assert stats['total_wait_seconds'] == pytest.approx(3, abs=0.1)
+
+
+def test_acquire_waits_for_refill(tmp_path):
+    """acquire() sleeps until the reserved slot comes up."""
+    limiter = RateLimiter(tmp_path / 'rate_limits.db')
+
+    assert limiter.acquire('example.org', rate=50, burst=1) == 0
+    assert 0 < limiter.acquire('example.org', rate=50, burst=1) <= 0.02
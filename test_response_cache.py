@@ -0,0 +1,167 @@
+"""
+Tests for the SQLite-backed response cache.
+"""
+
+import io
+import time
+import sqlite3
+
+from app.utils.response_cache import ResponseCache
+from app.services.standard_ebooks import StandardEbooksService
+
+
+def test_exact_keys_and_namespaces(tmp_path):
+    """Keys that used to collapse to the same file name stay separate."""
+    cache = ResponseCache(tmp_path / 'cache.db')
+
+    cache.set('project_gutenberg.search', 'war & peace', [1])
+    cache.set('project_gutenberg.search', 'war_peace', [2])
+    cache.set('wikisource.search', 'war & peace', [3])
+
+    assert cache.get('project_gutenberg.search', 'war & peace') == [1]
+    assert cache.get('project_gutenberg.search', 'war_peace') == [2]
+    assert cache.get('wikisource.search', 'war & peace') == [3]
+    assert cache.get('project_gutenberg.search', 'war peace') is None
+
+    stats = cache.stats()['namespaces']['project_gutenberg.search']
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['entries'] == 2
+
+    # Another process sees the same entries
+    assert ResponseCache(tmp_path / 'cache.db').get('wikisource.search', 'war & peace') == [3]
+
+
+def test_entries_expire_per_namespace(tmp_path):
+    """Each namespace has its own time to live."""
+    cache = ResponseCache(tmp_path / 'cache.db')
+    cache.TTLS = {'short': 0.1, 'long': 60}
+
+    cache.set('short', 'key', {'value': 1})
+    cache.set('long', 'key', {'value': 2})
+    time.sleep(0.15)
+
+    assert cache.get('short', 'key') is None
+    assert cache.get('long', 'key') == {'value': 2}
+
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    """Writes past the size limit evict the entries used longest ago."""
+    cache = ResponseCache(tmp_path / 'cache.db', max_bytes=1000)
+    cache.TOUCH_INTERVAL = 0
+
+    for n in range(4):
+        cache.set('book', str(n), 'x' * 200)
+        time.sleep(0.01)
+
+    # Reading entry 0 makes entry 1 the least recently used
+    assert cache.get('book', '0') is not None
+    cache.set('book', '4', 'x' * 200)
+    cache.set('book', '5', 'x' * 200)
+
+    assert cache.get('book', '0') is not None
+    assert cache.get('book', '1') is None
+    assert cache.get('book', '5') is not None
+    stats = cache.stats()
+    assert stats['total_bytes'] <= 1000
+    assert stats['evictions'] >= 1
+
+
+def test_running_total_tracks_every_write(tmp_path):
+    """The stored byte total matches the entries after replaces and deletes."""
+    cache = ResponseCache(tmp_path / 'cache.db')
+    cache.set('book', '1', 'x' * 100)
+    cache.set('book', '2', 'x' * 50)
+    cache.set('book', '1', 'x' * 10)
+    cache.delete('book', '2')
+    cache.set('search', 'q', [1, 2, 3])
+    cache.delete('search')
+
+    connection = cache._connect()
+    assert cache._total_bytes(connection) == cache.stats()['total_bytes'] == len('"' + 'x' * 10 + '"')
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.raw = io.BytesIO(content)
+
+    def close(self):
+        pass
+
+
+class FakeHttp:
+    """Serves an OPDS feed with an ETag and honours If-None-Match."""
+
+    FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>https://standardebooks.org/ebooks/jane-austen/emma</id>
+    <title>Emma</title>
+    <author><name>Jane Austen</name></author>
+    <updated>2024-01-01T00:00:00Z</updated>
+    <link href="https://standardebooks.org/ebooks/jane-austen/emma" rel="alternate" type="text/html"/>
+    <link href="https://standardebooks.org/ebooks/jane-austen/emma/downloads/emma.epub" rel="enclosure" type="application/epub+zip"/>
+  </entry>
+</feed>"""
+
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        if (headers or {}).get('If-None-Match') == '"v1"':
+            return FakeResponse(304, headers={'ETag': '"v1"'})
+        return FakeResponse(200, self.FEED, {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'})
+
+
+def test_expired_entry_revalidated_with_conditional_request(tmp_path):
+    """A 304 for an expired entry makes it fresh again without refetching."""
+    cache = ResponseCache(tmp_path / 'cache.db')
+    http = FakeHttp()
+    service = StandardEbooksService(cache=cache, http=http)
+    service._respect_rate_limit = lambda: None
+
+    books = service.get_all_books()
+    assert [book['title'] for book in books] == ['Emma']
+    assert http.requests == [{}]
+
+    # Fresh entries are served without a request
+    assert service.get_all_books() == books
+    assert len(http.requests) == 1
+
+    # Once expired, the stored validators are sent and the 304 reuses the entry
+    cache.TTLS = {'standard_ebooks.catalog': 0}
+    assert service.get_all_books() == books
+    assert http.requests[1] == {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert cache.stats()['namespaces']['standard_ebooks.catalog']['revalidated'] == 1
+
+    cache.TTLS = {'standard_ebooks.catalog': 60}
+    assert cache.lookup('standard_ebooks.catalog', 'all').fresh
+
+    # Bypassing the cache sends an unconditional request
+    service.get_all_books(use_cache=False)
+    assert http.requests[2] == {}
+
+
+def test_cache_from_before_validators_is_upgraded(tmp_path):
+    """Cache files without validator columns are migrated in place."""
+    connection = sqlite3.connect(str(tmp_path / 'cache.db'))
+    for statement in ResponseCache.SCHEMA:
+        connection.execute(statement)
+    connection.execute(
+        "INSERT INTO response_cache (namespace, key, value, size, fetched_at, accessed_at) "
+        "VALUES ('book', '1', '[1]', 3, ?, ?)", (time.time(), time.time())
+    )
+    connection.commit()
+    connection.close()
+
+    cache = ResponseCache(tmp_path / 'cache.db')
+    assert cache.lookup('book', '1') == ([1], True, None, None)
+    assert cache.stats()['total_bytes'] == cache._total_bytes(cache._connect()) == 3
+
+    connection = sqlite3.connect(str(tmp_path / 'cache.db'))
+    assert connection.execute("PRAGMA user_version").fetchone()[0] == ResponseCache.SCHEMA_VERSION
+    connection.close()
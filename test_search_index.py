@@ -0,0 +1,111 @@
+"""
+Tests for the full-text search index over book metadata.
+"""
+
+import pytest
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.utils.search_index import BookSearchIndex
+from app.utils.pagination import encode_cursor, decode_cursor
+
+
+def add_book(title, author, description=''):
+    """Add a book to the test database."""
+    license = License.query.filter_by(short_name='PD-US').first()
+    book = Book(title=title, author=author, description=description,
+                source='project_gutenberg', license_id=license.id)
+    db.session.add(book)
+    db.session.commit()
+    return book
+
+
+def test_search_ranks_title_matches_first(app):
+    """Title matches outrank description matches."""
+    add_book('A Tale of Two Cities', 'Charles Dickens', 'Revolution in Paris and London')
+    add_book('Moby Dick', 'Herman Melville', 'The hunt for a white whale')
+    add_book('Whale Songs', 'Anonymous')
+
+    titles = [book.title for book in BookSearchIndex().search('whale').all()]
+
+    assert titles[0] == 'Whale Songs'
+    assert set(titles) == {'Whale Songs', 'Moby Dick'}
+
+
+def test_search_matches_last_word_as_prefix(app):
+    """The last word is matched as a prefix for typeahead."""
+    add_book('Pride and Prejudice', 'Jane Austen')
+
+    assert BookSearchIndex().search('jane aus').count() == 1
+    assert BookSearchIndex().search('aus jane').count() == 0
+
+
+def test_index_follows_updates_and_deletes(app):
+    """Triggers keep the index in sync with the book table."""
+    book = add_book('Frankenstein', 'Mary Shelley')
+    search_index = BookSearchIndex()
+
+    book.title = 'The Modern Prometheus'
+    db.session.commit()
+    assert search_index.search('frankenstein').count() == 0
+    assert search_index.search('prometheus').count() == 1
+
+    db.session.delete(book)
+    db.session.commit()
+    assert search_index.search('prometheus').count() == 0
+
+
+def test_search_ignores_fts_syntax(app):
+    """FTS5 operators in user input are treated as plain words."""
+    add_book('Dracula', 'Bram Stoker')
+
+    assert BookSearchIndex().search('dracula" (').count() == 1
+    assert BookSearchIndex().search('"*').count() == 0
+
+
+def test_search_endpoint(client):
+    """The search API returns ranked matches."""
+    add_book('The Time Machine', 'H. G. Wells')
+
+    response = client.get('/api/search?q=time')
+
+    assert response.status_code == 200
+    assert [book['title'] for book in response.get_json()['books']] == ['The Time Machine']
+
+
+def test_search_endpoint_pages_with_cursor(client):
+    """Paging through results with the cursor visits every match once."""
+    for number in range(5):
+        add_book(f'Ghost Story {number}', 'Anonymous')
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/search?q=ghost&limit=2&fields=id,title'
+        if cursor:
+            url += f'&cursor={cursor}'
+        data = client.get(url).get_json()
+
+        assert len(data['books']) <= 2
+        assert all(set(book) == {'id', 'title'} for book in data['books'])
+        seen.extend(book['id'] for book in data['books'])
+
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen)) == 5
+    assert client.get('/api/search/count?q=ghost').get_json() == {'count': 5}
+    assert client.get('/api/search?q=ghost&cursor=nonsense').status_code == 400
+
+
+def test_search_endpoint_rejects_cursor_with_non_scalar_values(client):
+    """A well-formed cursor holding objects is refused before reaching SQL."""
+    add_book('Ghost Story', 'Anonymous')
+    cursor = encode_cursor([{'a': 1}, 2])
+
+    assert client.get(f'/api/search?q=ghost&cursor={cursor}').status_code == 400
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([[1], None]), 2)
+    assert decode_cursor(encode_cursor(['Emma', 1.5]), 2) == ['Emma', 1.5]
@@ -0,0 +1,119 @@
+"""
+Tests for streaming and incremental sync of the Standard Ebooks OPDS catalog.
+"""
+
+import io
+
+from app.services.standard_ebooks import StandardEbooksService
+from app.utils.response_cache import ResponseCache
+from app.utils.catalog_mirror import CatalogMirror
+
+
+def make_feed(entries):
+    """Build an OPDS feed from (slug, title, updated) tuples."""
+    xml = ['<?xml version="1.0" encoding="utf-8"?>',
+           '<feed xmlns="http://www.w3.org/2005/Atom"><title>Standard Ebooks</title>']
+    for slug, title, updated in entries:
+        xml.append(f"""
+  <entry>
+    <id>https://standardebooks.org/ebooks/{slug}</id>
+    <title>{title}</title>
+    <author><name>Author of {title}</name><uri>https://standardebooks.org/ebooks/author</uri></author>
+    <updated>{updated}</updated>
+    <summary type="text">About {title}</summary>
+    <content type="xhtml"><div xmlns="http://www.w3.org/1999/xhtml"><p>Long <i>description</i></p></div></content>
+    <link href="https://standardebooks.org/ebooks/{slug}" rel="alternate" type="text/html"/>
+    <link href="https://standardebooks.org/ebooks/{slug}/downloads/book.epub" rel="enclosure" type="application/epub+zip"/>
+  </entry>""")
+    # Navigation entries have no epub and are skipped
+    xml.append('<entry><id>nav</id><title>New releases</title>'
+               '<link href="/opds/new" rel="subsection" type="application/atom+xml"/></entry>')
+    xml.append('</feed>')
+    return '\n'.join(xml).encode('utf-8')
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.status_code = 200
+        self.headers = {}
+        self.raw = io.BytesIO(content)
+
+    def close(self):
+        pass
+
+
+class FakeHttp:
+    def __init__(self, feed):
+        self.feed = feed
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.feed)
+
+
+def test_iter_catalog_streams_book_entries(tmp_path):
+    """Entries are parsed into the same book dictionaries as before."""
+    service = StandardEbooksService(cache=ResponseCache(tmp_path / 'cache.db'))
+
+    books = list(service.iter_catalog(io.BytesIO(make_feed([('jane-austen/emma', 'Emma', '2024-01-01T00:00:00Z')]))))
+
+    assert books == [{
+        'title': 'Emma',
+        'author': 'Author of Emma',
+        'id': 'https://standardebooks.org/ebooks/jane-austen/emma',
+        'updated': '2024-01-01T00:00:00Z',
+        'summary': 'About Emma',
+        'content': 'Long description',
+        'links': [
+            {'href': 'https://standardebooks.org/ebooks/jane-austen/emma', 'type': 'text/html', 'rel': 'alternate'},
+            {'href': 'https://standardebooks.org/ebooks/jane-austen/emma/downloads/book.epub',
+             'type': 'application/epub+zip', 'rel': 'enclosure'}
+        ],
+        'url_identifier': '/ebooks/jane-austen/emma'
+    }]
+
+
+def test_sync_only_reparses_updated_entries(tmp_path):
+    """A resync reuses unchanged books and picks up changed and removed ones."""
+    cache = ResponseCache(tmp_path / 'cache.db')
+    http = FakeHttp(make_feed([
+        ('a/one', 'One', '2024-01-01T00:00:00Z'),
+        ('b/two', 'Two', '2024-01-01T00:00:00Z'),
+        ('c/three', 'Three', '2024-01-01T00:00:00Z'),
+    ]))
+    service = StandardEbooksService(cache=cache, http=http)
+    service._respect_rate_limit = lambda: None
+
+    first = service.get_all_books()
+    assert [book['title'] for book in first] == ['One', 'Two', 'Three']
+
+    http.feed = make_feed([
+        ('a/one', 'One', '2024-01-01T00:00:00Z'),
+        ('c/three', 'Three (revised)', '2024-02-01T00:00:00Z'),
+        ('d/four', 'Four', '2024-02-01T00:00:00Z'),
+    ])
+    known = {book['id']: book for book in first}
+    second = list(service.iter_catalog(io.BytesIO(http.feed), known))
+
+    assert [book['title'] for book in second] == ['One', 'Three (revised)', 'Four']
+    assert second[0] is known[first[0]['id']]
+    assert second[1] is not known[first[2]['id']]
+
+    # get_all_books does the same once the cached catalog expires
+    cache.TTLS = {'standard_ebooks.catalog': 0}
+    assert [book['title'] for book in service.get_all_books()] == ['One', 'Three (revised)', 'Four']
+
+
+def test_search_books_uses_synced_mirror(tmp_path):
+    """Searches sync the mirror once and then query it without refetching."""
+    http = FakeHttp(make_feed([('jane-austen/emma', 'Emma', '2024'), ('h-g-wells/the-time-machine', 'The Time Machine', '2024')]))
+    requests = []
+    get = http.get
+    http.get = lambda url, **kwargs: requests.append(url) or get(url, **kwargs)
+
+    service = StandardEbooksService(cache=ResponseCache(tmp_path / 'cache.db'), http=http,
+                                    catalog=CatalogMirror(tmp_path / 'catalog.db'))
+    service._respect_rate_limit = lambda: None
+
+    assert [book['title'] for book in service.search_books('time')] == ['The Time Machine']
+    assert [book['title'] for book in service.search_books('Emma')] == ['Emma']
+    assert len(requests) == 1
@@ -0,0 +1,75 @@
+"""
+Tests for the full-text index over book contents.
+"""
+
+from app import db
+from app.models.book import Book
+from app.models.license import License
+from app.utils.text_index import BookTextIndex
+
+SAMPLE_TEXT = """The Airship Book
+
+CHAPTER I.
+
+It was a quiet morning in the village.
+Nobody expected anything unusual.
+
+CHAPTER II.
+
+Then a zeppelin drifted over the church <tower>.
+"""
+
+
+def add_book_with_text(tmp_path, text=SAMPLE_TEXT):
+    """Add a book whose text file contains the given text."""
+    text_file = tmp_path / 'book.txt'
+    text_file.write_text(text, encoding='utf-8')
+
+    license = License.query.filter_by(short_name='PD-US').first()
+    book = Book(title='The Airship Book', author='Anonymous', source='project_gutenberg',
+                license_id=license.id, text_file_path=str(text_file))
+    db.session.add(book)
+    db.session.commit()
+    return book
+
+
+def test_search_returns_chapter_offsets_and_snippet(app, tmp_path):
+    """Hits map back to the chapter and character offsets of the match."""
+    book = add_book_with_text(tmp_path)
+    text_index = BookTextIndex()
+    text_index.index_book(book)
+
+    hits = text_index.search('zeppelin')
+
+    assert len(hits) == 1
+    hit = hits[0]
+    assert hit['book_id'] == book.id
+    assert hit['chapter'] == 2
+    assert hit['chapter_title'] == 'CHAPTER II.'
+    assert SAMPLE_TEXT[hit['match_offset']:].startswith('zeppelin')
+    assert SAMPLE_TEXT[hit['start_offset']:hit['end_offset']] == 'Then a zeppelin drifted over the church <tower>.'
+    assert '<mark>zeppelin</mark>' in hit['snippet']
+    assert '&lt;tower&gt;' in hit['snippet']
+
+
+def test_unchanged_books_are_skipped(app, tmp_path):
+    """Re-indexing an unchanged book is a no-op."""
+    book = add_book_with_text(tmp_path)
+    text_index = BookTextIndex()
+
+    assert text_index.index_book(book) > 0
+    assert text_index.index_book(book) is None
+    assert text_index.index_book(book, force=True) > 0
+    assert len(text_index.search('village')) == 1
+
+
+def test_deleted_books_leave_the_index(app, tmp_path):
+    """Deleting a book removes its passages."""
+    book = add_book_with_text(tmp_path)
+    text_index = BookTextIndex()
+    text_index.index_book(book)
+
+    db.session.delete(book)
+    db.session.commit()
+
+    assert text_index.search('zeppelin') == []
@@ -0,0 +1,202 @@
+"""
+Tests for the TextProcessor text clean-up and conversion helpers.
+"""
+
+import io
+import re
+import html
+import random
+import zipfile
+from urllib.parse import unquote
+
+from app.utils.text_processor import TextProcessor
+
+
+def legacy_clean_text(text):
+    """clean_text() as it was before it could stream."""
+    if not text:
+        return ""
+    text = re.sub(r' +', ' ', text)
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def random_text(rng, length):
+    return ''.join(rng.choice(['a', 'b', 'é', ' ', ' ', '\n', '\n', '\t', '\r', ' ']) for _ in range(length))
+
+
+def test_clean_text_matches_previous_implementation():
+    processor = TextProcessor()
+    rng = random.Random(22)
+
+    for _ in range(2000):
+        text = random_text(rng, rng.randint(0, 80))
+        assert processor.clean_text(text) == legacy_clean_text(text)
+
+
+def test_iter_clean_text_matches_across_chunk_boundaries():
+    """However the text is split, the chunks clean to the same result."""
+    processor = TextProcessor()
+    rng = random.Random(23)
+
+    for _ in range(2000):
+        text = random_text(rng, rng.randint(0, 80))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+        assert ''.join(processor.iter_clean_text(chunks)) == legacy_clean_text(text)
+
+    assert list(processor.iter_clean_text(['   ', '\n\n\n', ''])) == []
+
+
+XHTML = """<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml">
+<head><title>Emma</title><style>p { margin: 0 }</style></head>
+<body>
+  <h2>Chapter   I</h2>
+  <p>Emma Woodhouse, handsome, clever,
+     and rich &amp; happy.<br/>She was <i>twenty-one</i>.</p><p>Next paragraph.</p>
+  <script>document.write("<p>not text</p>");</script>
+</body>
+</html>"""
+
+
+def test_html_to_text_keeps_block_boundaries():
+    """Blocks become paragraphs, line breaks stay and the head and scripts go."""
+    text = TextProcessor().html_to_text(XHTML)
+
+    assert text == (
+        "Chapter I\n\n"
+        "Emma Woodhouse, handsome, clever, and rich & happy.\n"
+        "She was twenty-one.\n\n"
+        "Next paragraph."
+    )
+    assert TextProcessor().html_to_text(XHTML.encode('utf-8')) == text
+    assert TextProcessor().html_to_text("<b>T</b>\n  <i>\n</i><p>a <i> b</i> </p>") == "T\n\na b"
+
+
+def test_html_to_text_beautifulsoup_switch():
+    """The original extractor is still available and runs blocks together."""
+    text = TextProcessor(html_extractor='beautifulsoup').html_to_text(XHTML)
+
+    assert "clever,\n and rich & happy.She was twenty-one.Next paragraph." in text
+    assert "not text" not in text
+
+
+def write_epub(path, spine, documents):
+    """Write a minimal EPUB whose manifest lists documents out of reading order."""
+    manifest = ''.join(
+        f'<item id="{item_id}" href="{href}" media-type="application/xhtml+xml"{properties}/>'
+        for item_id, (href, properties, _) in sorted(documents.items(), reverse=True)
+    )
+    itemrefs = ''.join(f'<itemref idref="{item_id}"/>' for item_id in spine)
+
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('mimetype', 'application/epub+zip')
+        archive.writestr('META-INF/container.xml', (
+            '<?xml version="1.0"?>'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>'
+            '</container>'
+        ))
+        archive.writestr('OEBPS/content.opf', (
+            '<?xml version="1.0" encoding="utf-8"?>'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0">'
+            f'<manifest>{manifest}</manifest><spine>{itemrefs}</spine></package>'
+        ))
+        for href, _, body in documents.values():
+            archive.writestr(f'OEBPS/{unquote(href)}', (
+                '<?xml version="1.0" encoding="utf-8"?>'
+                f'<html xmlns="http://www.w3.org/1999/xhtml"><body>{body}</body></html>'
+            ))
+
+
+def test_epub_text_follows_spine_order(tmp_path):
+    epub_path = tmp_path / 'book.epub'
+    write_epub(epub_path, ['nav', 'b', 'c', 'a'], {
+        'a': ('text/chapter-2.xhtml', '', '<p>Second chapter.</p>'),
+        'b': ('text/title%20page.xhtml', '', '<h1>Emma</h1>'),
+        'c': ('text/chapter-1.xhtml', '', '<p>First chapter.</p>'),
+        'nav': ('toc.xhtml', ' properties="nav"', '<nav><ol><li>Contents</li></ol></nav>'),
+    })
+    processor = TextProcessor()
+
+    names = [document['name'] for document in processor.iter_epub_documents(epub_path)]
+    assert names == ['OEBPS/text/title page.xhtml', 'OEBPS/text/chapter-1.xhtml', 'OEBPS/text/chapter-2.xhtml']
+
+    assert ''.join(processor.iter_epub_text(epub_path)) == "Emma\n\nFirst chapter.\n\nSecond chapter."
+    assert processor.extract_text_from_epub(epub_path) == "Emma\n\nFirst chapter.\n\nSecond chapter."
+
+
+def test_extract_text_from_broken_epub(tmp_path):
+    epub_path = tmp_path / 'broken.epub'
+    epub_path.write_bytes(b'not a zip file')
+
+    assert TextProcessor().extract_text_from_epub(epub_path) == ""
+
+
+def legacy_text_to_html(text, title=None, author=None):
+    """text_to_html() as it was before it could stream."""
+    if not text:
+        return ""
+    escaped = html.escape(text)
+    paragraphs = ["<p>" + p.replace('\n', '<br>') + "</p>" for p in escaped.split('\n\n') if p.strip()]
+    head = ["<!DOCTYPE html>", "<html>", "<head>"]
+    if title:
+        head.append(f"<title>{html.escape(title)}</title>")
+    head += [
+        "<meta charset=\"utf-8\">", "<style>",
+        "body { font-family: Georgia, serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 1em; }",
+        "h1 { text-align: center; }", "h2 { text-align: center; }", "</style>", "</head>", "<body>"
+    ]
+    if title:
+        head.append(f"<h1>{html.escape(title)}</h1>")
+    if author:
+        head.append(f"<h2>by {html.escape(author)}</h2>")
+    return "\n".join(head + paragraphs + ["</body>", "</html>"])
+
+
+def test_write_html_matches_text_to_html_across_chunk_boundaries():
+    processor = TextProcessor()
+    rng = random.Random(25)
+
+    for _ in range(2000):
+        text = ''.join(rng.choice(['a', '<', '&', ' ', '\n', '\n', '\n']) for _ in range(rng.randint(0, 60)))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, rng.randint(0, 8))))
+        chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+        out = io.StringIO()
+        processor.write_html(chunks, out, title='Emma & Co', author='Jane Austen')
+        expected = legacy_text_to_html(text, title='Emma & Co', author='Jane Austen')
+        assert out.getvalue() == expected
+        assert processor.text_to_html(text, title='Emma & Co', author='Jane Austen') == expected
+
+
+def test_write_html_adds_chapter_anchors(tmp_path):
+    from app.utils.chapter_index import ChapterIndex
+
+    text = "Preface.\n\nCHAPTER I\n\nIt begins.\n\n\n\nCHAPTER II\nIt goes on.\n"
+    text_path = tmp_path / 'book.txt'
+    text_path.write_text(text, encoding='utf-8')
+    chapters = ChapterIndex().build(text_path)
+
+    out = io.StringIO()
+    TextProcessor().write_html([text[:15], text[15:]], out, chapters=chapters)
+
+    assert '<p id="chapter-0">Preface.</p>\n<p id="chapter-1">CHAPTER I</p>\n<p>It begins.</p>' in out.getvalue()
+    assert '<p id="chapter-2">CHAPTER II<br>It goes on.<br></p>' in out.getvalue()
+
+
+def test_epub_text_is_cleaned_as_one_stream(tmp_path):
+    """Whitespace runs are collapsed across document boundaries, as clean_text() would."""
+    epub_path = tmp_path / 'book.epub'
+    write_epub(epub_path, ['a', 'b', 'c'], {
+        'a': ('a.xhtml', '', '<pre>Verse   one\n\n\n\n</pre>'),
+        'b': ('b.xhtml', '', '<p> </p>'),
+        'c': ('c.xhtml', '', '<pre>\n\n\nVerse two</pre>'),
+    })
+    processor = TextProcessor()
+
+    chunks = list(processor.iter_epub_text(epub_path))
+    assert len(chunks) > 1
+    assert ''.join(chunks) == "Verse one\n\nVerse two"
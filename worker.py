@@ -0,0 +1,96 @@
+"""
+Background import worker for the Remixable Fiction Library.
+This script runs queued book imports outside the web server. Start one or more
+worker processes alongside gunicorn; each claims jobs from the import queue,
+runs them and records their progress, retrying failures with backoff.
+Use --per-source to run one process per source, so imports from different
+sites proceed in parallel while each site still sees one request at a time.
+"""
+
+import sys
+import time
+import signal
+import argparse
+import logging
+import multiprocessing
+
+from app import create_app
+from app.services.import_queue import ImportQueue
+from app.services.book_importer import BookImporter
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Seconds between abandoned-job sweeps
+STALE_CHECK_INTERVAL = 60
+
+def run_worker(poll_interval, once=False, sources=None):
+    """Process import jobs until stopped.
+
+    Args:
+        poll_interval: Seconds to sleep when the queue is empty
+        once: Exit as soon as the queue is empty
+        sources: Optional list of sources to take jobs from
+    """
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        logger.info("Stopping after the current job")
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    app = create_app()
+
+    with app.app_context():
+        queue = ImportQueue()
+        logger.info(f"Import worker {queue.worker_id} started for {', '.join(sources or ['all sources'])}")
+        last_stale_check = 0
+
+        while not stopping:
+            if time.monotonic() - last_stale_check >= STALE_CHECK_INTERVAL:
+                queue.requeue_stale()
+                last_stale_check = time.monotonic()
+
+            if queue.work(sources) is None:
+                if once:
+                    break
+                time.sleep(poll_interval)
+
+def main():
+    """Start the import workers."""
+    parser = argparse.ArgumentParser(description='Run queued book imports.')
+    parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='Exit when the queue is empty')
+    parser.add_argument('--source', action='append', choices=BookImporter.SOURCES, dest='sources',
+                        help='Only run jobs from this source (may be repeated)')
+    parser.add_argument('--per-source', action='store_true',
+                        help='Run one process per source instead of --processes interchangeable workers')
+    args = parser.parse_args()
+
+    if args.per_source:
+        assignments = [[source] for source in (args.sources or BookImporter.SOURCES)]
+    else:
+        assignments = [args.sources] * max(args.processes, 1)
+
+    if len(assignments) == 1:
+        run_worker(args.poll_interval, args.once, assignments[0])
+        return 0
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.poll_interval, args.once, sources))
+        for sources in assignments
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    return 0 if all(process.exitcode == 0 for process in processes) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())